@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class NotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .db import configure_sqlite
+        connection_created.connect(
+            configure_sqlite, dispatch_uid='notes.configure_sqlite'
+        )
+        if settings.NOTES_WARM_TEMPLATES:
+            from .warmup import warm
+            warm()
@@ -0,0 +1,178 @@
+"""Потоковая выгрузка всех заметок пользователя.
+
+Заметки читаются из базы пачками через iterator(), а архив отдаётся
+частями по мере чтения, поэтому память воркера не зависит от числа
+заметок. ZIP собирается вручную: zipfile держит в памяти описание
+каждого файла до конца архива, а здесь центральный каталог копится
+во временном файле, который уходит на диск, когда перестаёт быть
+маленьким.
+"""
+import json
+import struct
+import tempfile
+import zlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import sharding
+
+ARCHIVE_FIELDS = ('slug', 'title', 'text', 'modified')
+
+# Части меньше этого размера склеиваются перед отправкой клиенту.
+CHUNK_SIZE = 64 * 1024
+
+# Сколько байт центрального каталога ZIP держать в памяти.
+DIRECTORY_SPOOL_SIZE = 1024 * 1024
+
+LOCAL_HEADER = struct.Struct('<4s2H3H3L2H')
+CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+ZIP64_END = struct.Struct('<4sQ2H2L4Q')
+ZIP64_LOCATOR = struct.Struct('<4sLQL')
+END_RECORD = struct.Struct('<4s4H2LH')
+ZIP64_OFFSET = struct.Struct('<2HQ')
+
+# Имена файлов в UTF-8.
+UTF8_FLAG = 0x800
+# Архив создан в Unix: внешние атрибуты - права файла.
+MADE_ON_UNIX = 3 << 8
+ZIP_MAX = 0xFFFFFFFF
+ZIP_MAX_COUNT = 0xFFFF
+
+
+def note_rows(author):
+    """Заметки автора в порядке id, пачками по NOTES_ARCHIVE_CHUNK_SIZE."""
+    return sharding.notes_for(author).order_by('id').values_list(
+        *ARCHIVE_FIELDS
+    ).iterator(chunk_size=settings.NOTES_ARCHIVE_CHUNK_SIZE)
+
+
+def markdown(title, text):
+    return f'# {title}\n\n{text}\n'
+
+
+def dos_datetime(moment):
+    """Дата и время в формате MS-DOS, как их хранит ZIP."""
+    if timezone.is_aware(moment):
+        moment = timezone.localtime(moment)
+    year = min(max(moment.year, 1980), 2107)
+    return (
+        moment.hour << 11 | moment.minute << 5 | moment.second // 2,
+        (year - 1980) << 9 | moment.month << 5 | moment.day,
+    )
+
+
+class ZipStream:
+    """ZIP, который отдаётся по частям.
+
+    Размеры и CRC файла известны до записи (заметка сжимается целиком),
+    поэтому дескрипторы данных не нужны. После 4 ГиБ или 65535 файлов
+    используются записи ZIP64.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.count = 0
+        self.directory = tempfile.SpooledTemporaryFile(
+            max_size=DIRECTORY_SPOOL_SIZE
+        )
+
+    def add(self, name, data, moment):
+        """Возвращает байты файла в архиве и запоминает его в каталоге."""
+        name = name.encode()
+        crc = zlib.crc32(data)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = compressor.compress(data) + compressor.flush()
+        time, date = dos_datetime(moment)
+        header = LOCAL_HEADER.pack(
+            b'PK\x03\x04', 20, UTF8_FLAG, zlib.DEFLATED, time, date,
+            crc, len(compressed), len(data), len(name), 0,
+        )
+        extra = b''
+        offset = self.offset
+        if offset >= ZIP_MAX:
+            extra = ZIP64_OFFSET.pack(1, 8, offset)
+            offset = ZIP_MAX
+        version = 45 if extra else 20
+        self.directory.write(CENTRAL_HEADER.pack(
+            b'PK\x01\x02', MADE_ON_UNIX | version, version, UTF8_FLAG,
+            zlib.DEFLATED, time, date, crc, len(compressed), len(data),
+            len(name), len(extra), 0, 0, 0, 0o644 << 16, offset,
+        ) + name + extra)
+        self.count += 1
+        chunk = header + name + compressed
+        self.offset += len(chunk)
+        return chunk
+
+    def finish(self):
+        """Центральный каталог и завершающие записи архива."""
+        start = self.offset
+        size = self.directory.tell()
+        self.directory.seek(0)
+        with self.directory:
+            while True:
+                chunk = self.directory.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        end = start + size
+        if (
+            self.count >= ZIP_MAX_COUNT or start >= ZIP_MAX
+            or size >= ZIP_MAX
+        ):
+            yield ZIP64_END.pack(
+                b'PK\x06\x06', ZIP64_END.size - 12, 45, 45, 0, 0,
+                self.count, self.count, size, start,
+            ) + ZIP64_LOCATOR.pack(b'PK\x06\x07', 0, end, 1)
+        yield END_RECORD.pack(
+            b'PK\x05\x06', 0, 0, min(self.count, ZIP_MAX_COUNT),
+            min(self.count, ZIP_MAX_COUNT), min(size, ZIP_MAX),
+            min(start, ZIP_MAX), 0,
+        )
+
+
+def joined(parts):
+    """Склеивает мелкие части в куски не меньше CHUNK_SIZE."""
+    buffer = []
+    buffered = 0
+    for part in parts:
+        buffer.append(part)
+        buffered += len(part)
+        if buffered >= CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def zip_parts(rows):
+    archive = ZipStream()
+    for slug, title, text, modified in rows:
+        yield archive.add(
+            f'{slug}.md', markdown(title, text).encode(), modified
+        )
+    yield from archive.finish()
+
+
+def jsonl_parts(rows):
+    for slug, title, text, modified in rows:
+        yield (json.dumps({
+            'slug': slug,
+            'title': title,
+            'text': text,
+            'modified': modified.isoformat(),
+        }, ensure_ascii=False) + '\n').encode()
+
+
+# Формат: функция, тип содержимого и имя файла.
+FORMATS = {
+    'zip': (zip_parts, 'application/zip', 'notes.zip'),
+    'jsonl': (jsonl_parts, 'application/x-ndjson', 'notes.jsonl'),
+}
+
+
+def stream(author, archive_format):
+    """Части архива заметок автора в формате из FORMATS."""
+    parts, _, _ = FORMATS[archive_format]
+    return joined(parts(note_rows(author)))
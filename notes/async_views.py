@@ -0,0 +1,115 @@
+"""Асинхронные версии страниц заметок для запуска через yanote.asgi.
+
+Синхронные CBV под ASGI выполняются в единственном потоке Django для
+sync-кода. Здесь обращения к БД уходят в отдельный ограниченный пул
+потоков (NOTES_ASYNC_DB_WORKERS), а ответ отрисовывается в цикле событий.
+Проверка входа и ограничение заметок автором те же, что у синхронных
+представлений: классы наследуют их логику и заменяют только dispatch.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.cache import get_conditional_response
+
+from . import views
+
+_executors = {}
+
+
+def get_executor(workers):
+    """Пул потоков для БД; создаётся один раз на размер пула."""
+    if workers not in _executors:
+        _executors[workers] = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='notes-db'
+        )
+    return _executors[workers]
+
+
+def _call_in_worker(func, args, kwargs):
+    # Поток пула живёт дольше запроса: соединение закрывается так же,
+    # как в начале обычного запроса, с учётом CONN_MAX_AGE.
+    close_old_connections()
+    return func(*args, **kwargs)
+
+
+async def run_db(func, *args, **kwargs):
+    """Выполняет синхронный код с доступом к БД вне цикла событий.
+
+    При NOTES_ASYNC_DB_WORKERS = 0 используется стандартный sync_to_async
+    Django (один общий поток), иначе - ограниченный пул потоков.
+    """
+    workers = settings.NOTES_ASYNC_DB_WORKERS
+    if not workers:
+        return await sync_to_async(func)(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    # Контекст запроса (например, routers.use_primary) переходит в поток.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor(workers),
+        functools.partial(context.run, _call_in_worker, func, args, kwargs),
+    )
+
+
+class AsyncViewMixin:
+    """Асинхронный dispatch с проверкой входа и условными запросами.
+
+    Ставится перед синхронным классом представления и заменяет его
+    dispatch: LoginRequiredMixin и ConditionalGetMixin используются
+    через их методы, а сами запросы к БД выполняются через run_db.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        functools.update_wrapper(async_view, view)
+        return async_view
+
+    async def dispatch(self, request, *args, **kwargs):
+        authenticated = await run_db(lambda: request.user.is_authenticated)
+        if not authenticated:
+            return self.handle_no_permission()
+        method = request.method.lower()
+        if method not in self.http_method_names or not hasattr(
+                self, method
+        ):
+            return self.http_method_not_allowed(request, *args, **kwargs)
+        if not isinstance(self, views.ConditionalGetMixin) or (
+                request.method not in ('GET', 'HEAD')
+        ):
+            return await getattr(self, method)(request, *args, **kwargs)
+        etag, last_modified = await run_db(self.prepare_validators)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = await getattr(self, method)(request, *args, **kwargs)
+        self.add_validator_headers(response, etag, last_modified)
+        return response
+
+    async def get(self, request, *args, **kwargs):
+        """Данные страницы готовятся в пуле, шаблон рисуется в цикле."""
+        response = await run_db(super().get, request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+
+class AsyncNoteSuccess(AsyncViewMixin, views.NoteSuccess):
+    """Асинхронная страница успешного выполнения операции."""
+
+
+class AsyncNotesList(AsyncViewMixin, views.NotesList):
+    """Асинхронный список заметок пользователя."""
+
+
+class AsyncNoteDetail(AsyncViewMixin, views.NoteDetail):
+    """Асинхронная страница заметки."""
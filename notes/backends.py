@@ -0,0 +1,34 @@
+"""Бэкенд аутентификации с кэшем пользователя сессии.
+
+ModelBackend читает пользователя из базы на каждом запросе. Здесь он
+берётся из кэша notes.cache; запись удаляют сигналы (notes.signals) при
+сохранении пользователя и при выходе. Хэш пароля тоже берётся из кэша,
+поэтому после смены пароля сессии сбрасываются, как и без кэша.
+
+Сигнал удаляет запись только из того кэша, который видит процесс,
+обработавший изменение. Поэтому кэш NOTES_CACHE_ALIAS должен быть общим
+для всех воркеров: с кэшем в памяти процесса бэкенд не работает.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import ImproperlyConfigured
+
+from . import cache
+
+
+class CachedModelBackend(ModelBackend):
+
+    def __init__(self):
+        if not cache.is_shared():
+            raise ImproperlyConfigured(
+                'CachedModelBackend нужен общий для процессов кэш '
+                'NOTES_CACHE_ALIAS, а не LocMemCache.'
+            )
+
+    def get_user(self, user_id):
+        user = cache.get_user(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set_user(user)
+            return user
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,276 @@
+"""Пакетное создание, изменение и удаление заметок.
+
+Пачка проверяется целиком: поля каждой операции проверяются правилами
+NoteForm, заметки для изменения и удаления выбираются одним запросом,
+уникальность всех slug тоже проверяется одним запросом. Если хотя бы
+одна операция не прошла проверку, не применяется ничего.
+
+Если slug успели занять между проверкой и вставкой, пачка проверяет
+slug заново и повторяется, как Note.save; занятый явно указанный slug
+становится ошибкой операции.
+"""
+from django.db import IntegrityError
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from . import markup, sharding, signals, slugs
+from .forms import WARNING, BatchNoteForm
+from .models import SLUG_ATTEMPTS, Note
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+ACTIONS = (CREATE, UPDATE, DELETE)
+FORM_FIELDS = BatchNoteForm._meta.fields
+# Поля, которые пачка пишет в изменённые заметки.
+UPDATE_FIELDS = (*FORM_FIELDS, 'modified', 'text_html', 'text_hash')
+
+
+class BatchError(Exception):
+    """Пачка некорректна целиком."""
+
+
+class Operation:
+    """Одна операция пачки и её результат."""
+
+    def __init__(self, index, data):
+        self.index = index
+        self.data = data
+        self.action = data.get('action')
+        self.note = None
+        self.errors = {}
+        # slug подобран из заголовка, а не указан.
+        self.automatic = False
+
+    def result(self):
+        result = {'index': self.index, 'action': self.action}
+        if self.errors:
+            result.update(status='error', errors=self.errors)
+            return result
+        result.update(status={
+            CREATE: 'created', UPDATE: 'updated', DELETE: 'deleted'
+        }[self.action])
+        result['slug'] = self.note.slug
+        if self.action != DELETE:
+            result['id'] = self.note.pk
+        return result
+
+
+class NoteBatch:
+    """Проверяет и применяет пачку операций над заметками автора."""
+
+    def __init__(self, author, queryset, operations, max_operations):
+        if not isinstance(operations, list):
+            raise BatchError('operations должен быть списком.')
+        if len(operations) > max_operations:
+            raise BatchError(
+                f'В пачке больше {max_operations} операций.'
+            )
+        if not all(isinstance(data, dict) for data in operations):
+            raise BatchError('Каждая операция должна быть объектом.')
+        self.author = author
+        self.queryset = queryset
+        self.operations = [
+            Operation(index, data) for index, data in enumerate(operations)
+        ]
+
+    @property
+    def is_valid(self):
+        return not any(operation.errors for operation in self.operations)
+
+    def results(self):
+        return [operation.result() for operation in self.operations]
+
+    def validate(self):
+        """Проверяет все операции, делая не больше двух запросов."""
+        for operation in self.operations:
+            if operation.action not in ACTIONS:
+                operation.errors['action'] = [
+                    'Допустимые действия: ' + ', '.join(ACTIONS)
+                ]
+        targets = self.load_targets()
+        used_targets = set()
+        for operation in self.operations:
+            if operation.errors:
+                continue
+            if operation.action == CREATE:
+                self.validate_form(operation, Note(author=self.author))
+                continue
+            target = operation.data.get('target')
+            if not isinstance(target, str):
+                operation.errors['target'] = ['Укажите slug заметки.']
+                continue
+            note = targets.get(target)
+            if note is None:
+                operation.errors['target'] = ['Заметка не найдена.']
+            elif target in used_targets:
+                operation.errors['target'] = [
+                    'Заметка уже изменяется в этой пачке.'
+                ]
+            elif operation.action == UPDATE:
+                self.validate_form(operation, note)
+            else:
+                operation.note = note
+            used_targets.add(target)
+        self.check_slugs()
+        return self.is_valid
+
+    def load_targets(self):
+        """Выбирает заметки автора для изменения и удаления."""
+        slugs = {
+            operation.data.get('target') for operation in self.operations
+            if operation.action in (UPDATE, DELETE)
+            and isinstance(operation.data.get('target'), str)
+        }
+        if not slugs:
+            return {}
+        queryset = self.queryset
+        if any(
+            operation.action == UPDATE for operation in self.operations
+        ):
+            # Форма изменения проверяет все поля, в том числе текст.
+            queryset = queryset.with_text()
+        return queryset.filter(slug__in=slugs).in_bulk(field_name='slug')
+
+    def validate_form(self, operation, note):
+        data = model_to_dict(note, fields=FORM_FIELDS) if note.pk else {}
+        data.update(
+            (field, operation.data[field])
+            for field in FORM_FIELDS if field in operation.data
+        )
+        form = BatchNoteForm(data, instance=note)
+        if form.is_valid():
+            operation.note = form.instance
+        else:
+            operation.errors.update(form.errors.get_json_data())
+
+    def check_slugs(self):
+        """Проверяет и подбирает slug для всей пачки одним запросом.
+
+        Явно указанный slug должен быть свободен; для пустого
+        подбирается свободный вариант из заголовка, как в Note.save.
+        """
+        writes = [
+            operation for operation in self.operations
+            if not operation.errors and operation.action in (CREATE, UPDATE)
+        ]
+        explicit = [operation for operation in writes if operation.note.slug]
+        automatic = [
+            operation for operation in writes if not operation.note.slug
+        ]
+        for operation in automatic:
+            operation.automatic = True
+        released = {
+            operation.note.pk for operation in self.operations
+            if not operation.errors and operation.action == DELETE
+        }
+        bases = {
+            slugs.base_for(Note, operation.note.title)
+            for operation in automatic
+        }
+        owners = slugs.find_taken(
+            Note, bases=bases,
+            slugs=[operation.note.slug for operation in explicit],
+        )
+        claimed = set()
+        for operation in explicit:
+            slug = operation.note.slug
+            owner = owners.get(slug)
+            taken = owner is not None and owner != operation.note.pk and (
+                owner not in released
+            )
+            if taken or slug in claimed:
+                operation.errors['slug'] = [{
+                    'message': slug + WARNING,
+                    'code': 'unique',
+                }]
+            claimed.add(slug)
+        # Основы заметок, которые удаляются в этой пачке, свободны, а свой
+        # slug заметка может сохранить. Наибольший вариант удаляемой
+        # заметки остаётся занятым: по нему считается следующий суффикс.
+        taken = claimed | {
+            slug for slug, owner in owners.items()
+            if owner not in released or slug not in bases
+        }
+        for operation in automatic:
+            own = {
+                slug for slug, owner in owners.items()
+                if owner == operation.note.pk
+            }
+            operation.note.slug = slugs.next_free(
+                Note, slugs.base_for(Note, operation.note.title), taken,
+                own - claimed,
+            )
+            taken.add(operation.note.slug)
+
+    def slugs_taken(self):
+        """Занят ли другой заметкой slug, который пишет пачка."""
+        notes = [
+            operation.note for operation in self.operations
+            if operation.action in (CREATE, UPDATE)
+        ]
+        owners = sharding.slug_owners(Note).filter(
+            slug__in=[note.slug for note in notes]
+        ).values_list('slug', 'id')
+        released = {
+            operation.note.pk for operation in self.operations
+            if operation.action == DELETE
+        }
+        ours = {note.slug: note.pk for note in notes}
+        return any(
+            owner != ours[slug] and owner not in released
+            for slug, owner in owners
+        )
+
+    def apply(self):
+        """Применяет проверенную пачку в одной транзакции.
+
+        Возвращает False, если slug заняли параллельно и пачка после
+        повторной проверки некорректна.
+        """
+        for operation in self.operations:
+            if operation.action != DELETE:
+                markup.render_note(operation.note)
+        for attempt in range(1, SLUG_ATTEMPTS + 1):
+            try:
+                self.write()
+                return True
+            except IntegrityError:
+                if attempt == SLUG_ATTEMPTS or not self.slugs_taken():
+                    raise
+            if not self.recheck_slugs():
+                return False
+
+    def recheck_slugs(self):
+        """Подбирает slug заново после неудачной записи."""
+        for operation in self.operations:
+            if operation.action == CREATE:
+                operation.note.pk = None
+            if operation.automatic:
+                operation.note.slug = ''
+        self.check_slugs()
+        return self.is_valid
+
+    def write(self):
+        by_action = {action: [] for action in ACTIONS}
+        for operation in self.operations:
+            by_action[operation.action].append(operation.note)
+        now = timezone.now()
+        database = sharding.db_for_author(self.author.pk)
+        notes = Note.objects.db_manager(database)
+        with sharding.atomic(database), signals.deferred():
+            if by_action[DELETE]:
+                deleted = [note.pk for note in by_action[DELETE]]
+                notes.filter(pk__in=deleted).delete()
+                # Slug удалённых заметок может занять эта же пачка.
+                sharding.release_slugs(deleted)
+            if by_action[UPDATE]:
+                for note in by_action[UPDATE]:
+                    note.modified = now
+                sharding.rename_slugs(by_action[UPDATE])
+                notes.bulk_update(
+                    by_action[UPDATE], fields=UPDATE_FIELDS
+                )
+                signals.notes_saved(by_action[UPDATE])
+            if by_action[CREATE]:
+                signals.notes_saved(sharding.bulk_create(by_action[CREATE]))
@@ -0,0 +1,123 @@
+"""Общие инструменты для бенчмарков.
+
+Задержки собираются в миллисекундах, результаты сохраняются в JSON вместе
+с ревизией git, чтобы прогоны разных коммитов можно было сравнить.
+"""
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples, rank):
+    """Перцентиль методом ближайшего ранга."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def summarize(latencies, **extra):
+    """Сводка по задержкам в миллисекундах."""
+    summary = {
+        f'p{rank}_ms': round(percentile(latencies, rank), 3)
+        for rank in PERCENTILES
+    }
+    summary['mean_ms'] = round(
+        sum(latencies) / len(latencies) if latencies else 0.0, 3
+    )
+    summary['max_ms'] = round(max(latencies, default=0.0), 3)
+    summary['count'] = len(latencies)
+    summary.update(extra)
+    return summary
+
+
+class Timer:
+    """Замер одного вызова: задержка и число SQL-запросов."""
+
+    def __init__(self, track_queries=True):
+        self.track_queries = track_queries
+        self.elapsed_ms = 0.0
+        self.queries = 0
+
+    def __enter__(self):
+        self.capture = None
+        if self.track_queries:
+            self.capture = CaptureQueriesContext(connection)
+            self.capture.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed_ms = (time.perf_counter() - self.started) * 1000
+        if self.capture is not None:
+            self.capture.__exit__(*exc_info)
+            self.queries = len(self.capture)
+
+
+def peak_memory_kib(func, repeat=1):
+    """Пиковый прирост выделенной Python-памяти за вызовы func, КиБ."""
+    tracemalloc.start()
+    try:
+        for _ in range(repeat):
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**extra):
+    return {
+        'revision': git_revision(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        **extra,
+    }
+
+
+def write_results(path, results, **meta):
+    payload = {'meta': metadata(**meta), 'results': results}
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(payload, output, ensure_ascii=False, indent=2)
+    return payload
+
+
+def compare(previous, current, metric='p95_ms'):
+    """Строки сравнения двух прогонов по одной метрике."""
+    lines = []
+    for name, result in current['results'].items():
+        before = previous['results'].get(name, {}).get(metric)
+        after = result.get(metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        lines.append(
+            f'{name:<12} {metric} {before:>10.3f} -> {after:>10.3f} '
+            f'({change:+.1f}%)'
+        )
+    return lines
@@ -0,0 +1,178 @@
+"""Кэш отрисованных страниц списка заметок и самих заметок.
+
+Ключи содержат версию автора: любое изменение его заметок увеличивает
+версию, и старые записи больше не читаются, а просто вытесняются из кэша
+по таймауту. Счётчики попаданий и промахов лежат в том же кэше, поэтому
+при общем (например, файловом) бэкенде они общие для всех процессов.
+
+Заметки по (автор, slug) дополнительно держатся в небольшом LRU внутри
+процесса: версия автора всё равно читается из общего кэша, так что
+изменение в другом процессе делает локальные записи недоступными.
+
+Пользователи сессий кэшируются по id для CachedModelBackend; запись
+удаляется при сохранении пользователя (в том числе смене пароля),
+удалении и выходе.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+HITS_KEY = 'notes:list:hits'
+MISSES_KEY = 'notes:list:misses'
+NOTE_HITS_KEY = 'notes:note:hits'
+NOTE_MISSES_KEY = 'notes:note:misses'
+
+
+def get_cache():
+    return caches[settings.NOTES_CACHE_ALIAS]
+
+
+def is_shared():
+    """Видят ли другие процессы записи кэша NOTES_CACHE_ALIAS."""
+    return not isinstance(get_cache(), LocMemCache)
+
+
+def version_key(author_id):
+    return f'notes:version:{author_id}'
+
+
+def get_author_version(author_id):
+    """Возвращает текущую версию заметок автора."""
+    cache = get_cache()
+    key = version_key(author_id)
+    version = cache.get(key)
+    if version is None:
+        # Начинаем с метки времени, а не с единицы: если версия была
+        # вытеснена из кэша, старые страницы не оживут.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_author_version(author_id):
+    """Инвалидирует все закэшированные страницы автора."""
+    cache = get_cache()
+    try:
+        cache.incr(version_key(author_id))
+    except ValueError:
+        cache.set(version_key(author_id), time.time_ns(), timeout=None)
+
+
+def list_page_key(author_id, cursor, page_size):
+    version = get_author_version(author_id)
+    return f'notes:list:{author_id}:{version}:{page_size}:{cursor or ""}'
+
+
+def count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_list_page(key):
+    """Возвращает содержимое страницы или None и учитывает результат."""
+    content = get_cache().get(key)
+    count(HITS_KEY if content is not None else MISSES_KEY)
+    return content
+
+
+def set_list_page(key, content):
+    get_cache().set(key, content, timeout=settings.NOTES_LIST_CACHE_TIMEOUT)
+
+
+class LocalCache:
+    """Потокобезопасный LRU ограниченного размера в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, size):
+        if size < 1:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_notes = LocalCache()
+
+
+def note_key(author_id, slug):
+    version = get_author_version(author_id)
+    return f'notes:note:{author_id}:{version}:{slug}'
+
+
+def get_note(key):
+    """Заметка из локального LRU или общего кэша, либо None.
+
+    Возвращается копия: представления меняют объект (форма
+    редактирования записывает в него введённые данные).
+    """
+    note = local_notes.get(key)
+    if note is None:
+        note = get_cache().get(key)
+        if note is not None:
+            local_notes.set(key, note, settings.NOTES_OBJECT_CACHE_SIZE)
+    count(NOTE_HITS_KEY if note is not None else NOTE_MISSES_KEY)
+    return copy.copy(note) if note is not None else None
+
+
+def set_note(key, note):
+    note = copy.copy(note)
+    get_cache().set(key, note, timeout=settings.NOTES_OBJECT_CACHE_TIMEOUT)
+    local_notes.set(key, note, settings.NOTES_OBJECT_CACHE_SIZE)
+
+
+def get_stats():
+    cache = get_cache()
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
+
+
+def get_note_stats():
+    cache = get_cache()
+    return {
+        'hits': cache.get(NOTE_HITS_KEY, 0),
+        'misses': cache.get(NOTE_MISSES_KEY, 0),
+    }
+
+
+def user_key(user_id):
+    return f'notes:user:{user_id}'
+
+
+def get_user(user_id):
+    return get_cache().get(user_key(user_id))
+
+
+def set_user(user):
+    get_cache().set(
+        user_key(user.pk), user, timeout=settings.NOTES_USER_CACHE_TIMEOUT
+    )
+
+
+def forget_user(user_id):
+    get_cache().delete(user_key(user_id))
@@ -0,0 +1,22 @@
+"""Настройка соединений SQLite.
+
+PRAGMA из SQLITE_PRAGMAS применяются к каждому новому соединению:
+WAL позволяет читать во время записи, busy_timeout ждёт освобождения
+блокировки вместо мгновенной ошибки, остальные параметры уменьшают
+число обращений к диску.
+"""
+from django.conf import settings
+
+
+def apply_pragmas(cursor, pragmas):
+    """Выполняет PRAGMA на курсоре DB-API в заданном порядке."""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик connection_created: настраивает соединения SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
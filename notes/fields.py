@@ -0,0 +1,56 @@
+"""Поле текста, которое сжимает большие значения.
+
+Значения длиннее порога (в байтах UTF-8) сжимаются zlib и хранятся
+в той же колонке как BLOB: SQLite не приводит BLOB к типу колонки,
+поэтому схема не меняется, а несжатые строки остаются как были.
+Распаковываются значения при чтении из базы, а у заметок текст
+по умолчанию отложен (NoteManager), поэтому распаковка происходит
+только при обращении к тексту.
+
+Сравнения и LIKE по сжатым значениям не работают; поиск по тексту
+идёт через индекс FTS5 (notes.search), в который пишется несжатый
+текст.
+"""
+import zlib
+
+from django.db import models
+
+COMPRESS_ABOVE = 1024
+COMPRESS_LEVEL = 6
+
+
+def compress(value, compress_above=COMPRESS_ABOVE):
+    """Строка как есть или bytes со сжатым UTF-8, если так короче."""
+    encoded = value.encode()
+    if len(encoded) <= compress_above:
+        return value
+    compressed = zlib.compress(encoded, COMPRESS_LEVEL)
+    return compressed if len(compressed) < len(encoded) else value
+
+
+def decompress(value):
+    if isinstance(value, (bytes, memoryview)):
+        return zlib.decompress(value).decode()
+    return value
+
+
+class CompressedTextField(models.TextField):
+
+    def __init__(self, *args, compress_above=COMPRESS_ABOVE, **kwargs):
+        self.compress_above = compress_above
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.compress_above != COMPRESS_ABOVE:
+            kwargs['compress_above'] = self.compress_above
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return decompress(value)
+
+    def get_db_prep_save(self, value, connection):
+        value = super().get_db_prep_save(value, connection)
+        if value is None:
+            return value
+        return compress(value, self.compress_above)
@@ -1,12 +1,17 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db.models import BigIntegerField
 
+from . import slugs
 from .models import Note
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
 
+# Действия над заметками, выбранными в списке.
+BULK_ACTIONS = (
+    ('delete', 'Удалить'),
+)
+
 
 class NoteForm(forms.ModelForm):
     """Форма для создания или обновления заметки."""
@@ -16,14 +21,70 @@ class NoteForm(forms.ModelForm):
         fields = ('title', 'text', 'slug')
 
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
+        """Обрабатывает случай, если slug не уникален.
+
+        Пустой slug не проверяется: свободный slug из заголовка подберёт
+        Note.save.
+        """
+        slug = self.cleaned_data.get('slug')
         if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
+            return slug
+        owner = slugs.find_taken(Note, slugs=[slug]).get(slug)
+        if owner is not None and owner != self.instance.pk:
             raise ValidationError(slug + WARNING)
         return slug
+
+    def validate_unique(self):
+        """Уникальность slug уже проверена в clean_slug."""
+        exclude = self._get_validation_exclusions()
+        exclude.append('slug')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as error:
+            self._update_errors(error)
+
+
+class BatchNoteForm(NoteForm):
+    """Форма для пакетного API.
+
+    Уникальность slug проверяется и свободные slug подбираются сразу для
+    всей пачки одним запросом, поэтому здесь в БД ничего не проверяется.
+    """
+
+    def clean_slug(self):
+        return self.cleaned_data.get('slug')
+
+    def validate_unique(self):
+        pass
+
+
+class BulkActionForm(forms.Form):
+    """Действие над выбранными в списке заметками и их id."""
+    action = forms.ChoiceField(choices=BULK_ACTIONS)
+    notes = forms.Field(
+        widget=forms.MultipleHiddenInput,
+        error_messages={'required': 'Выберите хотя бы одну заметку.'},
+    )
+
+    def __init__(self, *args, max_notes, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_notes = max_notes
+
+    def clean_notes(self):
+        """Уникальные id по возрастанию, не больше max_notes."""
+        try:
+            note_ids = {int(note_id) for note_id in self.cleaned_data['notes']}
+        except (TypeError, ValueError):
+            raise ValidationError('Некорректный id заметки.')
+        # id вне диапазона столбца база отвергает ошибкой, а не пустым
+        # результатом.
+        if not all(
+            0 < note_id <= BigIntegerField.MAX_BIGINT for note_id in note_ids
+        ):
+            raise ValidationError('Некорректный id заметки.')
+        if len(note_ids) > self.max_notes:
+            raise ValidationError(
+                f'За один раз можно выбрать не больше {self.max_notes} '
+                'заметок.'
+            )
+        return sorted(note_ids)
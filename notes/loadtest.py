@@ -0,0 +1,248 @@
+"""Нагрузка на WSGI-приложение виртуальными пользователями.
+
+Каждый пользователь входит через users:login и затем выполняет
+случайную смесь действий со своими заметками: список, просмотр,
+создание, правку и удаление. Запросы идут либо прямо в
+yanote.wsgi.application, либо по HTTP через локальный сервер wsgiref,
+тогда в замер попадает и разбор HTTP. CSRF-токен берётся из cookie,
+которую ставит страница с формой, как это делает браузер.
+
+Замеры - кортежи (ключ, задержка в мс, успех), где ключ - имя URL
+и метод, например 'notes:edit:post'.
+"""
+import http.client
+import io
+import random
+import threading
+import time
+from http.cookies import SimpleCookie
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode, urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.urls import reverse
+
+from . import bench
+
+# Вес действия в смеси.
+ACTIONS = {
+    'list': 40,
+    'detail': 25,
+    'create': 15,
+    'edit': 15,
+    'delete': 5,
+}
+
+# Ожидаемый статус ответа на GET и POST.
+EXPECTED = {'GET': 200, 'POST': 302}
+
+
+class WsgiTransport:
+    """Вызывает WSGI-приложение в том же процессе."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def request(self, method, path, body, headers):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace('-', '_')
+            if key != 'CONTENT_TYPE':
+                key = f'HTTP_{key}'
+            environ[key] = value
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = response_headers
+
+        result = self.application(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], content
+
+
+class HttpTransport:
+    """Отправляет запросы по HTTP на адрес сервера."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port
+
+    def request(self, method, path, body, headers):
+        connection = http.client.HTTPConnection(self.host, self.port)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.getheaders(), response.read()
+        finally:
+            connection.close()
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def serve(application):
+    """Запускает сервер wsgiref на свободном порту в фоновом потоке."""
+    server = make_server(
+        '127.0.0.1', 0, application,
+        server_class=ThreadingServer, handler_class=QuietHandler,
+    )
+    server.request_queue_size = 128
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+class VirtualUser:
+    """Сессия одного пользователя: cookie, CSRF-токен и свои заметки."""
+
+    def __init__(self, transport, username, password, slug_prefix, seed):
+        self.transport = transport
+        self.username = username
+        self.password = password
+        self.slug_prefix = slug_prefix
+        self.random = random.Random(seed)
+        self.cookies = {}
+        self.slugs = []
+        self.created = 0
+        self.samples = []
+
+    def call(self, name, method='GET', args=(), data=None):
+        """Запрос к странице name; замер попадает в samples."""
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(
+                f'{key}={value}' for key, value in self.cookies.items()
+            )
+        body = b''
+        if data is not None:
+            data = {
+                **data, 'csrfmiddlewaretoken': self.cookies.get('csrftoken')
+            }
+            body = urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        started = time.perf_counter()
+        try:
+            status, response_headers, _ = self.transport.request(
+                method, reverse(name, args=args), body, headers
+            )
+        except Exception:
+            status, response_headers = None, []
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for header, value in response_headers:
+            if header.lower() == 'set-cookie':
+                for key, morsel in SimpleCookie(value).items():
+                    self.cookies[key] = morsel.value
+        ok = status == EXPECTED[method]
+        self.samples.append((f'{name}:{method.lower()}', elapsed_ms, ok))
+        return ok
+
+    def login(self):
+        self.call('users:login')
+        return self.call('users:login', 'POST', data={
+            'username': self.username, 'password': self.password,
+        })
+
+    def form_data(self, slug):
+        return {
+            'title': f'Заметка {slug}',
+            'text': ' '.join(
+                self.random.choice(('текст', 'заметки', 'нагрузки'))
+                for _ in range(self.random.randint(5, 200))
+            ),
+            'slug': slug,
+        }
+
+    def act(self, action):
+        if action not in ('list', 'create') and not self.slugs:
+            action = 'create'
+        if action == 'list':
+            self.call('notes:list')
+        elif action == 'create':
+            self.created += 1
+            slug = f'{self.slug_prefix}-{self.created}'
+            self.call('notes:add')
+            if self.call('notes:add', 'POST', data=self.form_data(slug)):
+                self.slugs.append(slug)
+        elif action == 'detail':
+            self.call('notes:detail', args=(self.random.choice(self.slugs),))
+        elif action == 'edit':
+            slug = self.random.choice(self.slugs)
+            self.call('notes:edit', args=(slug,))
+            self.call(
+                'notes:edit', 'POST', args=(slug,),
+                data=self.form_data(slug),
+            )
+        else:
+            slug = self.slugs.pop(self.random.randrange(len(self.slugs)))
+            self.call('notes:delete', args=(slug,))
+            self.call('notes:delete', 'POST', args=(slug,), data={})
+
+    def run(self, actions):
+        """Входит и выполняет actions действий; возвращает замеры."""
+        if self.login():
+            names = list(ACTIONS)
+            weights = list(ACTIONS.values())
+            for action in self.random.choices(names, weights, k=actions):
+                self.act(action)
+        return self.samples
+
+
+def run_user(url, username, password, slug_prefix, seed, actions):
+    """Замеры одного пользователя; url - адрес сервера или None.
+
+    Функция верхнего уровня: её можно передать в пул процессов.
+    """
+    if url is None:
+        from yanote.wsgi import application
+        transport = WsgiTransport(application)
+    else:
+        transport = HttpTransport(url)
+    user = VirtualUser(transport, username, password, slug_prefix, seed)
+    return user.run(actions)
+
+
+def report(samples, elapsed):
+    """Сводка по ключам и по всем запросам: задержки, запр/с, ошибки."""
+    grouped = {}
+    for key, elapsed_ms, ok in samples:
+        grouped.setdefault(key, []).append((elapsed_ms, ok))
+    grouped['total'] = [(elapsed_ms, ok) for _, elapsed_ms, ok in samples]
+    results = {}
+    for key, rows in sorted(grouped.items()):
+        errors = sum(not ok for _, ok in rows)
+        results[key] = bench.summarize(
+            [elapsed_ms for elapsed_ms, _ in rows],
+            rps=round(len(rows) / elapsed, 1) if elapsed else 0.0,
+            errors=errors,
+            error_rate=round(errors / len(rows), 4),
+        )
+    return results
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model,
+)
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from notes import bench, sharding
+
+User = get_user_model()
+
+PAGES = {
+    'list': ('notes:list', 'notes:async_list'),
+    'detail': ('notes:detail', 'notes:async_detail'),
+    'success': ('notes:success', 'notes:async_success'),
+}
+# Страницы одной заметки: открывается первая заметка пользователя.
+NOTE_PAGES = ('detail',)
+
+
+def make_scope(path, cookie):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'cookie', cookie.encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+
+
+async def call(application, path, cookie):
+    """Выполняет один GET через ASGI-приложение и возвращает статус."""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(make_scope(path, cookie), receive, send)
+    return messages[0]['status']
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает yanote.asgi в процессе и сравнивает пропускную '
+        'способность и хвостовые задержки синхронных и асинхронных '
+        'страниц заметок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='bench-0')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument(
+            '--page', action='append', choices=PAGES,
+            help='Какие страницы сравнивать (можно повторять).',
+        )
+        parser.add_argument('-o', '--output', default='bench-asgi.json')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(
+                'Пользователь не найден: запустите seed_notes или '
+                'укажите --username.'
+            )
+        pages = options['page'] or PAGES
+        slug = sharding.notes_for(user).order_by('id').values_list(
+            'slug', flat=True
+        ).first()
+        if slug is None and set(pages) & set(NOTE_PAGES):
+            raise CommandError(
+                'У пользователя нет заметок: запустите seed_notes или '
+                'выберите --page list/success.'
+            )
+        cookie = self.login_cookie(user)
+        from yanote.asgi import application
+        results = {}
+        for page in pages:
+            args = (slug,) if page in NOTE_PAGES else ()
+            for kind, name in zip(('sync', 'async'), PAGES[page]):
+                key = f'{page}:{kind}'
+                results[key] = asyncio.run(self.load(
+                    application, reverse(name, args=args), cookie,
+                    options['requests'], options['concurrency'],
+                ))
+                self.stdout.write(
+                    f'{key:<14} {results[key]["rps"]:>9.1f} запр/с  '
+                    f'p50 {results[key]["p50_ms"]:>9.3f} мс  '
+                    f'p99 {results[key]["p99_ms"]:>9.3f} мс  '
+                    f'ошибок {results[key]["errors"]}'
+                )
+        bench.write_results(
+            options['output'], results,
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            async_db_workers=settings.NOTES_ASYNC_DB_WORKERS,
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+
+    @staticmethod
+    def login_cookie(user):
+        """Сессия пользователя без прохода через форму входа."""
+        engine = import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+    @staticmethod
+    async def load(application, path, cookie, requests, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                status = await call(application, path, cookie)
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += status >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        return bench.summarize(
+            latencies, rps=round(requests / elapsed, 1), errors=errors
+        )
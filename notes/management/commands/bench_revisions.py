@@ -0,0 +1,128 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import override_settings
+
+from notes import bench, fields, revisions
+from notes.models import Note, NoteRevision
+
+# id заметки, которого нет в каталоге: ревизии не ссылаются на заметку.
+BENCH_NOTE_ID = -1
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает хранение истории заметки при разных интервалах снимков '
+        'NOTES_REVISION_SNAPSHOT_EVERY: объём ревизий против полной копии '
+        'на каждую правку и задержку сборки ревизии. Правки пишутся в '
+        'default внутри транзакции, которая откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edits', type=int, default=1000)
+        parser.add_argument(
+            '--lines', type=int, default=300,
+            help='Строк в исходном тексте заметки.',
+        )
+        parser.add_argument(
+            '--every', type=int, action='append',
+            help='Интервал снимков (можно повторять), по умолчанию '
+                 '1, 5, 20 и 50.',
+        )
+        parser.add_argument('--reads', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('-o', '--output', default='bench-revisions.json')
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        texts = self.make_texts()
+        full_kib = round(sum(
+            len(stored_bytes(fields.compress(text))) for text in texts
+        ) / 1024, 1)
+        results = {}
+        for every in options['every'] or (1, 5, 20, 50):
+            with override_settings(NOTES_REVISION_SNAPSHOT_EVERY=every):
+                summary = self.run(texts)
+            summary['full_copies_kib'] = full_kib
+            summary['ratio'] = round(summary['storage_kib'] / full_kib, 3)
+            results[f'every:{every}'] = summary
+            self.stdout.write(
+                f'K={every:<4} ревизии {summary["storage_kib"]:>9.1f} КиБ '
+                f'({summary["ratio"]:.1%} полных копий)  сборка p50 '
+                f'{summary["p50_ms"]:>7.3f} мс  p95 '
+                f'{summary["p95_ms"]:>7.3f} мс  запросов '
+                f'{summary["max_queries"]}'
+            )
+        payload = bench.write_results(
+            options['output'], results,
+            edits=options['edits'], lines=options['lines'],
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                for line in bench.compare(json.load(previous), payload):
+                    self.stdout.write(line)
+
+    def make_texts(self):
+        """Исходный текст и его версии после каждой правки."""
+        rng = random.Random(self.options['seed'])
+
+        def line():
+            return ' '.join(
+                rng.choice(('заметка', 'текст', 'правка', 'строка', 'слово'))
+                for _ in range(rng.randint(3, 12))
+            )
+
+        lines = [line() for _ in range(self.options['lines'])]
+        texts = ['\n'.join(lines)]
+        for _ in range(self.options['edits']):
+            position = rng.randrange(len(lines))
+            action = rng.random()
+            if action < 0.6:
+                lines[position] = line()
+            elif action < 0.85 or len(lines) < 2:
+                lines.insert(position, line())
+            else:
+                del lines[position]
+            texts.append('\n'.join(lines))
+        return texts
+
+    def run(self, texts):
+        """Пишет историю правок, замеряет её размер и сборку ревизий."""
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            note = Note(pk=BENCH_NOTE_ID, title='Заметка')
+            for text in texts:
+                note.text = text
+                revisions.record([note])
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(
+                    'SELECT SUM(LENGTH(CAST(data AS BLOB))) FROM '
+                    f'{NoteRevision._meta.db_table} WHERE note_id = %s',
+                    [BENCH_NOTE_ID],
+                )
+                storage, = cursor.fetchone()
+            rng = random.Random(self.options['seed'])
+            latencies = []
+            queries = 0
+            for _ in range(self.options['reads']):
+                number = rng.randint(1, len(texts))
+                with bench.Timer() as timer:
+                    _, text = revisions.get_text(BENCH_NOTE_ID, number)
+                latencies.append(timer.elapsed_ms)
+                queries = max(queries, timer.queries)
+                if text != texts[number - 1]:
+                    raise CommandError(f'Ревизия {number} собрана неверно.')
+            transaction.set_rollback(True, using=DEFAULT_DB_ALIAS)
+        return bench.summarize(
+            latencies, storage_kib=round(storage / 1024, 1),
+            max_queries=queries,
+        )
+
+
+def stored_bytes(value):
+    return value if isinstance(value, bytes) else value.encode()
@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notes import bench
+from notes.db import apply_pragmas
+
+PROFILES = ('default', 'tuned')
+
+SCHEMA = (
+    'CREATE TABLE note ('
+    'id INTEGER PRIMARY KEY, author_id INTEGER NOT NULL, '
+    'slug TEXT NOT NULL UNIQUE, title TEXT NOT NULL, text TEXT NOT NULL)',
+    'CREATE INDEX note_author_idx ON note (author_id, id, slug, title)',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Смешанная нагрузка на отдельный файл SQLite: читатели листают '
+        'страницы заметок, писатели создают и меняют заметки. Сравнивает '
+        'настройки SQLite по умолчанию с SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--duration', type=float, default=5.0,
+            help='Длительность прогона каждого профиля, секунд.',
+        )
+        parser.add_argument('--notes', type=int, default=5000)
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument(
+            '--profile', action='append', choices=PROFILES,
+            help='Запускать только эти профили (можно повторять).',
+        )
+        parser.add_argument('-o', '--output', default='bench-sqlite.json')
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        results = {}
+        for profile in options['profile'] or PROFILES:
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / 'bench.sqlite3'
+                self.populate(path)
+                results[profile] = self.run(path, profile)
+            summary = results[profile]
+            self.stdout.write(
+                f'{profile:<8} чтений/с {summary["reads_per_s"]:>9.1f}  '
+                f'записей/с {summary["writes_per_s"]:>8.1f}  '
+                f'p99 чтения {summary["read"]["p99_ms"]:>8.3f} мс  '
+                f'p99 записи {summary["write"]["p99_ms"]:>8.3f} мс  '
+                f'блокировок {summary["locked"]}'
+            )
+        payload = bench.write_results(
+            options['output'], results,
+            readers=options['readers'],
+            writers=options['writers'],
+            duration=options['duration'],
+            pragmas=settings.SQLITE_PRAGMAS,
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                for line in bench.compare(json.load(previous), payload):
+                    self.stdout.write(line)
+
+    def connect(self, path, profile):
+        # Таймаут драйвера по умолчанию (5 с) в обоих профилях.
+        connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        if profile == 'tuned':
+            apply_pragmas(connection.cursor(), settings.SQLITE_PRAGMAS)
+        return connection
+
+    def populate(self, path):
+        connection = sqlite3.connect(path, isolation_level=None)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO note (author_id, slug, title, text) '
+            'VALUES (?, ?, ?, ?)',
+            (
+                (number % self.options['authors'], f'seed-{number}',
+                 f'Заметка {number}', 'Текст заметки ' * 20)
+                for number in range(self.options['notes'])
+            ),
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run(self, path, profile):
+        deadline = time.perf_counter() + self.options['duration']
+        reads, writes = [], []
+        locked = []
+        workers = [
+            threading.Thread(
+                target=self.reader, args=(path, profile, deadline, reads,
+                                          locked, number),
+            )
+            for number in range(self.options['readers'])
+        ] + [
+            threading.Thread(
+                target=self.writer, args=(path, profile, deadline, writes,
+                                          locked, number),
+            )
+            for number in range(self.options['writers'])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        duration = self.options['duration']
+        return {
+            'reads_per_s': round(len(reads) / duration, 1),
+            'writes_per_s': round(len(writes) / duration, 1),
+            'locked': len(locked),
+            'read': bench.summarize(reads),
+            'write': bench.summarize(writes),
+        }
+
+    def reader(self, path, profile, deadline, latencies, locked, number):
+        connection = self.connect(path, profile)
+        authors = self.options['authors']
+        author = number
+        while time.perf_counter() < deadline:
+            author = (author + 1) % authors
+            started = time.perf_counter()
+            try:
+                connection.execute(
+                    'SELECT id, slug, title FROM note WHERE author_id = ? '
+                    'ORDER BY id LIMIT 50', (author,)
+                ).fetchall()
+            except sqlite3.OperationalError:
+                locked.append(1)
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+        connection.close()
+
+    def writer(self, path, profile, deadline, latencies, locked, number):
+        connection = self.connect(path, profile)
+        authors = self.options['authors']
+        counter = 0
+        while time.perf_counter() < deadline:
+            counter += 1
+            started = time.perf_counter()
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute(
+                    'INSERT INTO note (author_id, slug, title, text) '
+                    'VALUES (?, ?, ?, ?)',
+                    (counter % authors, f'w{number}-{counter}',
+                     'Новая заметка', 'Текст'),
+                )
+                connection.execute(
+                    'UPDATE note SET title = ? WHERE id = ?',
+                    (f'Изменённая {counter}',
+                     counter % self.options['notes'] + 1),
+                )
+                connection.execute('COMMIT')
+            except sqlite3.OperationalError:
+                locked.append(1)
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+        connection.close()
@@ -0,0 +1,111 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test import Client
+from django.urls import clear_url_caches, reverse
+
+from notes import bench, sharding
+from notes.cache import get_cache, local_notes
+from notes.warmup import warm
+
+User = get_user_model()
+
+PAGES = (
+    'home', 'login', 'signup', 'list', 'detail', 'add', 'edit', 'delete',
+    'search', 'success',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет первый запрос к каждой странице после старта процесса: '
+        'с пустыми кэшами шаблонов и URL (cold) и после notes.warmup '
+        '(warm). Данные - из seed_notes; результаты сохраняются в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument(
+            '--page', action='append', choices=PAGES,
+            help='Замерять только эти страницы (можно повторять).',
+        )
+        parser.add_argument('-o', '--output', default='bench-templates.json')
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        user = User.objects.filter(username=f'{prefix}-0').first()
+        if user is None:
+            raise CommandError('Нет данных: сначала запустите seed_notes.')
+        slug = sharding.notes_for(user).values_list(
+            'slug', flat=True
+        ).first()
+        if slug is None:
+            raise CommandError(f'У {user.username} нет заметок.')
+        urls = {
+            'home': reverse('notes:home'),
+            'login': reverse('users:login'),
+            'signup': reverse('users:signup'),
+            'list': reverse('notes:list'),
+            'detail': reverse('notes:detail', args=(slug,)),
+            'add': reverse('notes:add'),
+            'edit': reverse('notes:edit', args=(slug,)),
+            'delete': reverse('notes:delete', args=(slug,)),
+            'search': reverse('notes:search') + '?q=' + prefix,
+            'success': reverse('notes:success'),
+        }
+        client = Client()
+        client.force_login(user)
+        results = {}
+        for page in options['page'] or PAGES:
+            for state, latencies in self.measure(
+                client, page, urls[page], options['repeat']
+            ).items():
+                results[f'{page}:{state}'] = bench.summarize(latencies)
+            self.stdout.write(
+                f'{page:<8} cold p50 '
+                f'{results[f"{page}:cold"]["p50_ms"]:>8.3f} мс  '
+                f'warm p50 {results[f"{page}:warm"]["p50_ms"]:>8.3f} мс'
+            )
+        payload = bench.write_results(
+            options['output'], results,
+            user=user.username, repeat=options['repeat'],
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                for line in bench.compare(json.load(previous), payload):
+                    self.stdout.write(line)
+
+    def measure(self, client, page, url, repeat):
+        """Задержки первого запроса к странице без прогрева и после него."""
+        timings = {'cold': [], 'warm': []}
+        for _ in range(repeat):
+            for state, latencies in timings.items():
+                self.reset()
+                if state == 'warm':
+                    warm()
+                with bench.Timer() as timer:
+                    response = client.get(url)
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f'{page}: ответ {response.status_code}.'
+                    )
+                latencies.append(timer.elapsed_ms)
+        return timings
+
+    @staticmethod
+    def reset():
+        """Возвращает процесс к состоянию сразу после старта."""
+        for engine in engines.all():
+            for loader in engine.engine.template_loaders:
+                if hasattr(loader, 'reset'):
+                    loader.reset()
+        clear_url_caches()
+        get_cache().clear()
+        local_notes.clear()
@@ -0,0 +1,139 @@
+import json
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notes import bench, fields
+from notes.db import apply_pragmas
+from notes.management.commands.bench_sqlite import SCHEMA
+
+LAYOUTS = ('raw', 'compressed')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает хранение текста заметок как есть и со сжатием '
+        'CompressedTextField на отдельных файлах SQLite: размер файла, '
+        'задержку чтения заметки с текстом и страницы списка без него.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=5000)
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument(
+            '--large-share', type=float, default=0.2,
+            help='Доля заметок с большим текстом (вставленным логом).',
+        )
+        parser.add_argument(
+            '--large-kib', type=int, default=64,
+            help='Размер большого текста, КиБ.',
+        )
+        parser.add_argument('--reads', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '-o', '--output', default='bench-text-storage.json'
+        )
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        texts = self.make_texts()
+        results = {}
+        for layout in LAYOUTS:
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / 'bench.sqlite3'
+                results[layout] = self.run(path, layout, texts)
+            summary = results[layout]
+            self.stdout.write(
+                f'{layout:<10} файл {summary["file_kib"]:>10.1f} КиБ  '
+                f'заметка p50 {summary["p50_ms"]:>7.3f} мс  '
+                f'p95 {summary["p95_ms"]:>7.3f} мс  список p95 '
+                f'{summary["list"]["p95_ms"]:>7.3f} мс'
+            )
+        payload = bench.write_results(
+            options['output'], results,
+            notes=options['notes'],
+            large_share=options['large_share'],
+            large_kib=options['large_kib'],
+            compress_above=fields.COMPRESS_ABOVE,
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                for line in bench.compare(json.load(previous), payload):
+                    self.stdout.write(line)
+
+    def make_texts(self):
+        """Короткие заметки и заметки со вставленным логом."""
+        rng = random.Random(self.options['seed'])
+        large_size = self.options['large_kib'] * 1024
+        texts = []
+        for _ in range(self.options['notes']):
+            if rng.random() >= self.options['large_share']:
+                texts.append('Текст заметки ' * rng.randint(1, 30))
+                continue
+            lines = []
+            size = 0
+            while size < large_size:
+                line = (
+                    f'2024-05-{rng.randint(1, 31):02d} '
+                    f'{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d} '
+                    f'{rng.choice(("INFO", "WARN", "ERROR"))} '
+                    f'worker-{rng.randint(1, 16)} request '
+                    f'{rng.getrandbits(32):08x} done in '
+                    f'{rng.randint(1, 900)} ms'
+                )
+                lines.append(line)
+                size += len(line) + 1
+            texts.append('\n'.join(lines))
+        return texts
+
+    def run(self, path, layout, texts):
+        connection = sqlite3.connect(path, isolation_level=None)
+        apply_pragmas(connection.cursor(), settings.SQLITE_PRAGMAS)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        prepare = fields.compress if layout == 'compressed' else str
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO note (author_id, slug, title, text) '
+            'VALUES (?, ?, ?, ?)',
+            (
+                (number % self.options['authors'], f'note-{number}',
+                 f'Заметка {number}', prepare(text))
+                for number, text in enumerate(texts)
+            ),
+        )
+        connection.execute('COMMIT')
+        connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        connection.execute('VACUUM')
+        file_kib = round(path.stat().st_size / 1024, 1)
+        rng = random.Random(self.options['seed'])
+        reads = []
+        pages = []
+        for _ in range(self.options['reads']):
+            note_id = rng.randint(1, len(texts))
+            started = time.perf_counter()
+            text, = connection.execute(
+                'SELECT text FROM note WHERE id = ?', (note_id,)
+            ).fetchone()
+            fields.decompress(text)
+            reads.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            connection.execute(
+                'SELECT id, slug, title FROM note WHERE author_id = ? '
+                'ORDER BY id LIMIT 50',
+                (note_id % self.options['authors'],),
+            ).fetchall()
+            pages.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        return bench.summarize(
+            reads, file_kib=file_kib, list=bench.summarize(pages)
+        )
@@ -0,0 +1,171 @@
+import json
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from notes import bench, sharding
+from notes.models import Note
+
+User = get_user_model()
+
+SCENARIOS = ('home', 'list', 'detail', 'add', 'edit', 'delete', 'login')
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет страницы заметок и вход через тестовый клиент Django '
+        'на данных seed_notes и сохраняет перцентили задержек, число '
+        'запросов и пик памяти в JSON. Профиль настроек задаётся '
+        '--settings, например yanote.settings_serve.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--memory-repeat', type=int, default=3,
+            help='Сколько запросов замерять под tracemalloc.',
+        )
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument(
+            '--scenario', action='append', choices=SCENARIOS,
+            help='Запускать только эти сценарии (можно повторять).',
+        )
+        parser.add_argument('-o', '--output', default='bench-views.json')
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        prefix = options['prefix']
+        # По закону Ципфа больше всего заметок у первого пользователя.
+        self.user = User.objects.filter(username=f'{prefix}-0').first()
+        if self.user is None:
+            raise CommandError('Нет данных: сначала запустите seed_notes.')
+        self.run_prefix = f'{prefix}-run'
+        self.slugs = list(
+            sharding.notes_for(self.user).order_by(
+                '?'
+            ).values_list('slug', flat=True)[:1000]
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+        results = {}
+        try:
+            for name in options['scenario'] or SCENARIOS:
+                prepare = getattr(self, f'prepare_{name}')
+                results[name] = self.run(prepare)
+                self.stdout.write(
+                    f'{name:<8} p50 {results[name]["p50_ms"]:>9.3f} мс  '
+                    f'p95 {results[name]["p95_ms"]:>9.3f} мс  '
+                    f'p99 {results[name]["p99_ms"]:>9.3f} мс  '
+                    f'запросов {results[name]["queries"]:>5.1f}  '
+                    f'пик {results[name]["peak_kib"]:>9.1f} КиБ'
+                )
+        finally:
+            sharding.notes_for(self.user).filter(
+                slug__startswith=self.run_prefix
+            ).delete()
+        payload = bench.write_results(
+            options['output'], results,
+            user=self.user.username,
+            user_notes=sharding.notes_for(self.user).count(),
+            notes=sum(
+                Note.objects.using(alias).count()
+                for alias in sharding.get_shards()
+            ),
+            users=User.objects.count(),
+            requests=options['requests'],
+            settings_module=settings.SETTINGS_MODULE,
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                for line in bench.compare(json.load(previous), payload):
+                    self.stdout.write(line)
+
+    def run(self, prepare):
+        """Замеряет сценарий: prepare() готовит один запрос вне замера."""
+        latencies = []
+        queries = []
+        errors = 0
+        total = self.options['warmup'] + self.options['requests']
+        for number in range(total):
+            request = prepare()
+            with bench.Timer() as timer:
+                response = request()
+            if number < self.options['warmup']:
+                continue
+            latencies.append(timer.elapsed_ms)
+            queries.append(timer.queries)
+            errors += response.status_code >= 400
+        peak = max(
+            (
+                bench.peak_memory_kib(prepare())
+                for _ in range(self.options['memory_repeat'])
+            ),
+            default=0.0,
+        )
+        return bench.summarize(
+            latencies,
+            queries=sum(queries) / len(queries) if queries else 0.0,
+            peak_kib=peak,
+            errors=errors,
+        )
+
+    def create_note(self):
+        number = self.random.getrandbits(48)
+        return Note.objects.create(
+            title='Заметка бенчмарка',
+            text='Текст заметки бенчмарка',
+            slug=f'{self.run_prefix}-{number:x}',
+            author=self.user,
+        )
+
+    def prepare_home(self):
+        url = reverse('notes:home')
+        return lambda: self.client.get(url)
+
+    def prepare_list(self):
+        url = reverse('notes:list')
+        return lambda: self.client.get(url)
+
+    def prepare_detail(self):
+        url = reverse('notes:detail', args=(self.random.choice(self.slugs),))
+        return lambda: self.client.get(url)
+
+    def prepare_add(self):
+        url = reverse('notes:add')
+        data = {
+            'title': 'Новая заметка',
+            'text': 'Текст',
+            'slug': f'{self.run_prefix}-add-{self.random.getrandbits(48):x}',
+        }
+        return lambda: self.client.post(url, data)
+
+    def prepare_edit(self):
+        note = self.create_note()
+        url = reverse('notes:edit', args=(note.slug,))
+        data = {'title': 'Изменённая', 'text': 'Новый текст',
+                'slug': note.slug}
+        return lambda: self.client.post(url, data)
+
+    def prepare_delete(self):
+        url = reverse('notes:delete', args=(self.create_note().slug,))
+        return lambda: self.client.post(url)
+
+    def prepare_login(self):
+        url = reverse('users:login')
+        data = {
+            'username': self.user.username,
+            'password': self.options['password'],
+        }
+        return lambda: Client().post(url, data)
@@ -0,0 +1,85 @@
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import sharding
+from notes.models import Note
+
+User = get_user_model()
+
+EXPORT_FIELDS = ('title', 'text', 'slug', 'author_id')
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заметки в формате JSONL, не загружая их в память.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output',
+            help='Файл для выгрузки; по умолчанию стандартный вывод.',
+        )
+        parser.add_argument(
+            '--author', help='Выгрузить только заметки этого пользователя.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из БД за один раз.',
+        )
+
+    def handle(self, *args, output, author, chunk_size, **options):
+        if chunk_size < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        author_ids = None
+        if author:
+            author_ids = list(
+                User.objects.filter(username=author).values_list(
+                    'id', flat=True
+                )
+            )
+        stream = (
+            open(output, 'w', encoding='utf-8') if output else self.stdout
+        )
+        started = time.monotonic()
+        total = 0
+        try:
+            for alias in sharding.get_shards():
+                notes = Note.objects.using(alias).order_by('id')
+                if author_ids is not None:
+                    notes = notes.filter(author_id__in=author_ids)
+                rows = notes.values(*EXPORT_FIELDS).iterator(
+                    chunk_size=chunk_size
+                )
+                total += self.write_rows(stream, rows, chunk_size)
+        finally:
+            if output:
+                stream.close()
+        elapsed = time.monotonic() - started
+        self.stderr.write(
+            f'Выгружено заметок: {total} '
+            f'({total / elapsed if elapsed else total:.0f} строк/с).'
+        )
+
+    @staticmethod
+    def write_rows(stream, rows, chunk_size):
+        """Пишет строки пачками; авторов пачки достаёт одним запросом.
+
+        Пользователи лежат в default, а заметки могут быть в другом
+        шарде, поэтому имена не берутся через JOIN.
+        """
+        written = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return written
+            usernames = dict(
+                User.objects.filter(
+                    id__in={row['author_id'] for row in chunk}
+                ).values_list('id', 'username')
+            )
+            for row in chunk:
+                row['author'] = usernames[row.pop('author_id')]
+                stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+            written += len(chunk)
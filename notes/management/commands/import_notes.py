@@ -0,0 +1,171 @@
+import json
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from notes import sharding, slugs
+from notes.models import Note
+from notes.signals import notes_saved
+
+User = get_user_model()
+
+SKIP = 'skip'
+FAIL = 'fail'
+
+
+class Command(BaseCommand):
+    help = 'Загружает заметки из JSONL пачками через bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL или "-" для stdin.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько заметок сохранять одним запросом.',
+        )
+        parser.add_argument(
+            '--on-conflict', choices=(SKIP, FAIL), default=SKIP,
+            help='Что делать с заметками, чей slug уже занят или '
+                 'некорректен.',
+        )
+
+    def handle(self, *args, path, batch_size, on_conflict, **options):
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        self.on_conflict = on_conflict
+        self.imported = self.skipped = 0
+        started = time.monotonic()
+        stream = open(path, encoding='utf-8') if path != '-' else None
+        lines = stream or sys.stdin
+        try:
+            records = self.read_records(lines)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                self.import_batch(batch)
+                self.report(started)
+        finally:
+            if stream:
+                stream.close()
+        self.report(started, final=True)
+
+    @staticmethod
+    def read_records(lines):
+        """Разбирает строки JSONL в пары (номер строки, запись)."""
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                raise CommandError(
+                    f'Строка {number}: некорректный JSON: {error}'
+                )
+            if not isinstance(record, dict) or not record.get('author'):
+                raise CommandError(f'Строка {number}: не указан автор.')
+            yield number, record
+
+    @staticmethod
+    def check_slug(slug):
+        """Ошибка проверки явного slug (символы и длина) или None."""
+        try:
+            Note._meta.get_field('slug').run_validators(slug)
+        except ValidationError as error:
+            return f'slug {slug}: {" ".join(error.messages)}'
+        return None
+
+    def skip(self, number, message):
+        """Пропускает заметку строки number или останавливает загрузку."""
+        if self.on_conflict == FAIL:
+            raise CommandError(f'Строка {number}: {message}')
+        self.skipped += 1
+
+    def build_notes(self, batch):
+        """Превращает записи пачки в заметки, отбрасывая конфликты."""
+        usernames = {record['author'] for _, record in batch}
+        authors = dict(
+            User.objects.filter(
+                username__in=usernames
+            ).values_list('username', 'id')
+        )
+        missing = usernames - authors.keys()
+        if missing:
+            raise CommandError(
+                'Нет пользователей: ' + ', '.join(sorted(missing))
+            )
+        title_field = Note._meta.get_field('title')
+        notes = []
+        for number, record in batch:
+            title = record.get('title') or title_field.get_default()
+            if len(title) > title_field.max_length:
+                title = title[:title_field.max_length]
+                self.stderr.write(
+                    f'Строка {number}: заголовок обрезан до '
+                    f'{title_field.max_length} символов.'
+                )
+            note = Note(
+                title=title,
+                text=record.get('text', ''),
+                slug=record.get('slug') or '',
+                author_id=authors[record['author']],
+            )
+            error = note.slug and self.check_slug(note.slug)
+            if error:
+                self.skip(number, error)
+                self.stderr.write(
+                    f'Строка {number}: {error} Заметка пропущена.'
+                )
+                continue
+            notes.append((number, note))
+        # Одним запросом узнаём, заняты ли явные slug, и все занятые
+        # варианты для заметок, чей slug строится из заголовка.
+        automatic = [note for _, note in notes if not note.slug]
+        taken = set(slugs.find_taken(
+            Note,
+            bases=[slugs.base_for(Note, note.title) for note in automatic],
+            slugs=[note.slug for _, note in notes if note.slug],
+        ))
+        unique_notes = []
+        for number, note in notes:
+            if not note.slug:
+                note.slug = slugs.next_free(
+                    Note, slugs.base_for(Note, note.title), taken
+                )
+            elif note.slug in taken:
+                self.skip(number, f'slug {note.slug} уже занят.')
+                continue
+            taken.add(note.slug)
+            unique_notes.append(note)
+        return unique_notes
+
+    def import_batch(self, batch):
+        with transaction.atomic():
+            notes = self.build_notes(batch)
+            try:
+                # id нужны для поискового индекса; заметки, чей slug занял
+                # параллельный импорт другого автора, не вернутся.
+                inserted = sharding.bulk_create(
+                    notes, ignore_conflicts=self.on_conflict == SKIP
+                )
+            except IntegrityError as error:
+                raise CommandError(f'Конфликт при записи пачки: {error}')
+            notes_saved(inserted)
+        self.imported += len(inserted)
+        self.skipped += len(notes) - len(inserted)
+
+    def report(self, started, final=False):
+        elapsed = time.monotonic() - started
+        rate = self.imported / elapsed if elapsed else self.imported
+        message = (
+            f'Загружено: {self.imported}, пропущено: {self.skipped} '
+            f'({rate:.0f} строк/с)'
+        )
+        if final:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(message)
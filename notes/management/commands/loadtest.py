@@ -0,0 +1,140 @@
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from notes import bench, loadtest, sharding, signals
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает yanote.wsgi.application виртуальными пользователями '
+        'в потоках или процессах: вход, список, просмотр, создание, правка '
+        'и удаление заметок. Показывает пропускную способность, '
+        'задержки p50/p95/p99 и долю ошибок по каждому URL. Нужны '
+        'пользователи из seed_notes; созданные заметки удаляются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=10,
+            help='Сколько пользователей работают одновременно.',
+        )
+        parser.add_argument(
+            '--actions', type=int, default=50,
+            help='Сколько действий выполняет каждый пользователь.',
+        )
+        parser.add_argument(
+            '--mode', choices=('thread', 'process'), default='thread',
+            help='Пользователи в потоках одного процесса или в процессах.',
+        )
+        parser.add_argument(
+            '--server', action='store_true',
+            help='Запросы по HTTP через локальный сервер wsgiref, а не '
+                 'вызовом WSGI-приложения.',
+        )
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс имён пользователей из seed_notes.',
+        )
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Не удалять созданные заметки.',
+        )
+        parser.add_argument('-o', '--output', default='loadtest.json')
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['actions'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь и действие.')
+        usernames = list(User.objects.filter(
+            username__startswith=options['prefix'] + '-'
+        ).order_by('id').values_list('username', flat=True)[
+            :options['users']
+        ])
+        if not usernames:
+            raise CommandError(
+                'Пользователи не найдены: запустите seed_notes или '
+                'укажите --prefix.'
+            )
+        run = f'load-{time.time_ns()}'
+        server = url = None
+        if options['server']:
+            from yanote.wsgi import application
+            server, url = loadtest.serve(application)
+        jobs = [
+            (url, usernames[index % len(usernames)], options['password'],
+             f'{run}-{index}', options['seed'] + index, options['actions'])
+            for index in range(options['users'])
+        ]
+        try:
+            samples, elapsed = self.load(jobs, options['mode'])
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            if not options['keep']:
+                self.cleanup(usernames, run)
+        results = loadtest.report(samples, elapsed)
+        for key, summary in results.items():
+            self.stdout.write(
+                f'{key:<22} {summary["count"]:>6} запр.  '
+                f'{summary["rps"]:>8.1f} запр/с  '
+                f'p50 {summary["p50_ms"]:>8.2f}  '
+                f'p95 {summary["p95_ms"]:>8.2f}  '
+                f'p99 {summary["p99_ms"]:>8.2f} мс  '
+                f'ошибок {summary["error_rate"]:.2%}'
+            )
+        payload = bench.write_results(
+            options['output'], results,
+            users=options['users'], actions=options['actions'],
+            mode=options['mode'],
+            transport='server' if options['server'] else 'wsgi',
+            elapsed_s=round(elapsed, 3),
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                for line in bench.compare(json.load(previous), payload):
+                    self.stdout.write(line)
+
+    @staticmethod
+    def load(jobs, mode):
+        """Запускает пользователей; возвращает все замеры и время, с."""
+        if mode == 'process':
+            # Дочерние процессы не должны делить соединения с родителем.
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                max_workers=len(jobs),
+                mp_context=multiprocessing.get_context('fork'),
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=len(jobs))
+        started = time.perf_counter()
+        with executor:
+            futures = [
+                executor.submit(loadtest.run_user, *job) for job in jobs
+            ]
+            samples = [
+                sample for future in futures for sample in future.result()
+            ]
+        return samples, time.perf_counter() - started
+
+    @staticmethod
+    def cleanup(usernames, run):
+        """Удаляет заметки, которые пользователи не успели удалить."""
+        for user in User.objects.filter(username__in=usernames):
+            with signals.deferred():
+                sharding.notes_for(user).filter(
+                    slug__startswith=run + '-'
+                ).delete()
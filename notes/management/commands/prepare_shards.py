@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notes import sharding
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит базу к новому шарду в NOTES_SHARDS. Запускается с новыми '
+        'настройками после migrate --database нового шарда и до '
+        'перезапуска воркеров; повторный запуск безопасен. Закрепляет '
+        'авторов за шардом, где лежат их заметки (иначе хэш отправит их '
+        'в новый пустой шард), и заносит существующие заметки в каталог '
+        'slug, чтобы новые заметки не получили занятый id. Переносит '
+        'заметки затем rebalance_notes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько заметок заносить в каталог за один запрос.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        if not sharding.is_enabled():
+            raise CommandError('Шардирование не настроено (NOTES_SHARDS).')
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        with transaction.atomic():
+            recorded, skipped = sharding.record_shards(
+                sharding.locate_authors()
+            )
+            added = sharding.fill_catalog(batch_size)
+        for author_id in skipped:
+            self.stderr.write(
+                f'Автор {author_id}: заметки в нескольких шардах, '
+                'шард не закреплён.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Закреплено авторов: {recorded}, '
+            f'добавлено в каталог заметок: {added}.'
+        ))
@@ -0,0 +1,71 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import bench
+
+COLUMNS = ('count', 'p50_ms', 'p95_ms', 'queries', 'sql_ms', 'template_ms')
+
+
+class Command(BaseCommand):
+    help = 'Сводка лога профилирования по именам URL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(settings.NOTES_PROFILING_LOG),
+            help='Лог ProfilingMiddleware; по умолчанию NOTES_PROFILING_LOG.',
+        )
+        parser.add_argument(
+            '--sort', choices=COLUMNS, default='p95_ms',
+            help='По какой колонке сортировать URL.',
+        )
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести сводку в JSON.',
+        )
+
+    def handle(self, *args, path, sort, **options):
+        records = defaultdict(list)
+        try:
+            with open(path, encoding='utf-8') as log:
+                for line in log:
+                    record = json.loads(line)
+                    records[record['url_name'] or record['path']].append(
+                        record
+                    )
+        except FileNotFoundError:
+            raise CommandError(f'Лог {path} не найден.')
+        summary = {
+            name: self.summarize(items) for name, items in records.items()
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(summary, ensure_ascii=False))
+            return
+        self.stdout.write(
+            f'{"url":<24}' + ''.join(f'{column:>13}' for column in COLUMNS)
+        )
+        for name, row in sorted(
+                summary.items(), key=lambda item: -item[1][sort]
+        ):
+            self.stdout.write(
+                f'{name:<24}' + ''.join(
+                    f'{row[column]:>13.2f}' for column in COLUMNS
+                )
+            )
+
+    @staticmethod
+    def summarize(records):
+        def mean(key):
+            return sum(record[key] for record in records) / len(records)
+
+        latencies = [record['total_ms'] for record in records]
+        return {
+            'count': len(records),
+            'p50_ms': bench.percentile(latencies, 50),
+            'p95_ms': bench.percentile(latencies, 95),
+            'queries': mean('queries'),
+            'sql_ms': mean('sql_ms'),
+            'template_ms': mean('template_ms'),
+            'slow': sum(1 for record in records if record.get('slow')),
+        }
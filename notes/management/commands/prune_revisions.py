@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import revisions
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет старые ревизии заметок пачками. У каждой заметки '
+        'остаются последние --keep ревизий и снимок, от которого они '
+        'собираются, поэтому ревизий может остаться чуть больше.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', type=int, default=settings.NOTES_REVISIONS_KEEP,
+            help='Сколько последних ревизий оставить у заметки.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=revisions.BATCH_SIZE,
+            help='Сколько заметок обрабатывать за один набор запросов.',
+        )
+
+    def handle(self, *args, keep, batch_size, **options):
+        if keep < 1:
+            raise CommandError('Нужно оставить хотя бы одну ревизию.')
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        # Заметки, у которых ревизий больше keep.
+        note_ids = revisions.revisions().filter(number__gt=keep).values_list(
+            'note_id', flat=True
+        ).distinct().order_by('note_id')
+        deleted = 0
+        last_id = None
+        while True:
+            batch = note_ids
+            if last_id is not None:
+                batch = batch.filter(note_id__gt=last_id)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            deleted += revisions.prune(batch, keep)
+            last_id = batch[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено ревизий: {deleted}.'
+        ))
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from notes import cache, search, sharding
+from notes.models import Note
+from notes.signals import authors_changed, muted
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит заметки авторов между шардами пачками, не загружая их '
+        'в память целиком. Без --to автор переезжает в шард по хэшу: так '
+        'заметки распределяются после добавления шарда в NOTES_SHARDS '
+        'и запуска prepare_shards. '
+        'Запись в шард переключается после копирования; изменения, '
+        'сделанные во время копирования, докопируются, но правки в новом '
+        'шарде в эти секунды могут быть перезаписаны. Нужен общий для '
+        'всех процессов кэш NOTES_CACHE_ALIAS: иначе воркеры продолжат '
+        'писать в старый шард, из которого удалены заметки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author', action='append',
+            help='Переносить только этого пользователя (можно повторять).',
+        )
+        parser.add_argument('--to', help='Шард назначения.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько заметок копировать за один запрос.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, кто и куда переедет.',
+        )
+
+    def handle(self, *args, author, to, batch_size, dry_run, **options):
+        if not sharding.is_enabled():
+            raise CommandError('Шардирование не настроено (NOTES_SHARDS).')
+        if to is not None and to not in sharding.get_shards():
+            raise CommandError(f'Нет шарда {to}.')
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        if not dry_run and not cache.is_shared():
+            raise CommandError(
+                'Кэш NOTES_CACHE_ALIAS живёт в памяти процесса: воркеры не '
+                'узнают о новом шарде автора. Настройте общий кэш, '
+                'например YANOTE_FILE_CACHE_DIR.'
+            )
+        misplaced = [
+            author_id
+            for author_id, aliases in sharding.locate_authors().items()
+            if sharding.db_for_author(author_id) not in aliases
+        ]
+        if misplaced:
+            raise CommandError(
+                f'Заметки авторов ({len(misplaced)}, например id '
+                f'{misplaced[0]}) лежат не в их шарде: после добавления '
+                'шарда сначала запустите prepare_shards.'
+            )
+        authors = User.objects.order_by('id')
+        if author:
+            authors = authors.filter(username__in=author)
+        moved_authors = 0
+        for author_id, username in authors.values_list(
+            'id', 'username'
+        ).iterator():
+            source = sharding.db_for_author(author_id)
+            target = to or sharding.hash_shard(author_id)
+            if source == target:
+                continue
+            moved_authors += 1
+            if dry_run:
+                self.stdout.write(f'{username}: {source} -> {target}')
+                continue
+            moved = self.move(author_id, source, target, batch_size)
+            self.stdout.write(
+                f'{username}: {source} -> {target}, заметок: {moved}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Авторов к переносу: {moved_authors}.' if dry_run
+            else f'Перенесено авторов: {moved_authors}.'
+        ))
+
+    def move(self, author_id, source, target, batch_size):
+        """Копирует заметки автора, переключает шард и чистит старый."""
+        started = timezone.now()
+        notes = Note.objects.using(source).with_text().filter(
+            author_id=author_id
+        )
+        copied = self.copy(notes, target, batch_size)
+        sharding.set_shard(author_id, target)
+        # Пока шли копии, автор писал в старый шард.
+        last_id = max(copied, default=0)
+        copied.update(self.copy(
+            notes.filter(Q(id__gt=last_id) | Q(modified__gte=started)),
+            target, batch_size, replace=True,
+        ))
+        remaining = set(notes.values_list('id', flat=True))
+        self.delete(target, sorted(copied - remaining), batch_size)
+        self.delete(source, sorted(remaining), batch_size)
+        authors_changed([author_id])
+        return len(remaining)
+
+    @staticmethod
+    def copy(notes, target, batch_size, replace=False):
+        """Копирует заметки пачками по id; возвращает id копий.
+
+        id заметок уникальны во всех шардах (их выдаёт каталог NoteSlug),
+        поэтому копия сохраняет id и адреса страниц не меняются.
+        """
+        copied = set()
+        last_id = 0
+        while True:
+            batch = list(notes.filter(id__gt=last_id).order_by('id')[
+                :batch_size
+            ])
+            if not batch:
+                return copied
+            ids = [note.pk for note in batch]
+            with transaction.atomic(using=target), muted():
+                if replace:
+                    Note.objects.using(target).filter(pk__in=ids).delete()
+                Note.objects.using(target).bulk_create(batch)
+                search.index_notes(batch)
+            copied.update(ids)
+            last_id = ids[-1]
+
+    @staticmethod
+    def delete(using, note_ids, batch_size):
+        """Удаляет копии; slug в каталоге и история остаются (muted)."""
+        for start in range(0, len(note_ids), batch_size):
+            chunk = note_ids[start:start + batch_size]
+            with transaction.atomic(using=using), muted():
+                Note.objects.using(using).filter(pk__in=chunk).delete()
+                search.unindex_notes(chunk, using)
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notes import search, sharding
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс заметок с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько заметок индексировать за один проход.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        if not search.is_supported():
+            raise CommandError('Поисковый индекс доступен только для SQLite.')
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        total = 0
+        for alias in sharding.get_shards():
+            total += self.rebuild(alias, batch_size, total)
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен, заметок: {total}.'
+        ))
+
+    def rebuild(self, using, batch_size, total):
+        """Перестраивает индекс одного шарда."""
+        notes = Note.objects.using(using).only(
+            'id', 'author_id', 'title', 'text'
+        ).order_by('id')
+        indexed = 0
+        last_id = 0
+        with transaction.atomic(using=using):
+            search.clear(using)
+            while True:
+                batch = list(notes.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                search.index_notes(batch, replace=False)
+                indexed += len(batch)
+                last_id = batch[-1].id
+                self.stdout.write(
+                    f'Проиндексировано заметок: {total + indexed}'
+                )
+            search.optimize(using)
+        return indexed
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from notes import markup, sharding, signals
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит HTML текста заметок, у которых его ещё нет (после '
+        'миграции, import_notes или seed_notes). Пачки рендерятся '
+        'параллельно в процессах, а записываются в базу по одной. '
+        'Заметку, изменённую во время рендера, команда не трогает: '
+        'её HTML уже построил save().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько заметок рендерить и записывать за раз.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Процессы для рендера; 1 - без пула процессов.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перерисовать все заметки, например после изменения '
+                 'правил рендера.',
+        )
+
+    def handle(self, *args, batch_size, workers, force, **options):
+        if batch_size < 1 or workers < 1:
+            raise CommandError(
+                'Размер пачки и число процессов должны быть положительными.'
+            )
+        executor = None
+        # Демоническим процессам (например, воркерам test --parallel)
+        # нельзя заводить дочерние: рисуем в текущем процессе.
+        if workers > 1 and not multiprocessing.current_process().daemon:
+            # Дочерние процессы не должны делить соединения с родителем.
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('fork'),
+            )
+        total = 0
+        try:
+            for alias in sharding.get_shards():
+                total += self.render(
+                    alias, executor, batch_size, workers, force
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Отрендерено заметок: {total}.'
+        ))
+
+    def render(self, using, executor, batch_size, workers, force):
+        """Рендерит заметки шарда; за проход - workers пачек."""
+        notes = Note.objects.using(using).order_by('id')
+        if not force:
+            notes = notes.filter(text_hash='')
+        rendered = 0
+        last_id = 0
+        while True:
+            batches = []
+            for _ in range(workers):
+                batch = list(notes.filter(id__gt=last_id).values_list(
+                    'id', 'text', 'text_hash', 'author_id'
+                )[:batch_size])
+                if not batch:
+                    break
+                batches.append(batch)
+                last_id = batch[-1][0]
+            if not batches:
+                return rendered
+            rows = [
+                [(note_id, text) for note_id, text, _, _ in batch]
+                for batch in batches
+            ]
+            results = (executor.map if executor else map)(
+                markup.render_rows, rows
+            )
+            for batch, result in zip(batches, results):
+                rendered += self.save(using, batch, result)
+            self.stdout.write(f'Отрендерено заметок: {rendered}')
+
+    @staticmethod
+    def save(using, batch, result):
+        """Записывает HTML заметок, чей хэш не изменился после чтения."""
+        read = {
+            note_id: (text_hash, author_id)
+            for note_id, _, text_hash, author_id in batch
+        }
+        with transaction.atomic(using=using):
+            current = dict(Note.objects.using(using).filter(
+                pk__in=read
+            ).values_list('id', 'text_hash'))
+            notes = [
+                Note(pk=note_id, text_html=html, text_hash=text_hash)
+                for note_id, html, text_hash in result
+                if current.get(note_id) == read[note_id][0]
+            ]
+            Note.objects.using(using).bulk_update(
+                notes, fields=('text_html', 'text_hash')
+            )
+        # Кэш страниц заметок хранит объекты со старым HTML.
+        signals.authors_changed({read[note.pk][1] for note in notes})
+        return len(notes)
@@ -0,0 +1,153 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notes import sharding
+from notes.models import Note
+
+User = get_user_model()
+
+WORDS = (
+    'заметка', 'список', 'покупки', 'работа', 'идея', 'встреча', 'план',
+    'отчёт', 'книга', 'фильм', 'рецепт', 'поездка', 'звонок', 'задача',
+)
+
+
+TEXT_POOL_SIZE = 1000
+
+
+def skewed_counts(total, users, skew):
+    """Распределяет total заметок между users по закону Ципфа."""
+    weights = [1 / (rank ** skew) for rank in range(1, users + 1)]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    for index in range(total - sum(counts)):
+        counts[index % users] += 1
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт пользователей и заметки для бенчмарков; число заметок '
+        'на пользователя распределено неравномерно (по Ципфу).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--notes', type=int, default=1_000_000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель Ципфа: чем больше, тем сильнее перекос.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс имён пользователей и slug заметок.',
+        )
+        parser.add_argument(
+            '--password', default='bench-password',
+            help='Пароль всех создаваемых пользователей.',
+        )
+        parser.add_argument('--text-size', type=int, default=400)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--no-index', action='store_true',
+            help='Не перестраивать поисковый индекс после загрузки.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        if options['notes'] < 0:
+            raise CommandError('Число заметок не может быть отрицательным.')
+        if User.objects.filter(
+                username__startswith=options['prefix'] + '-'
+        ).exists():
+            raise CommandError(
+                f'Данные с префиксом {options["prefix"]} уже есть.'
+            )
+        self.random = random.Random(options['seed'])
+        started = time.monotonic()
+        user_ids = self.create_users(options)
+        created = self.create_notes(user_ids, options)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, заметок: {created} '
+            f'за {elapsed:.1f} с.'
+        ))
+        if not options['no_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
+
+    def create_users(self, options):
+        # Хэш пароля считается один раз: PBKDF2 на каждого пользователя
+        # занял бы больше времени, чем вся остальная загрузка.
+        password = make_password(options['password'])
+        prefix = options['prefix']
+        usernames = [
+            f'{prefix}-{index}' for index in range(options['users'])
+        ]
+        batch_size = options['batch_size']
+        for start in range(0, len(usernames), batch_size):
+            User.objects.bulk_create(
+                User(username=username, password=password)
+                for username in usernames[start:start + batch_size]
+            )
+        ids = dict(
+            User.objects.filter(
+                username__startswith=prefix + '-'
+            ).values_list('username', 'id')
+        )
+        return [ids[username] for username in usernames]
+
+    def make_text(self, size):
+        words = []
+        length = 0
+        while length < size:
+            word = self.random.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return ' '.join(words)
+
+    def create_notes(self, user_ids, options):
+        counts = skewed_counts(
+            options['notes'], len(user_ids), options['skew']
+        )
+        prefix = options['prefix']
+        # Готовый набор текстов разной длины: генерировать каждый текст
+        # заново для миллиона заметок слишком долго.
+        texts = [
+            self.make_text(self.random.randint(1, options['text_size'] * 2))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        batch = []
+        created = 0
+        for user_index, (user_id, count) in enumerate(zip(user_ids, counts)):
+            for number in range(count):
+                batch.append(Note(
+                    title=' '.join(self.random.sample(WORDS, 3)),
+                    text=self.random.choice(texts),
+                    slug=f'{prefix}-{user_index}-{number}',
+                    author_id=user_id,
+                ))
+                if len(batch) >= options['batch_size']:
+                    created += self.flush(batch)
+            if user_index % 1000 == 0:
+                self.stdout.write(
+                    f'Заметок: {created + len(batch)}', ending='\r'
+                )
+        created += self.flush(batch)
+        self.stdout.write('')
+        return created
+
+    @staticmethod
+    def flush(batch):
+        with transaction.atomic():
+            sharding.bulk_create(batch, fetch_ids=False)
+        count = len(batch)
+        batch.clear()
+        return count
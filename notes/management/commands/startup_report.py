@@ -0,0 +1,98 @@
+import json
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import bench, startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает manage.py, yanote.wsgi и yanote.asgi под -X importtime '
+        'и показывает время старта, число модулей и самые медленные '
+        'импорты. Профиль настроек задаётся --settings, например '
+        'yanote.settings_serve; --check сверяет старт с '
+        'NOTES_STARTUP_BUDGET.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', choices=tuple(startup.TARGETS),
+            help='Замерять только эту точку входа (можно повторять).',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Сколько самых медленных импортов показать.',
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Ошибка, если старт выходит за NOTES_STARTUP_BUDGET.',
+        )
+        parser.add_argument('-o', '--output', default='startup.json')
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('Число запусков должно быть положительным.')
+        results = {}
+        for target in options['target'] or startup.TARGETS:
+            # Первый запуск компилирует .pyc и в замер не идёт.
+            startup.measure(target)
+            runs = [
+                startup.measure(target) for _ in range(options['repeat'])
+            ]
+            _, imports, modules = runs[-1]
+            results[target] = bench.summarize(
+                [elapsed_ms for elapsed_ms, _, _ in runs],
+                modules=len(modules),
+                import_ms=round(statistics.median(
+                    startup.import_ms(run_imports)
+                    for _, run_imports, _ in runs
+                ), 3),
+            )
+            self.report(target, results[target], imports, options['top'])
+        payload = bench.write_results(
+            options['output'], results,
+            settings_module=settings.SETTINGS_MODULE,
+            repeat=options['repeat'],
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                for line in bench.compare(json.load(previous), payload):
+                    self.stdout.write(line)
+        if options['check']:
+            self.check_budget(results)
+
+    def report(self, target, result, imports, top):
+        self.stdout.write(
+            f'{target}: старт p50 {result["p50_ms"]:.1f} мс, импорты '
+            f'{result["import_ms"]:.1f} мс, модулей {result["modules"]}'
+        )
+        for name, _, own, cumulative in startup.slowest(imports, top):
+            self.stdout.write(
+                f'  {cumulative / 1000:>9.1f} мс  {own / 1000:>7.1f} мс  '
+                f'{name}'
+            )
+
+    def check_budget(self, results):
+        budget = settings.NOTES_STARTUP_BUDGET
+        exceeded = [
+            f'{target}: модулей {result["modules"]} > {budget["modules"]}'
+            for target, result in results.items()
+            if result['modules'] > budget['modules']
+        ] + [
+            f'{target}: старт {result["p50_ms"]:.1f} мс > '
+            f'{budget["wall_ms"]} мс'
+            for target, result in results.items()
+            if result['p50_ms'] > budget['wall_ms']
+        ]
+        if exceeded:
+            raise CommandError(
+                'Старт вышел за бюджет: ' + '; '.join(exceeded)
+            )
+        self.stdout.write(self.style.SUCCESS('Старт укладывается в бюджет.'))
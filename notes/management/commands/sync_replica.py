@@ -0,0 +1,61 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик через backup API. '
+        'С --interval повторяет копирование, пока не прервут.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Псевдонимы реплик, по умолчанию NOTES_REPLICAS.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Пауза между копированиями, секунд; 0 - скопировать раз.',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=-1,
+            help='Страниц за шаг backup; -1 - всё за один шаг.',
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.NOTES_REPLICAS
+        if not aliases:
+            raise CommandError('Реплики не настроены (NOTES_REPLICAS).')
+        source = connections[DEFAULT_DB_ALIAS]
+        for alias in (DEFAULT_DB_ALIAS, *aliases):
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'База {alias} не SQLite.')
+        while True:
+            source.ensure_connection()
+            for alias in aliases:
+                started = time.perf_counter()
+                self.copy(
+                    source.connection, connections[alias], options['pages']
+                )
+                self.stdout.write(
+                    f'{alias}: {(time.perf_counter() - started) * 1000:.1f} мс'
+                )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def copy(self, source, replica, pages):
+        # Копия пишется в тот же файл: открытые соединения реплики
+        # увидят новые данные при следующем чтении.
+        target = sqlite3.connect(
+            replica.settings_dict['NAME'],
+            timeout=settings.SQLITE_PRAGMAS.get('busy_timeout', 5000) / 1000,
+        )
+        try:
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
@@ -0,0 +1,76 @@
+"""Markdown в тексте заметок.
+
+HTML текста рендерится при сохранении заметки и хранится рядом
+с текстом (Note.text_html) вместе с хэшем исходника (Note.text_hash):
+страница заметки отдаёт готовый HTML, а рендер повторяется, только
+когда хэш текста изменился. Заметки с пустым хэшем ещё не
+отрендерены: их HTML строит команда render_notes, а до этого страница
+показывает текст как есть.
+
+Markdown пропускает HTML из исходника как есть, поэтому результат
+очищается bleach: остаются только теги разметки из ALLOWED_TAGS и
+ссылки с безопасными схемами. Оба пакета импортируются при первом
+рендере, а не при старте процесса.
+"""
+import hashlib
+
+# При изменении правил рендера увеличить: render_notes --force
+# перерисует все заметки, а новые хэши не совпадут со старыми.
+RENDER_VERSION = 1
+
+MARKDOWN_EXTENSIONS = ('fenced_code', 'tables', 'sane_lists')
+
+ALLOWED_TAGS = (
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'del', 'em', 'h1', 'h2',
+    'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'li', 'ol', 'p', 'pre', 'strong',
+    'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+)
+ALLOWED_ATTRIBUTES = {
+    'a': ('href', 'title'),
+    'abbr': ('title',),
+    'td': ('align',),
+    'th': ('align',),
+}
+ALLOWED_PROTOCOLS = ('http', 'https', 'mailto')
+
+
+def source_hash(text):
+    """Хэш текста и версии рендера: 32 шестнадцатеричных символа."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{RENDER_VERSION}\n'.encode())
+    digest.update(text.encode())
+    return digest.hexdigest()
+
+
+def render(text):
+    """Очищенный HTML из Markdown."""
+    import bleach
+    import markdown
+    html = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+    return bleach.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True,
+    )
+
+
+def render_note(note):
+    """Перерисовывает HTML заметки, если текст изменился.
+
+    Возвращает True, если HTML обновлён.
+    """
+    text_hash = source_hash(note.text)
+    if text_hash == note.text_hash:
+        return False
+    note.text_html = render(note.text)
+    note.text_hash = text_hash
+    return True
+
+
+def render_rows(rows):
+    """[(id, текст), ...] -> [(id, HTML, хэш), ...] для пула процессов."""
+    return [
+        (note_id, render(text), source_hash(text)) for note_id, text in rows
+    ]
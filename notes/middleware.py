@@ -0,0 +1,139 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+
+from . import cache, routers
+
+logger = logging.getLogger('notes.profiling')
+
+
+class RequestProfile:
+    """Счётчики одного запроса: SQL, отрисовка шаблона и общее время."""
+
+    def __init__(self, capture_sql):
+        self.capture_sql = capture_sql
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка execute_wrapper для всех запросов к БД."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.sql_ms += elapsed
+            if self.capture_sql:
+                self.statements.append(
+                    {'sql': sql, 'ms': round(elapsed, 3), 'many': many}
+                )
+
+
+class ProfilingMiddleware:
+    """Замеряет запросы и отдаёт результаты в Server-Timing и в лог.
+
+    Включается настройкой NOTES_PROFILING; без неё Django исключает
+    middleware из цепочки при старте. Для доли запросов
+    NOTES_PROFILING_SAMPLE_RATE собираются тексты SQL, и если такой
+    запрос дольше NOTES_PROFILING_SLOW_MS, они попадают в лог.
+    Сводку по URL строит команда profiling_summary.
+    """
+
+    def __init__(self, get_response):
+        if not settings.NOTES_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.NOTES_PROFILING_SAMPLE_RATE
+        profile = RequestProfile(capture_sql=sampled)
+        request.profile = profile
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        response['Server-Timing'] = ', '.join((
+            f'sql;desc="{profile.queries} queries";dur={profile.sql_ms:.3f}',
+            f'template;dur={profile.template_ms:.3f}',
+            f'total;dur={total_ms:.3f}',
+        ))
+        self.log(request, response, profile, total_ms, sampled)
+        return response
+
+    def process_template_response(self, request, response):
+        """Засекает отрисовку TemplateResponse, которая идёт после view."""
+        profile = getattr(request, 'profile', None)
+        if profile is None:
+            return response
+        started = time.perf_counter()
+
+        def rendered(response):
+            profile.template_ms += (time.perf_counter() - started) * 1000
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def log(request, response, profile, total_ms, sampled):
+        match = request.resolver_match
+        record = {
+            'url_name': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'sql_ms': round(profile.sql_ms, 3),
+            'template_ms': round(profile.template_ms, 3),
+            'total_ms': round(total_ms, 3),
+        }
+        if sampled and total_ms >= settings.NOTES_PROFILING_SLOW_MS:
+            record['slow'] = True
+            record['sql'] = profile.statements
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+class ReplicaPinningMiddleware:
+    """Направляет запрос в основную базу, если реплика может отставать.
+
+    Это запросы, меняющие данные, и запросы автора, изменившего заметки
+    за последние NOTES_REPLICA_PIN_SECONDS секунд. Без NOTES_REPLICAS
+    middleware исключается из цепочки. Ставится после
+    AuthenticationMiddleware.
+
+    Метку ставит процесс, обработавший запись, а следующий запрос может
+    попасть в другой воркер, поэтому кэш NOTES_CACHE_ALIAS должен быть
+    общим для всех процессов.
+    """
+
+    def __init__(self, get_response):
+        if not settings.NOTES_REPLICAS:
+            raise MiddlewareNotUsed
+        if not cache.is_shared():
+            raise ImproperlyConfigured(
+                'Для реплик нужен общий для процессов кэш '
+                'NOTES_CACHE_ALIAS, а не LocMemCache: иначе другие воркеры '
+                'не видят, что автор только что писал.'
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') or (
+            request.user.is_authenticated
+            and routers.is_pinned(request.user.pk)
+        ):
+            with routers.use_primary():
+                return self.get_response(request)
+        return self.get_response(request)
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+TABLE = 'notes_note_fts'
+RANK = 'bm25(0.0, 2.0, 1.0)'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {TABLE} USING fts5(author, title, text)'
+    )
+    schema_editor.execute(
+        f"INSERT INTO {TABLE} ({TABLE}, rank) VALUES ('rank', '{RANK}')"
+    )
+    Note = apps.get_model('notes', 'Note')
+    schema_editor.execute(
+        f'INSERT INTO {TABLE} (rowid, author, title, text) '
+        f'SELECT id, author_id, title, text FROM {Note._meta.db_table}'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
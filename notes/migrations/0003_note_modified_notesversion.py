@@ -0,0 +1,35 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0002_note_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotesVersion',
+            fields=[
+                ('author', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notes_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Изменена')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменена'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='title',
+            field=models.CharField(default='Название заметки', help_text='Дайте короткое название заметке', max_length=100, verbose_name='Заголовок'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_note_modified_notesversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['author', 'id', 'slug', 'title'], name='note_author_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['author', 'slug', 'modified'], name='note_author_slug_idx'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+from django.db import migrations, models, transaction
+from django.db.models.functions import Length
+
+import notes.fields
+
+BATCH_SIZE = 500
+
+
+class StorageType(models.Func):
+    """Тип значения в SQLite: 'text' у несжатых, 'blob' у сжатых."""
+    function = 'typeof'
+    output_field = models.CharField()
+
+
+def convert(apps, schema_editor, stored, transform, min_length=0):
+    """Переписывает заметки с типом хранения stored пачками по id.
+
+    Значение пишется в базу как есть, мимо поля модели: в обе стороны
+    RunPython получает состояние, где текст - CompressedTextField,
+    и bulk_update снова сжал бы его при обратной миграции. Каждая
+    пачка - отдельная транзакция, поэтому прерванную миграцию можно
+    запустить снова: готовые строки уже не подходят под фильтр.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    using = connection.alias
+    Note = apps.get_model('notes', 'Note')
+    rows = Note._base_manager.db_manager(using).annotate(
+        stored=StorageType('text'), size=Length('text')
+    ).filter(stored=stored, size__gt=min_length).order_by('id')
+    update = 'UPDATE {} SET {} = %s WHERE {} = %s'.format(
+        *map(connection.ops.quote_name, (Note._meta.db_table, 'text', 'id'))
+    )
+    last_id = 0
+    while True:
+        batch = list(
+            rows.filter(id__gt=last_id).values_list('id', 'text')[
+                :BATCH_SIZE
+            ]
+        )
+        if not batch:
+            return
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.executemany(update, [
+                (transform(text), note_id) for note_id, text in batch
+            ])
+        last_id = batch[-1][0]
+
+
+def compress_texts(apps, schema_editor):
+    # Больше порога в байтах UTF-8 бывают только строки длиннее
+    # четверти порога в символах.
+    convert(
+        apps, schema_editor, 'text', notes.fields.compress,
+        notes.fields.COMPRESS_ABOVE // 4,
+    )
+
+
+def decompress_texts(apps, schema_editor):
+    convert(apps, schema_editor, 'blob', notes.fields.decompress)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('notes', '0005_note_shards'),
+    ]
+
+    operations = [
+        # Колонка остаётся TEXT: сжатые значения SQLite хранит как BLOB.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='note',
+                    name='text',
+                    field=notes.fields.CompressedTextField(
+                        help_text='Добавьте подробностей',
+                        verbose_name='Текст',
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(compress_texts, decompress_texts),
+    ]
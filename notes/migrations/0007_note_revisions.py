@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:21
+
+from django.db import migrations, models
+import django.utils.timezone
+import notes.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0006_compress_note_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note_id', models.BigIntegerField(verbose_name='Заметка')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер')),
+                ('snapshot', models.PositiveIntegerField(verbose_name='Номер снимка')),
+                ('title', models.CharField(max_length=100, verbose_name='Заголовок')),
+                ('data', notes.fields.CompressedTextField(verbose_name='Текст или разность')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создана')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='noterevision',
+            constraint=models.UniqueConstraint(fields=('note_id', 'number'), name='note_revision_unique'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:43
+
+from django.db import migrations, models
+import notes.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0007_note_revisions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='text_hash',
+            field=models.CharField(default='', editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='text_html',
+            field=notes.fields.CompressedTextField(default='', editable=False),
+        ),
+    ]
@@ -1,7 +1,31 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 
-from pytils.translit import slugify
+from . import markup, sharding, slugs
+from .fields import CompressedTextField
+
+# Сколько раз подбирать slug заново, если его заняла параллельная вставка.
+SLUG_ATTEMPTS = 5
+
+
+class NoteQuerySet(models.QuerySet):
+
+    def with_text(self):
+        """Заметки вместе с текстом; снимает и другие defer()/only()."""
+        return self.defer(None)
+
+
+class NoteManager(models.Manager.from_queryset(NoteQuerySet)):
+    """Текст заметок и его HTML по умолчанию не читаются.
+
+    Текст бывает большим и сжатым, а нужен только страницам, которые его
+    показывают: они запрашивают его через with_text().
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer('text', 'text_html')
 
 
 class Note(models.Model):
@@ -11,10 +35,13 @@ class Note(models.Model):
         default='Название заметки',
         help_text='Дайте короткое название заметке'
     )
-    text = models.TextField(
+    text = CompressedTextField(
         'Текст',
         help_text='Добавьте подробностей'
     )
+    # HTML текста и хэш исходника, по которому он отрендерен (markup).
+    text_html = CompressedTextField(default='', editable=False)
+    text_hash = models.CharField(max_length=32, default='', editable=False)
     slug = models.SlugField(
         'Адрес для страницы с заметкой',
         max_length=100,
@@ -23,16 +50,183 @@ class Note(models.Model):
         help_text=('Укажите адрес для страницы заметки. Используйте только '
                    'латиницу, цифры, дефисы и знаки подчёркивания')
     )
+    # Без ограничения в БД: при шардировании заметки лежат не в той
+    # базе, что пользователи.
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_constraint=False,
     )
+    modified = models.DateTimeField('Изменена', auto_now=True)
+
+    objects = NoteManager()
+
+    class Meta:
+        indexes = (
+            # Покрывающий индекс для списка: (author, id) и поля шаблона.
+            models.Index(
+                fields=('author', 'id', 'slug', 'title'),
+                name='note_author_list_idx',
+            ),
+            # Заметка автора по slug и валидатор для условных запросов.
+            models.Index(
+                fields=('author', 'slug', 'modified'),
+                name='note_author_slug_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def slugify_title(cls, title):
+        """Строит slug из заголовка с учётом длины поля."""
+        # pytils нужен только при создании заметок, не при старте процесса.
+        from pytils.translit import slugify
+        max_slug_length = cls._meta.get_field('slug').max_length
+        return slugify(title)[:max_slug_length]
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """Без slug подбирает свободный: slug, slug-2, slug-3...
+
+        HTML текста перерисовывается, только если текст изменился.
+        """
+        self.render_text(kwargs)
+        if self.slug:
+            return self.save_to_shard(*args, **kwargs)
+        for attempt in range(1, SLUG_ATTEMPTS + 1):
+            self.slug = slugs.allocate_slug(
+                type(self), self.title, exclude_pk=self.pk
+            )
+            try:
+                with transaction.atomic(using=kwargs.get('using')):
+                    return self.save_to_shard(*args, **kwargs)
+            except IntegrityError:
+                # Повторяем, только если slug успели занять между
+                # подбором и вставкой.
+                slug_taken = sharding.slug_owners(type(self)).filter(
+                    slug=self.slug
+                ).exclude(pk=self.pk).exists()
+                self.slug = ''
+                if attempt == SLUG_ATTEMPTS or not slug_taken:
+                    raise
+
+    def render_text(self, save_kwargs):
+        """Обновляет HTML перед сохранением; отложенный текст не менялся."""
+        update_fields = save_kwargs.get('update_fields')
+        if update_fields is not None and 'text' not in update_fields:
+            return
+        if 'text' in self.get_deferred_fields():
+            return
+        if markup.render_note(self) and update_fields is not None:
+            save_kwargs['update_fields'] = {
+                *update_fields, 'text_html', 'text_hash'
+            }
+
+    def save_to_shard(self, *args, **kwargs):
+        """При шардировании сначала занимает slug в каталоге NoteSlug."""
+        if not sharding.is_enabled():
+            return super().save(*args, **kwargs)
+        # Заметка всегда пишется в шард автора, в том числе из
+        # Note.objects.create(), который передаёт базу менеджера.
+        kwargs['using'] = sharding.db_for_author(self.author_id)
+        adding = self.pk is None
+        undo = sharding.claim_slug(self)
+        if adding:
+            # id выдан каталогом, UPDATE перед вставкой не нужен.
+            kwargs['force_insert'] = True
+        try:
+            return super().save(*args, **kwargs)
+        except BaseException:
+            undo()
+            raise
+
+
+class NotesVersion(models.Model):
+    """Версия содержимого заметок автора.
+
+    Увеличивается при каждом изменении или удалении заметки автора и
+    служит валидатором для условных запросов к списку заметок.
+    """
+    # Без ограничения в БД: версия может быть увеличена уже после
+    # каскадного удаления автора вместе с его заметками.
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_constraint=False,
+        related_name='notes_version',
+    )
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    modified = models.DateTimeField('Изменена', default=timezone.now)
+
+    @classmethod
+    def bump(cls, author_id):
+        """Увеличивает версию заметок автора."""
+        now = timezone.now()
+        updated = cls.objects.filter(author_id=author_id).update(
+            version=F('version') + 1, modified=now
+        )
+        if not updated:
+            cls.objects.get_or_create(
+                author_id=author_id,
+                defaults={'version': 1, 'modified': now},
+            )
+
+
+class NoteSlug(models.Model):
+    """Каталог slug заметок всех шардов.
+
+    Ведётся в default только при шардировании: уникальный slug
+    занимается здесь до записи заметки в шард, а id строки становится
+    id заметки.
+    """
+    slug = models.SlugField(max_length=100, unique=True)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='+',
+    )
+
+    def __str__(self):
+        return self.slug
+
+
+class AuthorShard(models.Model):
+    """Шард автора, если он отличается от шарда по хэшу."""
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_constraint=False,
+        related_name='notes_shard',
+    )
+    alias = models.CharField('База', max_length=100)
+
+
+class NoteRevision(models.Model):
+    """Состояние заметки после одного сохранения.
+
+    Строка - либо полный снимок текста (snapshot == number), либо
+    разность с ближайшим предыдущим снимком (notes.revisions). Лежит
+    в default, как и другие служебные таблицы, и ссылается на заметку
+    по id: id заметок уникальны во всех шардах.
+    """
+    note_id = models.BigIntegerField('Заметка')
+    number = models.PositiveIntegerField('Номер')
+    snapshot = models.PositiveIntegerField('Номер снимка')
+    title = models.CharField('Заголовок', max_length=100)
+    data = CompressedTextField('Текст или разность')
+    created = models.DateTimeField('Создана', default=timezone.now)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note_id', 'number'), name='note_revision_unique',
+            ),
+        )
+
+    @property
+    def is_snapshot(self):
+        return self.snapshot == self.number
@@ -1,5 +1,8 @@
 import pytest
 
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
 # Импортируем класс клиента.
 from django.test.client import Client
 
@@ -7,30 +10,60 @@ from django.test.client import Client
 from notes.models import Note
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Страницы списка кэшируются: каждый тест начинается с пустого кэша.
+    cache.clear()
+
+
+def logged_in_client(user):
+    # Создаём новый экземпляр клиента, чтобы не менять глобальный.
+    client = Client()
+    client.force_login(user)  # Логиним пользователя в клиенте.
+    return client
+
+
+@pytest.fixture(scope='module')
+def module_users(django_db_setup, django_db_blocker):
+    # Пользователи и их клиенты общие для тестов модуля, как
+    # setUpTestData в TestCase: они создаются вне транзакции теста,
+    # поэтому изменения из тестов откатываются, а записи живут до конца
+    # модуля. Тесты с transaction=True очистили бы базу - их здесь нет.
+    User = get_user_model()
+    with django_db_blocker.unblock():
+        author = User.objects.create(username='Автор')
+        not_author = User.objects.create(username='Не автор')
+        users = {
+            'author': author,
+            'not_author': not_author,
+            'author_client': logged_in_client(author),
+            'not_author_client': logged_in_client(not_author),
+        }
+    yield users
+    with django_db_blocker.unblock():
+        Session.objects.all().delete()
+        User.objects.filter(pk__in=(author.pk, not_author.pk)).delete()
+
+
 @pytest.fixture
-# Используем встроенную фикстуру для модели пользователей django_user_model.
-def author(django_user_model):
-    return django_user_model.objects.create(username='Автор')
+# Фикстура db даёт тесту доступ к базе и откатывает его изменения.
+def author(db, module_users):
+    return module_users['author']
 
 
 @pytest.fixture
-def not_author(django_user_model):
-    return django_user_model.objects.create(username='Не автор')
+def not_author(db, module_users):
+    return module_users['not_author']
 
 
 @pytest.fixture
-def author_client(author):  # Вызываем фикстуру автора.
-    # Создаём новый экземпляр клиента, чтобы не менять глобальный.
-    client = Client()
-    client.force_login(author)  # Логиним автора в клиенте.
-    return client
+def author_client(db, module_users):
+    return module_users['author_client']
 
 
 @pytest.fixture
-def not_author_client(not_author):
-    client = Client()
-    client.force_login(not_author)  # Логиним обычного пользователя в клиенте.
-    return client
+def not_author_client(db, module_users):
+    return module_users['not_author_client']
 
 
 @pytest.fixture
@@ -3,6 +3,7 @@ import pytest
 from django.urls import reverse
 
 from notes.forms import NoteForm
+from notes.models import Note
 
 
 @pytest.mark.parametrize(
@@ -46,3 +47,24 @@ def test_pages_contains_form(author_client, name, args):
     assert 'form' in response.context
     # Проверяем, что объект формы относится к нужному классу.
     assert isinstance(response.context['form'], NoteForm)
+
+
+def test_notes_list_is_paginated_by_cursor(author, author_client, settings):
+    settings.NOTES_PAGE_SIZE = 2
+    notes = Note.objects.bulk_create(
+        Note(title=f'Заметка {index}', text='Текст',
+             slug=f'note-{index}', author=author)
+        for index in range(3)
+    )
+    url = reverse('notes:list')
+    response = author_client.get(url)
+    # На первой странице две заметки и курсор на следующую:
+    assert len(response.context['object_list']) == 2
+    cursor = response.context['next_cursor']
+    assert cursor is not None
+    response = author_client.get(url, {'after': cursor})
+    # Последняя заметка попала на вторую страницу, дальше страниц нет:
+    assert [note.slug for note in response.context['object_list']] == [
+        notes[-1].slug
+    ]
+    assert response.context['next_cursor'] is None
@@ -0,0 +1,188 @@
+"""История заметок: периодические снимки и разности с ними.
+
+Каждое сохранение, изменившее текст или заголовок, добавляет ревизию.
+Первая ревизия, каждая NOTES_REVISION_SNAPSHOT_EVERY-я после снимка и
+те, чья разность не короче текста, хранят полный текст; остальные -
+разность со своим снимком. Поэтому любая ревизия собирается из двух строк:
+снимка и одной разности, сколько бы правок ни было. Разность
+считается по строкам, а большие значения сжимает CompressedTextField.
+
+Ревизии читаются и пишутся в default: номер следующей ревизии нельзя
+брать с отстающей реплики.
+"""
+import difflib
+import json
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import OuterRef, Q, Subquery
+
+# Сколько заметок обрабатывать одним набором запросов.
+BATCH_SIZE = 500
+# Попытки записи, если номер ревизии занял параллельный запрос.
+RECORD_ATTEMPTS = 3
+
+
+def make_delta(base, text):
+    """Разность base -> text: JSON [[начало, конец, [строки]], ...].
+
+    Начало и конец - границы заменяемых строк base.
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, lines)
+    return json.dumps(
+        [
+            [start, end, lines[new_start:new_end]]
+            for tag, start, end, new_start, new_end
+            in matcher.get_opcodes()
+            if tag != 'equal'
+        ],
+        ensure_ascii=False,
+        separators=(',', ':'),
+    )
+
+
+def apply_delta(base, delta):
+    base_lines = base.splitlines(keepends=True)
+    result = []
+    position = 0
+    for start, end, lines in json.loads(delta):
+        result.extend(base_lines[position:start])
+        result.extend(lines)
+        position = end
+    result.extend(base_lines[position:])
+    return ''.join(result)
+
+
+def revisions():
+    from .models import NoteRevision
+    return NoteRevision.objects.using(DEFAULT_DB_ALIAS)
+
+
+def text_of(revision, base):
+    """Текст ревизии; base - её снимок."""
+    if revision.is_snapshot:
+        return revision.data
+    return apply_delta(base.data, revision.data)
+
+
+def last_number():
+    """Подзапрос: номер последней ревизии заметки из внешнего запроса."""
+    return revisions().filter(note_id=OuterRef('note_id')).order_by(
+        '-number'
+    ).values('number')[:1]
+
+
+def latest(note_ids):
+    """Последние ревизии заметок со снимками: {id: (ревизия, снимок)}."""
+    rows = list(revisions().filter(
+        note_id__in=note_ids, number=Subquery(last_number())
+    ))
+    bases = {}
+    pending = [row for row in rows if not row.is_snapshot]
+    if pending:
+        query = Q()
+        for row in pending:
+            query |= Q(note_id=row.note_id, number=row.snapshot)
+        bases = {base.note_id: base for base in revisions().filter(query)}
+    return {row.note_id: (row, bases.get(row.note_id, row)) for row in rows}
+
+
+def build(note, previous):
+    """Новая ревизия заметки или None, если текст и заголовок не менялись."""
+    from .models import NoteRevision
+    revision = NoteRevision(note_id=note.pk, title=note.title)
+    if previous is None:
+        revision.number = revision.snapshot = 1
+        revision.data = note.text
+        return revision
+    last, base = previous
+    if last.title == note.title and text_of(last, base) == note.text:
+        return None
+    revision.number = last.number + 1
+    if revision.number - base.number < settings.NOTES_REVISION_SNAPSHOT_EVERY:
+        delta = make_delta(base.data, note.text)
+        if len(delta) < len(note.text):
+            revision.snapshot = base.number
+            revision.data = delta
+            return revision
+    revision.snapshot = revision.number
+    revision.data = note.text
+    return revision
+
+
+def record(notes):
+    """Добавляет ревизии сохранённых заметок."""
+    notes = list(notes)
+    for start in range(0, len(notes), BATCH_SIZE):
+        chunk = {note.pk: note for note in notes[start:start + BATCH_SIZE]}
+        for attempt in range(1, RECORD_ATTEMPTS + 1):
+            previous = latest(list(chunk))
+            new = [
+                revision for revision in (
+                    build(note, previous.get(note_id))
+                    for note_id, note in chunk.items()
+                )
+                if revision is not None
+            ]
+            try:
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    revisions().bulk_create(new)
+                break
+            except IntegrityError:
+                if attempt == RECORD_ATTEMPTS:
+                    raise
+
+
+def get_text(note_id, number):
+    """Текст и заголовок ревизии number: не больше двух строк из базы."""
+    revision = revisions().get(note_id=note_id, number=number)
+    base = revision
+    if not revision.is_snapshot:
+        base = revisions().get(note_id=note_id, number=revision.snapshot)
+    return revision.title, text_of(revision, base)
+
+
+def forget(note_ids):
+    """Удаляет историю удалённых заметок."""
+    note_ids = list(note_ids)
+    if note_ids:
+        revisions().filter(note_id__in=note_ids).delete()
+
+
+def prune(note_ids, keep):
+    """Оставляет у заметок последние keep ревизий и их снимки.
+
+    Ревизии удаляются только до снимка, от которого собираются
+    оставшиеся, поэтому их можно прочитать и после очистки.
+    Возвращает число удалённых строк.
+    """
+    cutoffs = Q()
+    for note_id, number in revisions().filter(
+        note_id__in=note_ids, number=Subquery(last_number())
+    ).values_list('note_id', 'number'):
+        cutoffs |= Q(note_id=note_id, number=max(number - keep + 1, 1))
+    if not cutoffs:
+        return 0
+    stale = Q()
+    for note_id, snapshot in revisions().filter(cutoffs).values_list(
+        'note_id', 'snapshot'
+    ):
+        stale |= Q(note_id=note_id, number__lt=snapshot)
+    if not stale:
+        return 0
+    deleted, _ = revisions().filter(stale).delete()
+    return deleted
+
+
+def diff_lines(previous, text):
+    """Построчный diff для страницы: [(вид строки, строка), ...]."""
+    kinds = {'+': 'added', '-': 'removed', ' ': 'context'}
+    return [
+        (kinds.get(line[:1], 'header'), line)
+        for line in difflib.unified_diff(
+            previous.splitlines(), text.splitlines(), lineterm='', n=2,
+        )
+        if not line.startswith(('---', '+++'))
+    ]
@@ -0,0 +1,126 @@
+"""Маршрутизаторы баз данных.
+
+ShardRouter держит заметки в шарде их автора, см. notes.sharding.
+
+ReplicaRouter разделяет чтение и запись: чтение моделей приложения notes
+уходит на одну из реплик NOTES_REPLICAS, запись - в основную базу.
+Реплика может отставать, поэтому автор, только что изменивший заметки,
+ещё NOTES_REPLICA_PIN_SECONDS секунд читает из основной базы: метку
+ставит signals.authors_changed, а ReplicaPinningMiddleware проверяет её
+в начале запроса. Внутри транзакции и при use_primary чтение тоже идёт
+в основную базу. Без реплик маршрутизатор ничего не решает сам.
+
+Локально реплика - отдельный файл SQLite, который обновляет команда
+sync_replica.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import sharding
+from .cache import get_cache
+
+ROUTED_APPS = frozenset(('notes',))
+
+_use_primary = ContextVar('notes_use_primary', default=False)
+
+
+def pin_key(author_id):
+    return f'notes:primary:{author_id}'
+
+
+def pin_authors(author_ids):
+    """Направляет чтение авторов в основную базу на время окна."""
+    if not settings.NOTES_REPLICAS:
+        return
+    get_cache().set_many(
+        {pin_key(author_id): 1 for author_id in author_ids},
+        timeout=settings.NOTES_REPLICA_PIN_SECONDS,
+    )
+
+
+def is_pinned(author_id):
+    return get_cache().get(pin_key(author_id)) is not None
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока идут в основную базу."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class ReplicaRouter:
+    """Чтение заметок с реплик, запись в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.NOTES_REPLICAS
+        if not replicas or model._meta.app_label not in ROUTED_APPS:
+            return None
+        primary = connections[DEFAULT_DB_ALIAS]
+        if _use_primary.get() or primary.in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APPS:
+            return None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы, связи между ними допустимы.
+        databases = {DEFAULT_DB_ALIAS, *settings.NOTES_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплику вместе с данными.
+        if db in settings.NOTES_REPLICAS:
+            return False
+        return None
+
+
+class ShardRouter:
+    """Заметка читается и пишется в шарде своего автора.
+
+    Запросы без экземпляра заметки (querysets, bulk-операции) выбирают
+    шард явно через sharding.notes_for() и using(). Остальные модели
+    живут в default, в том числе когда к ним обращаются через заметку
+    из другого шарда. Без шардирования маршрутизатор ничего не решает.
+    """
+
+    def db_for_note(self, model, instance=None, **hints):
+        if not sharding.is_enabled():
+            return None
+        if model._meta.label != 'notes.Note':
+            return DEFAULT_DB_ALIAS if instance is not None else None
+        # В подсказке может быть и связанный объект, например автор.
+        author_id = getattr(instance, 'author_id', None)
+        if isinstance(instance, model) and author_id is not None:
+            return sharding.db_for_author(author_id)
+        return None
+
+    db_for_read = db_for_note
+    db_for_write = db_for_note
+
+    def allow_relation(self, obj1, obj2, **hints):
+        shards = sharding.get_shards()
+        if (
+            sharding.is_enabled()
+            and obj1._state.db in shards and obj2._state.db in shards
+        ):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # В шардах, кроме default, только таблица заметок и её индекс.
+        if db == DEFAULT_DB_ALIAS or db not in sharding.get_shards():
+            return None
+        return app_label == 'notes' and model_name in (None, 'note')
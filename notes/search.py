@@ -0,0 +1,115 @@
+"""Полнотекстовый поиск по заметкам на основе SQLite FTS5.
+
+Индекс хранится в отдельной виртуальной таблице: rowid совпадает с id
+заметки, колонка author позволяет ограничить поиск заметками автора
+прямо внутри индекса, а title и text участвуют в ранжировании.
+При шардировании у каждого шарда свой индекс его заметок.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import sharding
+
+TABLE = 'notes_note_fts'
+# Вес колонок для bm25: автор в ранжировании не участвует.
+RANK = 'bm25(0.0, 2.0, 1.0)'
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_supported(using=DEFAULT_DB_ALIAS):
+    """FTS5 есть только у SQLite."""
+    return connections[using].vendor == 'sqlite'
+
+
+def build_match(author_id, query):
+    """Собирает выражение MATCH из пользовательского запроса.
+
+    Каждое слово экранируется как отдельная фраза, чтобы операторы FTS5
+    во вводе пользователя не ломали запрос. Возвращает None, если
+    в запросе нет ни одного слова.
+    """
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = ' '.join(f'"{token}"' for token in tokens)
+    return f'author:"{author_id}" AND {{title text}}:({terms})'
+
+
+def search(author_id, query, limit, offset=0):
+    """Возвращает id заметок автора, отсортированные по релевантности."""
+    match = build_match(author_id, query)
+    if match is None:
+        return []
+    using = sharding.db_for_author(author_id) or DEFAULT_DB_ALIAS
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+            'ORDER BY rank LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def database_of(note):
+    """Шард заметки; прочитанные с реплики заметки индексирует default."""
+    if note._state.db in sharding.get_shards():
+        return note._state.db
+    return DEFAULT_DB_ALIAS
+
+
+def index_notes(notes, replace=True):
+    """Добавляет или обновляет заметки в индексе.
+
+    При replace=False прежние записи не удаляются: так индекс
+    заполняется после полной очистки. Заметка индексируется в шарде,
+    из которого она прочитана или в который записана.
+    """
+    by_database = {}
+    for note in notes:
+        by_database.setdefault(database_of(note), []).append(
+            (note.id, str(note.author_id), note.title, note.text)
+        )
+    for using, rows in by_database.items():
+        index_rows(rows, replace, using)
+
+
+def index_rows(rows, replace, using):
+    if not is_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        if replace:
+            cursor.executemany(
+                f'DELETE FROM {TABLE} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, author, title, text) '
+            'VALUES (%s, %s, %s, %s)',
+            rows,
+        )
+
+
+def unindex_notes(note_ids, using=DEFAULT_DB_ALIAS):
+    """Удаляет заметки из индекса базы using."""
+    note_ids = list(note_ids)
+    if not note_ids or not is_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE rowid = %s',
+            [(note_id,) for note_id in note_ids],
+        )
+
+
+def clear(using=DEFAULT_DB_ALIAS):
+    """Полностью очищает индекс."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+
+def optimize(using=DEFAULT_DB_ALIAS):
+    """Сливает сегменты индекса после массовой загрузки."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
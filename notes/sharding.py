@@ -0,0 +1,315 @@
+"""Шардирование заметок по автору.
+
+Все запросы к заметкам ограничены автором, поэтому заметки автора целиком
+лежат в одной базе из NOTES_SHARDS. Шард выбирается стабильным хэшем id
+автора; перенесённым командой rebalance_notes авторам шард задаёт запись
+AuthorShard. Шард автора держится в кэше NOTES_SHARD_CACHE_TIMEOUT
+секунд. Пользователи, версии заметок и служебные таблицы остаются
+в default.
+
+Уникальность slug между шардами обеспечивает каталог NoteSlug в default:
+строка каталога занимает slug и выдаёт id заметки, поэтому id тоже
+уникальны во всех шардах и не меняются при переносе. С одним шардом
+каталог не ведётся и всё работает как с одной базой.
+
+Новый шард в NOTES_SHARDS меняет хэш-шард многих авторов, а их заметки
+остаются на месте. Поэтому сразу после добавления шарда команда
+prepare_shards закрепляет авторов за шардами, где лежат их заметки,
+и заносит существующие заметки в каталог; переносит их затем
+rebalance_notes.
+"""
+import zlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .cache import get_cache
+
+
+def get_shards():
+    return settings.NOTES_SHARDS
+
+
+def is_enabled():
+    return len(get_shards()) > 1
+
+
+def hash_shard(author_id):
+    """Шард автора по хэшу; не зависит от запуска интерпретатора."""
+    shards = get_shards()
+    return shards[zlib.crc32(str(author_id).encode()) % len(shards)]
+
+
+def shard_key(author_id):
+    return f'notes:shard:{author_id}'
+
+
+def db_for_author(author_id):
+    """Псевдоним базы с заметками автора; None без шардирования."""
+    if not is_enabled():
+        return None
+    cache = get_cache()
+    alias = cache.get(shard_key(author_id))
+    if alias is None:
+        # models импортирует этот модуль.
+        from .models import AuthorShard
+        alias = AuthorShard.objects.filter(
+            author_id=author_id
+        ).values_list('alias', flat=True).first() or hash_shard(author_id)
+        cache.set(
+            shard_key(author_id), alias,
+            timeout=settings.NOTES_SHARD_CACHE_TIMEOUT,
+        )
+    return alias
+
+
+def set_shard(author_id, alias):
+    """Закрепляет автора за шардом."""
+    from .models import AuthorShard
+    AuthorShard.objects.update_or_create(
+        author_id=author_id, defaults={'alias': alias}
+    )
+    get_cache().set(
+        shard_key(author_id), alias,
+        timeout=settings.NOTES_SHARD_CACHE_TIMEOUT,
+    )
+
+
+def locate_authors():
+    """{id автора: [шарды, где лежат его заметки]}."""
+    from .models import Note
+    located = {}
+    for alias in get_shards():
+        for author_id in Note.objects.using(alias).order_by().values_list(
+            'author_id', flat=True
+        ).distinct():
+            located.setdefault(author_id, []).append(alias)
+    return located
+
+
+def record_shards(located):
+    """Закрепляет авторов без записи AuthorShard за шардом их заметок.
+
+    Нужна после добавления шарда: хэш указывает на новый шард, а заметки
+    ещё в старом. Авторы с заметками в нескольких шардах пропускаются.
+    Возвращает (закреплено, id пропущенных авторов).
+    """
+    from .models import AuthorShard
+    recorded = set(AuthorShard.objects.values_list('author_id', flat=True))
+    shards = {}
+    skipped = []
+    for author_id, aliases in located.items():
+        if author_id in recorded:
+            continue
+        if len(aliases) > 1:
+            skipped.append(author_id)
+        elif aliases[0] != hash_shard(author_id):
+            shards[author_id] = aliases[0]
+    AuthorShard.objects.bulk_create(
+        [
+            AuthorShard(author_id=author_id, alias=alias)
+            for author_id, alias in shards.items()
+        ],
+        ignore_conflicts=True,
+    )
+    get_cache().set_many(
+        {shard_key(author_id): alias for author_id, alias in shards.items()},
+        timeout=settings.NOTES_SHARD_CACHE_TIMEOUT,
+    )
+    return len(shards), skipped
+
+
+def fill_catalog(batch_size):
+    """Заносит в каталог NoteSlug заметки, которых в нём нет.
+
+    Следующий id каталога становится больше всех id, выданных заметкам,
+    в том числе удалённым. Возвращает число добавленных строк.
+    """
+    from .models import Note, NoteSlug
+    added = 0
+    floor = 0
+    for alias in get_shards():
+        notes = Note.objects.using(alias).order_by('id').values_list(
+            'id', 'slug', 'author_id'
+        )
+        last_id = 0
+        while True:
+            batch = list(notes.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            known = set(NoteSlug.objects.filter(
+                pk__in=[note_id for note_id, _, _ in batch]
+            ).values_list('id', flat=True))
+            NoteSlug.objects.bulk_create([
+                NoteSlug(pk=note_id, slug=slug, author_id=author_id)
+                for note_id, slug, author_id in batch
+                if note_id not in known
+            ])
+            added += len(batch) - len(known)
+        floor = max(floor, last_id, last_sequence_value(alias, Note))
+    advance_sequence(NoteSlug, floor)
+    return added
+
+
+def last_sequence_value(using, model):
+    """Последний выданный id AUTOINCREMENT-таблицы SQLite или 0."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT seq FROM sqlite_sequence WHERE name = %s',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def advance_sequence(model, floor):
+    """Следующий id таблицы в default будет больше floor."""
+    table = model._meta.db_table
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(
+            'UPDATE sqlite_sequence SET seq = %s '
+            'WHERE name = %s AND seq < %s',
+            [floor, table, floor],
+        )
+        cursor.execute(
+            'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+            'WHERE NOT EXISTS '
+            '(SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+            [table, floor, table],
+        )
+
+
+@contextmanager
+def atomic(using):
+    """Транзакция в default и, если using - другой шард, ещё и в нём."""
+    with transaction.atomic():
+        if using in (None, DEFAULT_DB_ALIAS):
+            yield
+            return
+        with transaction.atomic(using=using):
+            yield
+
+
+def notes_for(author):
+    """Заметки автора в его шарде."""
+    from .models import Note
+    queryset = Note.objects.filter(author=author)
+    alias = db_for_author(author.pk)
+    if alias is not None:
+        queryset = queryset.using(alias)
+    return queryset
+
+
+def slug_owners(model):
+    """Queryset со столбцами slug и id всех заметок.
+
+    При шардировании это каталог NoteSlug, без него - сами заметки.
+    """
+    if not is_enabled():
+        return model._base_manager.all()
+    from .models import NoteSlug
+    return NoteSlug.objects.all()
+
+
+def claim_slug(note):
+    """Занимает slug заметки в каталоге перед сохранением в шард.
+
+    Новой заметке выдаётся id из каталога. Возвращает функцию, которая
+    отменяет изменение каталога, если запись в шард не удалась. Занятый
+    slug приводит к IntegrityError, как уникальный индекс одной базы.
+    """
+    from .models import NoteSlug
+    if note.pk is None:
+        entry = NoteSlug.objects.create(
+            slug=note.slug, author_id=note.author_id
+        )
+        note.pk = entry.pk
+
+        def undo():
+            NoteSlug.objects.filter(pk=entry.pk).delete()
+            note.pk = None
+        return undo
+    previous = NoteSlug.objects.filter(pk=note.pk).values_list(
+        'slug', flat=True
+    ).first()
+    if previous is None:
+        NoteSlug.objects.create(
+            pk=note.pk, slug=note.slug, author_id=note.author_id
+        )
+        return lambda: NoteSlug.objects.filter(pk=note.pk).delete()
+    if previous != note.slug:
+        NoteSlug.objects.filter(pk=note.pk).update(slug=note.slug)
+    return lambda: NoteSlug.objects.filter(pk=note.pk).update(slug=previous)
+
+
+def rename_slugs(notes):
+    """Переносит в каталог slug изменённых пачкой заметок."""
+    if not is_enabled() or not notes:
+        return
+    from .models import NoteSlug
+    NoteSlug.objects.bulk_update(
+        [NoteSlug(pk=note.pk, slug=note.slug) for note in notes],
+        fields=('slug',),
+    )
+
+
+def release_slugs(note_ids):
+    """Освобождает slug удалённых заметок."""
+    note_ids = list(note_ids)
+    if not is_enabled() or not note_ids:
+        return
+    from .models import NoteSlug
+    NoteSlug.objects.filter(pk__in=note_ids).delete()
+
+
+def bulk_create(notes, ignore_conflicts=False, fetch_ids=True):
+    """Массово создаёт заметки и возвращает вставленные, с id.
+
+    Заметки, чей slug при ignore_conflicts оказался занят, в результат
+    не попадают. SQLite не возвращает id из bulk_create, поэтому без
+    шардирования они читаются по slug; при fetch_ids=False id не
+    читаются и возвращаются все заметки.
+    """
+    from .models import Note, NoteSlug
+    if not notes:
+        return []
+    if not is_enabled():
+        Note.objects.bulk_create(notes, ignore_conflicts=ignore_conflicts)
+        if not fetch_ids:
+            return notes
+        owners = Note.objects.filter(slug__in=[note.slug for note in notes])
+    else:
+        NoteSlug.objects.bulk_create(
+            [
+                NoteSlug(slug=note.slug, author_id=note.author_id)
+                for note in notes
+            ],
+            ignore_conflicts=ignore_conflicts,
+        )
+        owners = NoteSlug.objects.filter(
+            slug__in=[note.slug for note in notes]
+        )
+    saved = {
+        slug: (note_id, author_id)
+        for slug, note_id, author_id in owners.values_list(
+            'slug', 'id', 'author_id'
+        )
+    }
+    inserted = []
+    for note in notes:
+        note_id, author_id = saved.get(note.slug, (None, None))
+        # Slug мог быть занят другим автором.
+        if author_id == note.author_id:
+            note.pk = note_id
+            inserted.append(note)
+    if is_enabled():
+        by_shard = {}
+        for note in inserted:
+            by_shard.setdefault(
+                db_for_author(note.author_id), []
+            ).append(note)
+        for alias, shard_notes in by_shard.items():
+            Note.objects.using(alias).bulk_create(shard_notes)
+    return inserted
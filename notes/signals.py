@@ -0,0 +1,167 @@
+"""Обновление производных данных заметок.
+
+После изменения заметок нужно обновить поисковый индекс, записать
+ревизии, сбросить кэш списка и увеличить версию заметок автора.
+Для обычных save()/delete() это делают обработчики сигналов; массовые
+операции (bulk_create и т.п.) сигналов не отправляют и вызывают
+notes_saved/notes_deleted сами.
+
+Внутри deferred() изменения копятся и применяются одним проходом
+при выходе из блока, поэтому удаление queryset'а из N заметок стоит
+столько же запросов, сколько удаление одной.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, revisions, routers, search, sharding
+from .models import Note, NotesVersion
+
+User = get_user_model()
+
+SEARCH_FIELDS = frozenset(('title', 'text', 'author', 'author_id'))
+
+_local = threading.local()
+
+
+class PendingChanges:
+    """Изменения заметок, накопленные внутри deferred()."""
+
+    def __init__(self):
+        self.saved = {}
+        self.reindexed = set()
+        self.deleted = {}
+
+    def save(self, notes, reindex):
+        for note in notes:
+            self.saved[note.pk] = note
+            if reindex:
+                self.reindexed.add(note.pk)
+
+    def delete(self, notes):
+        for note in notes:
+            self.saved.pop(note.pk, None)
+            self.reindexed.discard(note.pk)
+            # После delete() у заметки уже нет pk, поэтому всё нужное
+            # запоминается сразу.
+            self.deleted[note.pk] = (
+                note.author_id, search.database_of(note)
+            )
+
+    def apply(self):
+        forget_notes({
+            pk: database for pk, (_, database) in self.deleted.items()
+        })
+        reindexed = [
+            note for pk, note in self.saved.items() if pk in self.reindexed
+        ]
+        search.index_notes(reindexed)
+        revisions.record(reindexed)
+        authors_changed(
+            [note.author_id for note in self.saved.values()]
+            + [author_id for author_id, _ in self.deleted.values()]
+        )
+
+
+@contextmanager
+def deferred():
+    """Откладывает обновление производных данных до конца блока."""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = PendingChanges()
+    try:
+        yield
+        pending = _local.pending
+    finally:
+        _local.pending = None
+    pending.apply()
+
+
+@contextmanager
+def muted():
+    """Сохранения и удаления внутри блока не трогают производные данные.
+
+    Для копий заметок при переносе между шардами: удалённая копия не
+    освобождает slug и не стирает историю заметки.
+    """
+    previous = getattr(_local, 'pending', None)
+    _local.pending = PendingChanges()
+    try:
+        yield
+    finally:
+        _local.pending = previous
+
+
+def authors_changed(author_ids):
+    """Сбрасывает кэш списка и увеличивает версии заметок авторов.
+
+    Авторы читают из основной базы, пока реплики догоняют изменения.
+    """
+    author_ids = set(author_ids)
+    for author_id in author_ids:
+        cache.bump_author_version(author_id)
+        NotesVersion.bump(author_id)
+    routers.pin_authors(author_ids)
+
+
+def notes_saved(notes, reindex=True):
+    """Вызывается после создания или изменения заметок."""
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.save(notes, reindex)
+        return
+    if reindex:
+        search.index_notes(notes)
+        revisions.record(notes)
+    authors_changed(note.author_id for note in notes)
+
+
+def notes_deleted(notes):
+    """Вызывается после удаления заметок."""
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.delete(notes)
+        return
+    forget_notes({note.pk: search.database_of(note) for note in notes})
+    authors_changed(note.author_id for note in notes)
+
+
+def forget_notes(databases):
+    """Удаляет заметки {id: база} из поискового индекса и каталога slug."""
+    by_database = {}
+    for note_id, database in databases.items():
+        by_database.setdefault(database, []).append(note_id)
+    for using, note_ids in by_database.items():
+        search.unindex_notes(note_ids, using)
+    sharding.release_slugs(databases)
+    revisions.forget(databases)
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, update_fields=None, **kwargs):
+    reindex = (
+        update_fields is None or bool(SEARCH_FIELDS & set(update_fields))
+    )
+    notes_saved([instance], reindex=reindex)
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    notes_deleted([instance])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    cache.forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    if user is not None:
+        cache.forget_user(user.pk)
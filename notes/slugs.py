@@ -0,0 +1,140 @@
+"""Выделение уникальных slug для заметок.
+
+Если slug занят, подбирается следующий свободный вариант с числовым
+суффиксом: slug, slug-2, slug-3 и т.д. Занята ли основа и наибольший
+занятый вариант находятся одним запросом по диапазону уникального
+индекса slug, а гонку с параллельной вставкой ловит ограничение
+уникальности в БД.
+"""
+import re
+
+from django.db.models import BooleanField, Func, Q, Subquery, Value
+from django.db.models.functions import Length
+
+from . import sharding
+
+# Сколько символов оставлять под суффикс, если основа длинная: '-999999'.
+SUFFIX_RESERVE = 7
+# Основа для заголовков, из которых не получается slug.
+FALLBACK = 'note'
+
+
+def max_length(model):
+    return model._meta.get_field('slug').max_length
+
+
+def stem(model, base):
+    """Часть основы, к которой дописывается суффикс."""
+    limit = max_length(model)
+    if len(base) + SUFFIX_RESERVE <= limit:
+        return base
+    return base[:limit - SUFFIX_RESERVE]
+
+
+class Glob(Func):
+    """Условие slug GLOB шаблон SQLite, чувствительное к регистру."""
+    template = '%(expressions)s'
+    arg_joiner = ' GLOB '
+    output_field = BooleanField()
+
+
+class Largest(Func):
+    """MAX по всем строкам подзапроса, без GROUP BY."""
+    function = 'MAX'
+
+
+def largest_variant(model, base, queryset):
+    """Подзапрос: вариант основы с наибольшим числовым суффиксом.
+
+    Берутся только суффиксы из цифр без ведущего нуля: у них число тем
+    больше, чем длиннее slug, а при равной длине - чем slug больше.
+    Такие варианты лежат в диапазоне ['stem-1', 'stem-:') уникального
+    индекса, и оба MAX считаются по нему без сортировки.
+    """
+    prefix = stem(model, base)
+    variants = queryset.filter(
+        Glob('slug', Value(prefix + '-[1-9]*')),
+        slug__gte=prefix + '-1', slug__lt=prefix + '-:',
+    ).exclude(
+        Glob('slug', Value(prefix + '-*[^0-9]*'))
+    ).order_by().alias(length=Length('slug'))
+    longest = variants.values(largest=Largest('length'))
+    return Subquery(variants.filter(
+        length=Subquery(longest)
+    ).values(largest=Largest('slug')))
+
+
+def variants_lookup(model, base, queryset):
+    """Условие на основу и её наибольший вариант с суффиксом."""
+    return Q(slug=base) | Q(slug=largest_variant(model, base, queryset))
+
+
+def find_taken(model, bases=(), slugs=(), queryset=None):
+    """Одним запросом возвращает {slug: id} занятых slug.
+
+    Проверяются точные значения slugs, а для каждой из bases - сама
+    основа и вариант с наибольшим суффиксом. При шардировании slug
+    ищутся в каталоге всех шардов.
+    """
+    if queryset is None:
+        queryset = sharding.slug_owners(model)
+    condition = Q(slug__in=list(slugs)) if slugs else Q()
+    for base in set(bases):
+        condition |= variants_lookup(model, base, queryset)
+    if not condition:
+        return {}
+    return dict(queryset.filter(condition).values_list('slug', 'id'))
+
+
+def next_free(model, base, taken, own=()):
+    """Первый свободный вариант основы.
+
+    taken - коллекция занятых slug с основой и наибольшим вариантом от
+    find_taken; суффикс берётся больше наибольшего занятого, чтобы не
+    перебирать варианты по одному. own - slug из taken, которые может
+    оставить себе заметка: её вариант основы сохраняется.
+    """
+    if base not in taken or base in own:
+        return base
+    prefix = stem(model, base)
+    suffix_re = re.compile(re.escape(prefix) + r'-(\d+)')
+    for slug in own:
+        if suffix_re.fullmatch(slug):
+            return slug
+    numbers = [
+        int(match.group(1)) for match in map(suffix_re.fullmatch, taken)
+        if match
+    ]
+    number = max(numbers, default=1) + 1
+    while f'{prefix}-{number}' in taken:
+        number += 1
+    return f'{prefix}-{number}'
+
+
+def base_for(model, title):
+    return model.slugify_title(title) or FALLBACK
+
+
+def allocate_slug(model, title, exclude_pk=None):
+    """Свободный slug для заголовка; slug заметки exclude_pk свободен."""
+    base = base_for(model, title)
+    owners = find_taken(model, bases=[base])
+    own = {
+        slug for slug, note_id in owners.items()
+        if exclude_pk is not None and note_id == exclude_pk
+    }
+    return next_free(model, base, set(owners), own)
+
+
+def allocate_slugs(model, titles, taken):
+    """Свободные slug для пачки заголовков.
+
+    taken - множество уже занятых slug, полученное от find_taken для
+    основ этих заголовков; выданные slug добавляются в него.
+    """
+    allocated = []
+    for title in titles:
+        slug = next_free(model, base_for(model, title), taken)
+        taken.add(slug)
+        allocated.append(slug)
+    return allocated
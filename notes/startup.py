@@ -0,0 +1,87 @@
+"""Замер старта процесса по выводу python -X importtime.
+
+Каждая точка входа запускается в отдельном интерпретаторе, чтобы уже
+загруженные модули не искажали замер. Интерпретатор печатает в stderr
+строку на каждый импорт: собственное и накопленное время в микросекундах
+и имя модуля с отступом по глубине вложенности.
+
+Вывод importtime - не полный список модулей: в нём нет модулей, которые
+интерпретатор загрузил до начала замера (sys, builtins, машинерия
+importlib), псевдонимов вроде os.path и строки самого модуля, который
+запрошен через importlib.import_module (приложения, middleware), -
+вложенные импорты такого модуля выводятся как обычно. Поэтому число
+модулей берётся из sys.modules запущенного процесса.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+TARGETS = {
+    'manage': (
+        "import runpy, sys; sys.argv = ['manage.py', 'check']; "
+        "runpy.run_path('manage.py', run_name='__main__')"
+    ),
+    'wsgi': 'import yanote.wsgi',
+    'asgi': 'import yanote.asgi',
+}
+
+# Последняя строка stdout - загруженные модули.
+LIST_MODULES = '\nimport json, sys; print(json.dumps(sorted(sys.modules)))'
+
+
+def parse_importtime(output):
+    """Строки -X importtime: список (имя, глубина, своё, накопленное мкс)."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            # Заголовок таблицы.
+            continue
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append(
+            (name.strip(), depth, int(own), int(cumulative))
+        )
+    return imports
+
+
+def measure(target, settings_module=None):
+    """Запускает точку входа в новом процессе.
+
+    Возвращает время работы процесса в мс, импорты по -X importtime
+    и имена всех загруженных модулей.
+    """
+    env = dict(os.environ)
+    env['DJANGO_SETTINGS_MODULE'] = (
+        settings_module or settings.SETTINGS_MODULE
+    )
+    started = time.perf_counter()
+    completed = subprocess.run(
+        (sys.executable, '-X', 'importtime', '-c',
+         TARGETS[target] + LIST_MODULES),
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        check=True,
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    modules = json.loads(completed.stdout.splitlines()[-1])
+    return elapsed_ms, parse_importtime(completed.stderr), modules
+
+
+def import_ms(imports):
+    """Суммарное время импортов: накопленное время модулей верхнего уровня."""
+    return sum(
+        cumulative for _, depth, _, cumulative in imports if depth == 0
+    ) / 1000
+
+
+def slowest(imports, count):
+    """Модули с наибольшим накопленным временем."""
+    return sorted(imports, key=lambda record: record[3], reverse=True)[
+        :count
+    ]
@@ -0,0 +1,143 @@
+import json
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.test import (
+    AsyncClient, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from notes.models import Note
+
+User = get_user_model()
+
+
+@override_settings(NOTES_ASYNC_DB_WORKERS=0)
+class AsyncViewsTests(TestCase):
+    """Тесты асинхронных страниц заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.not_author = User.objects.create(username='Не автор')
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+        cls.list_url = reverse('notes:async_list')
+        cls.detail_url = reverse('notes:async_detail', args=(cls.note.slug,))
+        cls.success_url = reverse('notes:async_success')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = AsyncClient()
+        self.author_client.force_login(self.author)
+        self.not_author_client = AsyncClient()
+        self.not_author_client.force_login(self.not_author)
+
+    async def test_pages_for_author(self):
+        """Автор видит свои заметки на асинхронных страницах."""
+        for url in (self.list_url, self.detail_url, self.success_url):
+            with self.subTest(url=url):
+                response = await self.author_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = await self.author_client.get(self.list_url)
+        self.assertContains(response, self.note.title)
+
+    async def test_other_users_note_is_not_found(self):
+        """Чужая заметка недоступна, чужой список её не содержит."""
+        response = await self.not_author_client.get(self.detail_url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        response = await self.not_author_client.get(self.list_url)
+        self.assertNotContains(response, self.note.title)
+
+    async def test_redirects_for_anonymous_user(self):
+        """Анонимный пользователь отправляется на страницу входа."""
+        login_url = reverse('users:login')
+        for url in (self.list_url, self.detail_url, self.success_url):
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertRedirects(
+                    response, f'{login_url}?next={url}',
+                    fetch_redirect_response=False,
+                )
+
+    async def test_conditional_get(self):
+        """Асинхронные страницы тоже отвечают 304 по ETag."""
+        for url in (self.list_url, self.detail_url):
+            with self.subTest(url=url):
+                response = await self.author_client.get(url)
+                # AsyncClient передаёт extra как заголовки ASGI как есть.
+                response = await self.author_client.get(
+                    url, **{'if-none-match': response['ETag']}
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    async def test_post_is_not_allowed(self):
+        """Асинхронные страницы только для чтения."""
+        response = await self.author_client.post(self.list_url)
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
+
+
+@override_settings(NOTES_ASYNC_DB_WORKERS=2)
+class AsyncViewsThreadPoolTests(TransactionTestCase):
+    """Обращения к БД идут через отдельный пул потоков."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='Автор')
+        Note.objects.create(
+            title='Заголовок', text='Текст', slug='note-slug',
+            author=self.author,
+        )
+        self.author_client = AsyncClient()
+        self.author_client.force_login(self.author)
+
+    async def test_list_through_pool(self):
+        response = await self.author_client.get(reverse('notes:async_list'))
+        self.assertContains(response, 'Заголовок')
+
+
+class AsgiBenchmarkTests(TransactionTestCase):
+    """Тест команды нагрузки на ASGI-приложение."""
+
+    def test_bench_asgi(self):
+        user = User.objects.create(username='bench-0')
+        Note.objects.create(
+            title='Заголовок', text='Текст', slug='note-slug', author=user
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'bench.json'
+            call_command(
+                'bench_asgi', requests=20, concurrency=5,
+                output=str(output), stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())['results']
+        self.assertEqual(
+            set(results),
+            {
+                'list:sync', 'list:async', 'detail:sync', 'detail:async',
+                'success:sync', 'success:async',
+            },
+        )
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertEqual(result['count'], 20)
+
+    def test_bench_asgi_detail_needs_note(self):
+        User.objects.create(username='bench-0')
+        with self.assertRaisesMessage(CommandError, 'нет заметок'):
+            call_command(
+                'bench_asgi', page=['detail'], requests=1, concurrency=1,
+                stdout=StringIO(),
+            )
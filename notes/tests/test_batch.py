@@ -0,0 +1,172 @@
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+
+User = get_user_model()
+
+
+class NoteBatchApiTests(TestCase):
+    """Тесты пакетного API заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.not_author = User.objects.create(username='Не автор')
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+        cls.other_note = Note.objects.create(
+            title='Чужая',
+            text='Текст',
+            slug='other-slug',
+            author=cls.not_author,
+        )
+        cls.url = reverse('notes:batch')
+        cls.author_client = cls.client_class()
+        cls.author_client.force_login(cls.author)
+
+    def post(self, operations):
+        return self.author_client.post(
+            self.url,
+            data=json.dumps({'operations': operations}),
+            content_type='application/json',
+        )
+
+    def creates(self, count, prefix):
+        return [
+            {'action': 'create', 'title': f'Заметка {index}',
+             'text': 'Текст', 'slug': f'{prefix}-{index}'}
+            for index in range(count)
+        ]
+
+    def test_mixed_batch_is_applied(self):
+        """Создание, изменение и удаление применяются одной пачкой."""
+        response = self.post([
+            {'action': 'create', 'title': 'Новая заметка', 'text': 'Текст'},
+            {'action': 'update', 'target': 'note-slug', 'text': 'Новый'},
+            {'action': 'create', 'title': 'Ещё', 'text': 'Текст',
+             'slug': 'more'},
+        ])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        results = response.json()['results']
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['created', 'updated', 'created'],
+        )
+        self.assertEqual(results[0]['slug'], 'novaya-zametka')
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, 'Новый')
+        self.assertEqual(Note.objects.filter(author=self.author).count(), 3)
+
+    def test_delete(self):
+        """Удалённая заметка освобождает slug для той же пачки."""
+        response = self.post([
+            {'action': 'delete', 'target': 'note-slug'},
+            {'action': 'create', 'title': 'Замена', 'text': 'Текст',
+             'slug': 'note-slug'},
+        ])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        note = Note.objects.get(slug='note-slug')
+        self.assertNotEqual(note.pk, self.note.pk)
+
+    def test_invalid_batch_is_not_applied(self):
+        """Ошибка в одной операции отменяет всю пачку."""
+        response = self.post([
+            {'action': 'create', 'title': 'Новая', 'text': 'Текст',
+             'slug': 'fresh'},
+            {'action': 'create', 'title': 'Дубль', 'text': 'Текст',
+             'slug': 'other-slug'},
+            {'action': 'create', 'title': 'Без текста'},
+            {'action': 'update', 'target': 'other-slug', 'text': 'Чужой'},
+        ])
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        statuses = [
+            (result['status'], sorted(result.get('errors', ())))
+            for result in response.json()['results']
+        ]
+        self.assertEqual(statuses, [
+            ('created', []),
+            ('error', ['slug']),
+            ('error', ['text']),
+            ('error', ['target']),
+        ])
+        self.assertFalse(Note.objects.filter(slug='fresh').exists())
+
+    def test_target_must_be_slug(self):
+        """Не строка в target - ошибка операции, а не ошибка сервера."""
+        response = self.post([
+            {'action': 'delete', 'target': ['note-slug']},
+            {'action': 'update', 'target': {'slug': 'note-slug'}},
+            {'action': 'delete'},
+            {'action': 'delete', 'target': 'note-slug'},
+        ])
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(
+            [
+                (result['status'], list(result.get('errors', ())))
+                for result in response.json()['results']
+            ],
+            [('error', ['target'])] * 3 + [('deleted', [])],
+        )
+        self.assertTrue(Note.objects.filter(pk=self.note.pk).exists())
+
+    def test_duplicate_slugs_within_batch(self):
+        """Одинаковые slug внутри пачки отклоняются."""
+        response = self.post(self.creates(1, 'same') + self.creates(1, 'same'))
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        """Число запросов не растёт с размером пачки."""
+        counts = []
+        for size, prefix in ((2, 'small'), (20, 'large')):
+            operations = self.creates(size, prefix)
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(
+                    self.post(operations).status_code, HTTPStatus.OK
+                )
+            updates = [
+                {'action': 'update', 'target': f'{prefix}-{index}',
+                 'text': 'Изменено'}
+                for index in range(size)
+            ]
+            with CaptureQueriesContext(connection) as update_context:
+                self.post(updates)
+            deletes = [
+                {'action': 'delete', 'target': f'{prefix}-{index}'}
+                for index in range(size)
+            ]
+            with CaptureQueriesContext(connection) as delete_context:
+                self.post(deletes)
+            counts.append((
+                len(context), len(update_context), len(delete_context)
+            ))
+        self.assertEqual(counts[0], counts[1])
+        self.assertFalse(
+            Note.objects.filter(slug__startswith='large').exists()
+        )
+
+    def test_anonymous_user_is_rejected(self):
+        """Анонимный пользователь получает 403."""
+        response = self.client.post(
+            self.url, data='{}', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    def test_malformed_payload(self):
+        """Некорректное тело запроса даёт 400."""
+        for body in ('not json', '[]', '{"operations": 1}'):
+            with self.subTest(body=body):
+                response = self.author_client.post(
+                    self.url, data=body, content_type='application/json'
+                )
+                self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
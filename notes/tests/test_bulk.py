@@ -0,0 +1,214 @@
+import re
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import cache as notes_cache
+from notes import search
+from notes.models import Note, NoteRevision
+
+User = get_user_model()
+
+TOKEN = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class NoteBulkActionTests(TestCase):
+    """Действия над заметками, выбранными в списке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.reader = User.objects.create(username='Читатель')
+        cls.url = reverse('notes:bulk')
+        cls.list_url = reverse('notes:list')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def create(self, count, prefix='note', author=None):
+        return [
+            Note.objects.create(
+                title=f'Заметка {prefix} {index}', text='Текст',
+                slug=f'{prefix}-{index}', author=author or self.author,
+            )
+            for index in range(count)
+        ]
+
+    def post(self, notes, action='delete'):
+        return self.client.post(self.url, {
+            'action': action, 'notes': [note.pk for note in notes],
+        })
+
+    def test_delete_selected(self):
+        notes = self.create(5)
+        self.client.get(self.list_url)
+        response = self.post(notes[:3])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['applied'], 3)
+        self.assertEqual(response.context['missing'], 0)
+        self.assertEqual(
+            list(Note.objects.values_list('slug', flat=True)),
+            ['note-3', 'note-4'],
+        )
+        # Производные данные удалённых заметок тоже удалены.
+        self.assertEqual(
+            sorted(search.search(self.author.pk, 'Заметка', limit=10)),
+            [notes[3].pk, notes[4].pk],
+        )
+        self.assertFalse(NoteRevision.objects.filter(
+            note_id__in=[note.pk for note in notes[:3]]
+        ).exists())
+        response = self.client.get(self.list_url)
+        self.assertNotContains(response, 'note-0')
+        self.assertContains(response, 'note-3')
+
+    def test_other_users_notes_are_not_touched(self):
+        own = self.create(1)
+        foreign = self.create(1, prefix='foreign', author=self.reader)
+        response = self.post(own + foreign)
+        self.assertEqual(response.context['applied'], 1)
+        self.assertEqual(response.context['missing'], 1)
+        self.assertContains(response, 'Не найдено заметок: 1')
+        self.assertTrue(Note.objects.filter(pk=foreign[0].pk).exists())
+
+    @override_settings(NOTES_BULK_MAX_NOTES=2)
+    def test_selection_is_capped(self):
+        notes = self.create(3)
+        response = self.post(notes)
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertContains(
+            response, 'не больше 2 заметок',
+            status_code=HTTPStatus.BAD_REQUEST,
+        )
+        self.assertEqual(Note.objects.count(), 3)
+
+    def test_invalid_requests(self):
+        note, = self.create(1)
+        for data in (
+            {'action': 'delete'},
+            {'action': 'delete', 'notes': ['x']},
+            {'action': 'delete', 'notes': ['99999999999999999999999']},
+            {'action': 'delete', 'notes': [note.pk, -1]},
+            {'action': 'archive', 'notes': [note.pk]},
+        ):
+            with self.subTest(data=data):
+                response = self.client.post(self.url, data)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
+        self.assertTrue(Note.objects.filter(pk=note.pk).exists())
+
+    def test_query_count_does_not_depend_on_selection(self):
+        """Число запросов не растёт с числом выбранных заметок."""
+        counts = []
+        for size, prefix in ((2, 'small'), (40, 'large')):
+            notes = self.create(size, prefix)
+            with CaptureQueriesContext(connection) as context:
+                response = self.post(notes)
+            self.assertEqual(response.context['applied'], size)
+            counts.append(len(context))
+        self.assertEqual(counts[0], counts[1])
+        self.assertFalse(Note.objects.exists())
+
+    def test_anonymous_user_is_redirected(self):
+        note, = self.create(1)
+        response = self.client_class().post(
+            self.url, {'action': 'delete', 'notes': [note.pk]}
+        )
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={self.url}'
+        )
+        self.assertTrue(Note.objects.filter(pk=note.pk).exists())
+
+
+class CachedListCsrfTests(TestCase):
+    """Форма в кэшированном списке несёт токен для CSRF-cookie клиента."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.notes = [
+            Note.objects.create(
+                title=f'Заметка {index}', text='Текст', slug=f'n-{index}',
+                author=cls.author,
+            )
+            for index in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def csrf_client(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.author)
+        return client
+
+    def delete(self, client, note):
+        page = client.get(reverse('notes:list'))
+        token = TOKEN.search(page.content.decode()).group(1)
+        return client.post(reverse('notes:bulk'), {
+            'csrfmiddlewaretoken': token,
+            'action': 'delete',
+            'notes': [note.pk],
+        })
+
+    def test_token_matches_each_client(self):
+        first, second = self.csrf_client(), self.csrf_client()
+        first.get(reverse('notes:list'))
+        # Та же версия заметок автора, но другой клиент и cookie.
+        self.assertEqual(
+            self.delete(second, self.notes[0]).status_code, HTTPStatus.OK
+        )
+        self.assertEqual(
+            self.delete(first, self.notes[1]).status_code, HTTPStatus.OK
+        )
+        self.assertFalse(Note.objects.exists())
+
+    def test_page_cache_is_shared_by_clients(self):
+        """Другой браузер автора получает страницу из кэша."""
+        first, second = self.csrf_client(), self.csrf_client()
+        first.get(reverse('notes:list'))
+        with CaptureQueriesContext(connection) as queries:
+            response = second.get(reverse('notes:list'))
+        self.assertEqual(
+            notes_cache.get_stats(), {'hits': 1, 'misses': 1}
+        )
+        self.assertFalse(
+            [query for query in queries if '"notes_note"' in query['sql']]
+        )
+        self.assertNotIn('csrf-token-placeholder', response.content.decode())
+
+    def test_placeholder_text_in_title_is_kept(self):
+        """Токен подставляется только в поле формы, а не в заголовки."""
+        Note.objects.filter(pk=self.notes[0].pk).update(
+            title='csrf-token-placeholder'
+        )
+        client = self.csrf_client()
+        for _ in range(2):
+            response = client.get(reverse('notes:list'))
+            self.assertContains(response, 'csrf-token-placeholder', count=1)
+        self.assertEqual(
+            self.delete(client, self.notes[1]).status_code, HTTPStatus.OK
+        )
+
+    def test_etag_depends_on_csrf_cookie(self):
+        first, second = self.csrf_client(), self.csrf_client()
+        etag = first.get(reverse('notes:list'))['ETag']
+        self.assertEqual(
+            first.get(
+                reverse('notes:list'), HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            HTTPStatus.NOT_MODIFIED,
+        )
+        self.assertEqual(
+            second.get(
+                reverse('notes:list'), HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            HTTPStatus.OK,
+        )
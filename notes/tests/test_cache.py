@@ -0,0 +1,160 @@
+import re
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import cache as notes_cache
+from notes.models import Note
+
+User = get_user_model()
+
+# CSRF-токен формы маскируется заново в каждом ответе.
+TOKEN = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+
+
+class NotesListCacheTests(TestCase):
+    """Тесты кэша отрисованного списка заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+        cls.url = reverse('notes:list')
+        cls.metrics_url = reverse('notes:cache_metrics')
+        cls.author_client = cls.client_class()
+        cls.author_client.force_login(cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_request_is_served_from_cache(self):
+        """Повторный запрос не обращается к заметкам в БД."""
+        first = self.author_client.get(self.url)
+        # Остаются запросы сессии, пользователя и версии его заметок.
+        with self.assertNumQueries(3):
+            second = self.author_client.get(self.url)
+        self.assertEqual(
+            TOKEN.sub(b'', first.content), TOKEN.sub(b'', second.content)
+        )
+
+    def test_cache_is_invalidated_on_save_and_delete(self):
+        """Изменение и удаление заметки сбрасывают кэш автора."""
+        self.author_client.get(self.url)
+        self.note.title = 'Новый заголовок'
+        self.note.save()
+        response = self.author_client.get(self.url)
+        self.assertContains(response, 'Новый заголовок')
+        self.note.delete()
+        response = self.author_client.get(self.url)
+        self.assertNotContains(response, 'Новый заголовок')
+
+    def test_metrics_count_hits_and_misses(self):
+        """Счётчики попаданий и промахов доступны для сбора."""
+        self.author_client.get(self.url)
+        self.author_client.get(self.url)
+        response = self.client.get(self.metrics_url)
+        self.assertContains(response, 'notes_list_cache_hits_total 1')
+        self.assertContains(response, 'notes_list_cache_misses_total 1')
+
+
+class NoteObjectCacheTests(TestCase):
+    """Тесты кэша заметок для просмотра, редактирования и удаления."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+        cls.detail_url = reverse('notes:detail', args=(cls.note.slug,))
+        cls.edit_url = reverse('notes:edit', args=(cls.note.slug,))
+        cls.delete_url = reverse('notes:delete', args=(cls.note.slug,))
+        cls.author_client = cls.client_class()
+        cls.author_client.force_login(cls.author)
+
+    def setUp(self):
+        cache.clear()
+        notes_cache.local_notes.clear()
+
+    def note_selects(self, *urls):
+        """Число чтений заметок за GET-запросы к urls."""
+        with CaptureQueriesContext(connection) as context:
+            for url in urls:
+                response = self.author_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+        return sum(
+            'FROM "notes_note"' in query['sql']
+            for query in context.captured_queries
+        )
+
+    def test_hit_does_not_query_notes(self):
+        """Заметка читается из БД один раз на все страницы."""
+        self.assertEqual(
+            self.note_selects(self.detail_url, self.edit_url, self.delete_url),
+            1,
+        )
+        self.assertEqual(self.note_selects(self.detail_url), 0)
+        response = self.client.get(reverse('notes:cache_metrics'))
+        self.assertContains(response, 'notes_object_cache_hits_total 3')
+        self.assertContains(response, 'notes_object_cache_misses_total 1')
+
+    def test_shared_tier_without_local(self):
+        """Без локального уровня заметка берётся из общего кэша."""
+        with self.settings(NOTES_OBJECT_CACHE_SIZE=0):
+            self.note_selects(self.detail_url)
+            self.assertEqual(self.note_selects(self.detail_url), 0)
+        self.assertEqual(notes_cache.local_notes.entries, {})
+
+    def test_save_and_delete_invalidate(self):
+        self.author_client.get(self.detail_url)
+        self.note.title = 'Новый заголовок'
+        self.note.save()
+        self.assertContains(
+            self.author_client.get(self.detail_url), 'Новый заголовок'
+        )
+        self.author_client.post(self.delete_url)
+        response = self.author_client.get(self.detail_url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_change_in_other_process_invalidates_local_tier(self):
+        """Локальная запись не читается после смены версии автора."""
+        self.author_client.get(self.detail_url)
+        Note.objects.filter(pk=self.note.pk).update(title='Из другого')
+        notes_cache.bump_author_version(self.author.pk)
+        self.assertContains(
+            self.author_client.get(self.detail_url), 'Из другого'
+        )
+
+    def test_invalid_form_does_not_change_cached_note(self):
+        """Данные неверной формы не попадают в закэшированную заметку."""
+        self.author_client.get(self.edit_url)
+        response = self.author_client.post(
+            self.edit_url, {'title': 'Черновик', 'text': '', 'slug': 'x'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.author_client.get(self.detail_url)
+        self.assertContains(response, 'Заголовок')
+        self.assertNotContains(response, 'Черновик')
+
+    def test_local_tier_is_bounded(self):
+        local = notes_cache.LocalCache()
+        for key in 'abc':
+            local.set(key, key.upper(), size=2)
+        self.assertIsNone(local.get('a'))
+        self.assertEqual(local.get('b'), 'B')
+        local.set('d', 'D', size=2)
+        # b прочитан недавно и остаётся, вытесняется c.
+        self.assertEqual(list(local.entries), ['b', 'd'])
@@ -0,0 +1,219 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from pytils.translit import slugify
+
+from notes.management.commands.seed_notes import skewed_counts
+from notes.models import Note
+
+User = get_user_model()
+
+
+class ImportExportNotesTests(TestCase):
+    """Тесты команд выгрузки и загрузки заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'notes.jsonl'
+
+    def write_records(self, *records):
+        self.path.write_text(
+            ''.join(
+                json.dumps(record, ensure_ascii=False) + '\n'
+                for record in records
+            ),
+            encoding='utf-8',
+        )
+
+    def test_export_round_trip(self):
+        """Выгруженные заметки загружаются обратно без потерь."""
+        call_command(
+            'export_notes', output=str(self.path), chunk_size=1,
+            stderr=StringIO(),
+        )
+        records = [
+            json.loads(line) for line in self.path.read_text().splitlines()
+        ]
+        self.assertEqual(records, [{
+            'title': 'Заголовок',
+            'text': 'Текст заметки',
+            'slug': 'note-slug',
+            'author': 'author',
+        }])
+        Note.objects.all().delete()
+        call_command('import_notes', str(self.path), stdout=StringIO())
+        note = Note.objects.get()
+        self.assertEqual(
+            (note.title, note.text, note.slug, note.author),
+            ('Заголовок', 'Текст заметки', 'note-slug', self.author),
+        )
+
+    def test_import_builds_slug_from_title(self):
+        """Пустой slug строится так же, как в Note.save."""
+        title = 'Очень длинный заголовок ' * 10
+        self.write_records({'title': title, 'text': 'Текст',
+                            'author': 'author'})
+        call_command('import_notes', str(self.path), stdout=StringIO())
+        note = Note.objects.exclude(pk=self.note.pk).get()
+        self.assertEqual(note.slug, slugify(title)[:100])
+
+    def test_import_allocates_free_slugs(self):
+        """Одинаковые заголовки без slug получают суффиксы."""
+        self.write_records(*(
+            {'title': 'Заголовок', 'text': 'Текст', 'author': 'author'}
+            for _ in range(2)
+        ))
+        call_command('import_notes', str(self.path), stdout=StringIO())
+        self.assertEqual(
+            sorted(Note.objects.values_list('slug', flat=True)),
+            ['note-slug', 'zagolovok', 'zagolovok-2'],
+        )
+
+    def test_import_skips_conflicts(self):
+        """Заметки с занятым slug пропускаются и попадают в отчёт."""
+        self.write_records(
+            {'title': 'Дубль', 'text': 'Текст', 'slug': 'note-slug',
+             'author': 'author'},
+            {'title': 'Новая', 'text': 'Текст', 'slug': 'new',
+             'author': 'author'},
+            {'title': 'Новая', 'text': 'Текст', 'slug': 'new',
+             'author': 'author'},
+        )
+        stdout = StringIO()
+        call_command(
+            'import_notes', str(self.path), batch_size=2, stdout=stdout
+        )
+        self.assertEqual(Note.objects.count(), 2)
+        self.assertIn('Загружено: 1, пропущено: 2', stdout.getvalue())
+
+    def test_import_fails_on_conflict(self):
+        """В режиме fail конфликт останавливает загрузку."""
+        self.write_records({'title': 'Дубль', 'text': 'Текст',
+                            'slug': 'note-slug', 'author': 'author'})
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_notes', str(self.path), on_conflict='fail',
+                stdout=StringIO(),
+            )
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_import_checks_fields(self):
+        """Некорректный slug пропускается, длинный заголовок обрезается."""
+        self.write_records(
+            {'title': 'Пробел', 'text': 'Текст', 'slug': 'bad slug',
+             'author': 'author'},
+            {'title': 'Длинный slug', 'text': 'Текст', 'slug': 'a' * 101,
+             'author': 'author'},
+            {'title': 'З' * 101, 'text': 'Текст', 'slug': 'long',
+             'author': 'author'},
+        )
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_notes', str(self.path), stdout=stdout, stderr=stderr
+        )
+        self.assertEqual(
+            Note.objects.get(slug='long').title, 'З' * 100
+        )
+        self.assertEqual(Note.objects.count(), 2)
+        self.assertIn('Загружено: 1, пропущено: 2', stdout.getvalue())
+        for number in (1, 2, 3):
+            self.assertIn(f'Строка {number}:', stderr.getvalue())
+        with self.assertRaisesMessage(CommandError, 'Строка 1:'):
+            call_command(
+                'import_notes', str(self.path), on_conflict='fail',
+                stdout=StringIO(),
+            )
+
+    def test_import_reports_bad_lines(self):
+        """Ошибка в строке файла называет её номер."""
+        for line, message in (
+            ('{"title": "Без автора"}', 'Строка 2: не указан автор.'),
+            ('{"title": ', 'Строка 2: некорректный JSON'),
+        ):
+            with self.subTest(line=line):
+                self.path.write_text(
+                    '{"title": "А", "author": "author"}\n' + line + '\n',
+                    encoding='utf-8',
+                )
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command(
+                        'import_notes', str(self.path), stdout=StringIO()
+                    )
+
+    def test_imported_notes_are_searchable(self):
+        """Загруженные заметки попадают в поисковый индекс."""
+        self.write_records({'title': 'Импорт', 'text': 'уникальное слово',
+                            'slug': 'imported', 'author': 'author'})
+        call_command('import_notes', str(self.path), stdout=StringIO())
+        client = self.client_class()
+        client.force_login(self.author)
+        response = client.get(reverse('notes:search'), {'q': 'уникальное'})
+        self.assertEqual(
+            [note.slug for note in response.context['object_list']],
+            ['imported'],
+        )
+
+
+class BenchmarkCommandsTests(TestCase):
+    """Тесты команд подготовки данных и бенчмарка страниц."""
+
+    def test_skewed_counts(self):
+        """Заметки распределяются с перекосом и без потерь."""
+        counts = skewed_counts(1000, 10, 1.1)
+        self.assertEqual(sum(counts), 1000)
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertGreater(counts[0], counts[-1] * 5)
+
+    def test_seed_rejects_bad_counts(self):
+        for options, message in (
+            ({'users': 0}, 'Нужен хотя бы один пользователь.'),
+            ({'notes': -1}, 'Число заметок не может быть отрицательным.'),
+        ):
+            with self.subTest(options=options):
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command('seed_notes', stdout=StringIO(), **options)
+        self.assertFalse(User.objects.exists())
+
+    def test_seed_and_benchmark(self):
+        """Бенчмарк прогоняет все сценарии и пишет результаты в JSON."""
+        call_command(
+            'seed_notes', users=3, notes=30, batch_size=7,
+            password='password', stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Note.objects.count(), 30)
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'bench.json'
+            call_command(
+                'bench_views', requests=2, warmup=1, memory_repeat=1,
+                password='password', output=str(output), stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())
+        self.assertEqual(
+            set(results['results']),
+            {'home', 'list', 'detail', 'add', 'edit', 'delete', 'login'},
+        )
+        for name, result in results['results'].items():
+            with self.subTest(name=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertEqual(result['count'], 2)
+        # Заметки, созданные бенчмарком, удалены.
+        self.assertEqual(Note.objects.count(), 30)
@@ -0,0 +1,148 @@
+import importlib
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import fields, search
+from notes.models import Note
+
+User = get_user_model()
+
+migration = importlib.import_module('notes.migrations.0006_compress_note_text')
+
+LOG = '\n'.join(
+    f'2024-05-06 12:{number % 60:02d} INFO worker-{number % 7} '
+    f'request {number:06d} done'
+    for number in range(400)
+)
+
+
+def stored(note_id):
+    """Тип хранения и размер текста заметки в SQLite, байт."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT typeof(text), length(CAST(text AS BLOB)) '
+            'FROM notes_note WHERE id = %s',
+            [note_id],
+        )
+        return cursor.fetchone()
+
+
+class CompressedTextTests(TestCase):
+    """Сжатие текста заметок и отложенная загрузка."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.short = Note.objects.create(
+            title='Короткая', text='Текст', slug='short', author=cls.author
+        )
+        cls.large = Note.objects.create(
+            title='Лог', text=LOG, slug='log', author=cls.author
+        )
+
+    def test_only_large_text_compressed(self):
+        self.assertEqual(
+            stored(self.short.pk), ('text', len('Текст'.encode()))
+        )
+        kind, size = stored(self.large.pk)
+        self.assertEqual(kind, 'blob')
+        self.assertLess(size * 5, len(LOG.encode()))
+        self.assertEqual(
+            Note.objects.with_text().get(pk=self.large.pk).text, LOG
+        )
+        self.assertEqual(
+            Note.objects.filter(pk=self.large.pk).values_list(
+                'text', flat=True
+            ).get(),
+            LOG,
+        )
+
+    def test_search_indexes_plain_text(self):
+        self.assertEqual(
+            search.search(self.author.pk, '000123', limit=10),
+            [self.large.pk],
+        )
+
+    def test_text_deferred_by_default(self):
+        note = Note.objects.get(pk=self.large.pk)
+        self.assertEqual(note.get_deferred_fields(), {'text', 'text_html'})
+        with self.assertNumQueries(1):
+            self.assertEqual(note.text, LOG)
+        self.assertEqual(
+            Note.objects.with_text().get(pk=self.large.pk)
+            .get_deferred_fields(),
+            set(),
+        )
+
+    def test_pages_read_text_only_when_shown(self):
+        self.client.force_login(self.author)
+        for name, args, reads_text in (
+            ('notes:list', (), False),
+            ('notes:search', (), False),
+            ('notes:detail', (self.large.slug,), True),
+        ):
+            with self.subTest(name=name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        reverse(name, args=args), {'q': 'request'}
+                    )
+                self.assertEqual(
+                    any('"notes_note"."text"' in query['sql']
+                        for query in queries),
+                    reads_text,
+                )
+        self.assertContains(response, 'request 000399 done')
+
+
+class CompressMigrationTests(TransactionTestCase):
+    """Миграция сжимает существующие тексты пачками и обратимо."""
+
+    def setUp(self):
+        author = User.objects.create(username='Автор')
+        self.notes = [
+            Note.objects.create(
+                title=f'Лог {number}', text='Текст', slug=f'log-{number}',
+                author=author,
+            )
+            for number in range(3)
+        ]
+        self.addCleanup(self.migrate, MigrationExecutor(
+            connection
+        ).loader.graph.leaf_nodes('notes'))
+
+    @staticmethod
+    def migrate(targets):
+        executor = MigrationExecutor(connection)
+        with mock.patch.object(migration, 'BATCH_SIZE', 2):
+            executor.migrate(targets)
+
+    def test_round_trip(self):
+        self.migrate([('notes', '0005_note_shards')])
+        # Строки, записанные до появления сжатия.
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE notes_note SET text = %s', [LOG])
+        self.migrate([('notes', '0006_compress_note_text')])
+        for note in self.notes:
+            self.assertEqual(stored(note.pk)[0], 'blob')
+        self.assertEqual(
+            list(Note.objects.values_list('text', flat=True)), [LOG] * 3
+        )
+        self.migrate([('notes', '0005_note_shards')])
+        for note in self.notes:
+            self.assertEqual(stored(note.pk), ('text', len(LOG.encode())))
+
+
+class CompressTests(TestCase):
+
+    def test_compress_only_when_smaller(self):
+        self.assertEqual(fields.compress('x' * 10), 'x' * 10)
+        self.assertIsInstance(fields.compress(LOG), bytes)
+        self.assertEqual(fields.decompress(fields.compress(LOG)), LOG)
+        # Короткий текст zlib только удлиняет.
+        self.assertEqual(fields.compress('abc', compress_above=0), 'abc')
@@ -0,0 +1,83 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from notes.models import Note, NotesVersion
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    """Тесты условных запросов к списку и странице заметки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+        cls.urls = (
+            reverse('notes:list'),
+            reverse('notes:detail', args=(cls.note.slug,)),
+        )
+        cls.author_client = cls.client_class()
+        cls.author_client.force_login(cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matching_etag_returns_not_modified(self):
+        """Совпавший ETag даёт 304 без загрузки заметок и шаблона."""
+        # Сессия, пользователь и валидатор списка; заметка для валидатора
+        # страницы уже в кэше после первого запроса.
+        for url, queries in zip(self.urls, (3, 2)):
+            with self.subTest(url=url):
+                etag = self.author_client.get(url)['ETag']
+                with self.assertNumQueries(queries):
+                    response = self.author_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response.templates, [])
+
+    def test_if_modified_since(self):
+        """Страница не перерисовывается, если не менялась с даты запроса."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                last_modified = self.author_client.get(url)['Last-Modified']
+                response = self.author_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_change_invalidates_etag(self):
+        """После изменения заметки страницы отдаются заново."""
+        etags = [self.author_client.get(url)['ETag'] for url in self.urls]
+        self.note.text = 'Новый текст'
+        self.note.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.author_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_notes_version_follows_changes(self):
+        """Версия автора растёт при сохранении и удалении заметок."""
+        version = NotesVersion.objects.get(author=self.author).version
+        self.note.save()
+        self.note.delete()
+        self.assertEqual(
+            NotesVersion.objects.get(author=self.author).version, version + 2
+        )
+
+    def test_author_can_be_deleted(self):
+        """Удаление автора вместе с заметками не ломается на версии."""
+        self.author.delete()
+        self.assertFalse(Note.objects.exists())
@@ -1,5 +1,8 @@
+from http import HTTPStatus
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from notes.forms import NoteForm
@@ -30,6 +33,11 @@ class BaseNotesTest(TestCase):
         cls.clients['author'].force_login(cls.author)
         cls.clients['not_author'].force_login(cls.not_author)
 
+    def setUp(self):
+        # Страницы списка кэшируются, а id пользователей между тестами
+        # повторяются, поэтому каждый тест начинается с пустого кэша.
+        cache.clear()
+
 
 class NotesFormsTests(BaseNotesTest):
     """Тесты для проверки отображения заметок в списке для разных поль-лей."""
@@ -59,3 +67,70 @@ class NotesPagesTests(BaseNotesTest):
             with self.subTest(url=url):
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+
+@override_settings(NOTES_PAGE_SIZE=2)
+class NotesListPaginationTests(BaseNotesTest):
+    """Тесты постраничного вывода списка заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}',
+                text='Текст',
+                slug=f'note-{index}',
+                author=cls.author,
+            )
+            for index in range(4)
+        )
+        cls.author_notes = list(
+            Note.objects.filter(author=cls.author).order_by('id')
+        )
+
+    def test_pages_follow_cursor(self):
+        """Страницы идут по курсору и не пересекаются."""
+        client = self.clients['author']
+        seen = []
+        url = self.url_list_notes
+        while url:
+            response = client.get(url)
+            page = list(response.context['object_list'])
+            self.assertLessEqual(len(page), 2)
+            seen.extend(page)
+            cursor = response.context['next_cursor']
+            url = cursor and f'{self.url_list_notes}?after={cursor}'
+        self.assertEqual(seen, self.author_notes)
+
+    def test_list_loads_only_template_fields(self):
+        """Текст заметки не загружается для списка."""
+        response = self.clients['author'].get(self.url_list_notes)
+        for note in response.context['object_list']:
+            self.assertIn('text', note.get_deferred_fields())
+
+    def test_deep_page_query_uses_cursor(self):
+        """Глубокая страница выбирается по id, а не через OFFSET."""
+        cursor = self.author_notes[2].id
+        with self.assertNumQueries(4) as context:
+            self.clients['author'].get(f'{self.url_list_notes}?after={cursor}')
+        sql = context.captured_queries[-1]['sql']
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor(self):
+        """Некорректный курсор приводит к 404."""
+        response = self.clients['author'].get(
+            f'{self.url_list_notes}?after=abc'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_cursor_out_of_range(self):
+        """Курсор вне диапазона id приводит к 404, а не к ошибке базы."""
+        for cursor in ('99999999999999999999', '-1'):
+            with self.subTest(cursor=cursor):
+                response = self.clients['author'].get(
+                    f'{self.url_list_notes}?after={cursor}'
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_FOUND
+                )
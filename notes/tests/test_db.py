@@ -0,0 +1,92 @@
+import json
+import sqlite3
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from notes.db import apply_pragmas
+
+
+class SqlitePragmasTests(TestCase):
+    """Настройки применяются к соединениям Django."""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_is_tuned(self):
+        """Новое соединение получает PRAGMA из настроек."""
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+        # NORMAL = 1, MEMORY = 2.
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+    def test_connections_are_persistent(self):
+        """Соединение переиспользуется между запросами."""
+        self.assertGreater(settings.DATABASES['default']['CONN_MAX_AGE'], 0)
+
+
+class SqliteConcurrencyTests(SimpleTestCase):
+    """Чтение во время записи в файловой базе SQLite."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'db.sqlite3'
+
+    def connect(self, pragmas):
+        db = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(db.close)
+        apply_pragmas(db.cursor(), pragmas)
+        return db
+
+    def read_during_write(self, pragmas):
+        writer = self.connect(pragmas)
+        writer.execute('CREATE TABLE note (id INTEGER PRIMARY KEY, title)')
+        writer.execute("INSERT INTO note (title) VALUES ('первая')")
+        # Ожидание читателя отключено, чтобы блокировка проявилась сразу.
+        reader = self.connect({**pragmas, 'busy_timeout': 0})
+        writer.execute('BEGIN EXCLUSIVE')
+        writer.execute("INSERT INTO note (title) VALUES ('вторая')")
+        try:
+            return reader.execute('SELECT count(*) FROM note').fetchone()[0]
+        finally:
+            writer.execute('COMMIT')
+
+    def test_wal_reader_is_not_blocked(self):
+        """В WAL читатель видит последнюю зафиксированную версию."""
+        self.assertEqual(self.read_during_write(settings.SQLITE_PRAGMAS), 1)
+
+    def test_rollback_journal_blocks_reader(self):
+        """Без WAL та же запись блокирует чтение."""
+        pragmas = {**settings.SQLITE_PRAGMAS, 'journal_mode': 'DELETE'}
+        with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+            self.read_during_write(pragmas)
+
+
+class SqliteBenchmarkTests(SimpleTestCase):
+    """Бенчмарк смешанной нагрузки."""
+
+    def test_bench_sqlite(self):
+        """Оба профиля прогоняются и пишут результаты в JSON."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'bench.json'
+            call_command(
+                'bench_sqlite', readers=2, writers=1, duration=0.2,
+                notes=100, authors=5, output=str(output),
+                stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())['results']
+        self.assertEqual(set(results), {'default', 'tuned'})
+        for profile, result in results.items():
+            with self.subTest(profile=profile):
+                self.assertGreater(result['read']['count'], 0)
+                self.assertGreater(result['write']['count'], 0)
+                self.assertEqual(result['locked'], 0)
@@ -0,0 +1,100 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TransactionTestCase
+
+from notes import loadtest
+from notes.models import Note
+
+User = get_user_model()
+
+KEYS = {
+    'users:login:get', 'users:login:post', 'notes:list:get',
+    'notes:add:get', 'notes:add:post', 'total',
+}
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    """Команда loadtest на одном пользователе.
+
+    Тестовая база SQLite в памяти не допускает параллельной записи
+    из потоков, поэтому в тестах пользователь один.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='bench-0', password='bench-password'
+        )
+        Note.objects.create(
+            title='Заметка', text='Текст', slug='seeded', author=self.user
+        )
+
+    def run_command(self, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'loadtest.json'
+            call_command(
+                'loadtest', users=1, actions=30, output=str(output),
+                stdout=StringIO(), **options,
+            )
+            return json.loads(output.read_text())
+
+    def check_results(self, payload):
+        results = payload['results']
+        self.assertLessEqual(KEYS, set(results))
+        for key, summary in results.items():
+            with self.subTest(key=key):
+                self.assertEqual(summary['errors'], 0)
+                self.assertGreater(summary['count'], 0)
+        self.assertEqual(
+            results['total']['count'],
+            sum(
+                summary['count'] for key, summary in results.items()
+                if key != 'total'
+            ),
+        )
+        # Созданные при нагрузке заметки удалены, чужие остались.
+        self.assertEqual(
+            list(Note.objects.values_list('slug', flat=True)), ['seeded']
+        )
+
+    def test_wsgi(self):
+        payload = self.run_command()
+        self.assertEqual(payload['meta']['transport'], 'wsgi')
+        self.check_results(payload)
+
+    def test_through_server(self):
+        payload = self.run_command(server=True)
+        self.assertEqual(payload['meta']['transport'], 'server')
+        self.check_results(payload)
+
+    def test_wrong_password_counted_as_error(self):
+        payload = self.run_command(password='wrong')
+        self.assertEqual(
+            payload['results']['users:login:post']['error_rate'], 1.0
+        )
+
+    def test_requires_users(self):
+        with self.assertRaisesMessage(CommandError, 'seed_notes'):
+            call_command('loadtest', prefix='missing', stdout=StringIO())
+
+
+class ReportTests(SimpleTestCase):
+
+    def test_rates_per_key(self):
+        results = loadtest.report([
+            ('notes:list:get', 10.0, True),
+            ('notes:list:get', 30.0, False),
+            ('notes:add:post', 20.0, True),
+        ], elapsed=2.0)
+        self.assertEqual(results['notes:list:get']['error_rate'], 0.5)
+        self.assertEqual(results['notes:list:get']['rps'], 1.0)
+        self.assertEqual(results['notes:list:get']['p95_ms'], 30.0)
+        self.assertEqual(results['total']['count'], 3)
+        self.assertEqual(results['total']['errors'], 1)
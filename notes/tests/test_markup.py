@@ -0,0 +1,167 @@
+import json
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from notes import markup
+from notes.models import Note
+
+User = get_user_model()
+
+
+class RenderTests(SimpleTestCase):
+
+    def test_markdown(self):
+        html = markup.render(
+            '# Заголовок\n\n**жирный** и *курсив*\n\n- один\n- два\n\n'
+            '```\nкод\n```'
+        )
+        for fragment in (
+            '<h1>Заголовок</h1>', '<strong>жирный</strong>',
+            '<em>курсив</em>', '<li>один</li>', '<code>код\n</code>',
+        ):
+            with self.subTest(fragment=fragment):
+                self.assertIn(fragment, html)
+
+    def test_unsafe_html_removed(self):
+        html = markup.render(
+            '<script>alert(1)</script>\n\n'
+            '<img src=x onerror="alert(1)">\n\n'
+            '[ссылка](javascript:alert(1)) [сайт](https://example.com)'
+        )
+        self.assertNotIn('<script', html)
+        self.assertNotIn('<img', html)
+        self.assertNotIn('javascript:', html)
+        self.assertIn('<a href="https://example.com">сайт</a>', html)
+
+
+class NoteHtmlTests(TestCase):
+    """HTML текста строится при сохранении и хранится в заметке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+
+    def setUp(self):
+        cache.clear()
+        self.note = Note.objects.create(
+            title='Заметка', text='**Текст**', slug='note',
+            author=self.author,
+        )
+        self.client.force_login(self.author)
+
+    def test_rendered_on_save(self):
+        self.assertEqual(self.note.text_html, '<p><strong>Текст</strong></p>')
+        self.assertEqual(
+            self.note.text_hash, markup.source_hash('**Текст**')
+        )
+
+    def test_rerendered_only_when_text_changes(self):
+        with mock.patch.object(
+            markup, 'render', wraps=markup.render
+        ) as render:
+            self.note.title = 'Новый заголовок'
+            self.note.save()
+            note = Note.objects.get(pk=self.note.pk)
+            note.title = 'Без текста'
+            note.save()
+            render.assert_not_called()
+            self.note.text = '*Новый*'
+            self.note.save(update_fields=['text'])
+            render.assert_called_once_with('*Новый*')
+        note = Note.objects.with_text().get(pk=self.note.pk)
+        self.assertEqual(note.text_html, '<p><em>Новый</em></p>')
+        self.assertEqual(note.text_hash, markup.source_hash('*Новый*'))
+
+    def test_detail_serves_stored_html(self):
+        url = reverse('notes:detail', args=(self.note.slug,))
+        with mock.patch.object(markup, 'render') as render:
+            response = self.client.get(url)
+        render.assert_not_called()
+        self.assertContains(response, '<strong>Текст</strong>', html=True)
+
+    def test_detail_without_html_shows_text(self):
+        Note.objects.filter(pk=self.note.pk).update(text_hash='')
+        response = self.client.get(
+            reverse('notes:detail', args=(self.note.slug,))
+        )
+        self.assertContains(response, '**Текст**')
+        self.assertNotContains(response, '<strong>')
+
+    def test_batch_renders_html(self):
+        response = self.client.post(
+            reverse('notes:batch'),
+            data=json.dumps({'operations': [
+                {'action': 'create', 'title': 'Новая', 'slug': 'new',
+                 'text': '# Новая'},
+                {'action': 'update', 'target': 'note', 'text': '_Правка_'},
+            ]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(Note.objects.values_list('slug', 'text_html')),
+            {'new': '<h1>Новая</h1>', 'note': '<p><em>Правка</em></p>'},
+        )
+
+    def test_backfill(self):
+        Note.objects.filter(pk=self.note.pk).update(
+            text_html='', text_hash=''
+        )
+        other = Note.objects.create(
+            title='Другая', text='Уже', slug='other', author=self.author
+        )
+        self.client.get(reverse('notes:detail', args=(self.note.slug,)))
+        output = StringIO()
+        with mock.patch.object(
+            markup, 'render', wraps=markup.render
+        ) as render:
+            call_command(
+                'render_notes', workers=1, batch_size=1, stdout=output
+            )
+        render.assert_called_once_with('**Текст**')
+        self.assertIn('Отрендерено заметок: 1.', output.getvalue())
+        self.assertEqual(
+            dict(Note.objects.values_list('slug', 'text_html')),
+            {'note': '<p><strong>Текст</strong></p>', 'other': '<p>Уже</p>'},
+        )
+        self.assertEqual(other.text_html, '<p>Уже</p>')
+        # Кэшированная страница со старым текстом не отдаётся.
+        response = self.client.get(
+            reverse('notes:detail', args=(self.note.slug,))
+        )
+        self.assertContains(response, '<strong>Текст</strong>', html=True)
+
+    def test_backfill_in_processes(self):
+        Note.objects.filter(pk=self.note.pk).update(text_hash='')
+        call_command(
+            'render_notes', workers=2, batch_size=1, force=True,
+            stdout=StringIO(),
+        )
+        self.assertEqual(
+            Note.objects.get(pk=self.note.pk).text_hash,
+            markup.source_hash('**Текст**'),
+        )
+
+    def test_backfill_in_daemon_process(self):
+        """Из демонического процесса пул не заводится."""
+        Note.objects.filter(pk=self.note.pk).update(text_hash='')
+        command = 'notes.management.commands.render_notes'
+        with mock.patch(
+            f'{command}.multiprocessing.current_process',
+            return_value=SimpleNamespace(daemon=True),
+        ), mock.patch(f'{command}.ProcessPoolExecutor') as pool:
+            call_command(
+                'render_notes', workers=2, batch_size=1, stdout=StringIO(),
+            )
+        pool.assert_not_called()
+        self.assertEqual(
+            Note.objects.get(pk=self.note.pk).text_hash,
+            markup.source_hash('**Текст**'),
+        )
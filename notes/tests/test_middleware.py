@@ -0,0 +1,92 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes.models import Note
+
+User = get_user_model()
+
+PROFILING_MIDDLEWARE = 'notes.middleware.ProfilingMiddleware'
+
+
+@override_settings(
+    NOTES_PROFILING=True,
+    NOTES_PROFILING_SAMPLE_RATE=1.0,
+    NOTES_PROFILING_SLOW_MS=0,
+)
+class ProfilingMiddlewareTests(TestCase):
+    """Тесты middleware профилирования запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+        cls.url = reverse('notes:detail', args=(cls.note.slug,))
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def get_logged(self):
+        with self.assertLogs('notes.profiling') as logs:
+            response = self.client.get(self.url)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_server_timing_header(self):
+        """Ответ содержит SQL, шаблон и общее время в Server-Timing."""
+        response, _ = self.get_logged()
+        timing = response['Server-Timing']
+        for metric in ('sql;desc=', 'template;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+
+    def test_structured_log_with_sql(self):
+        """В лог пишутся счётчики запроса и SQL медленных запросов."""
+        _, record = self.get_logged()
+        self.assertEqual(record['url_name'], 'notes:detail')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], len(record['sql']))
+        self.assertGreater(record['template_ms'], 0)
+        self.assertTrue(record['slow'])
+
+    @override_settings(NOTES_PROFILING_SLOW_MS=10 ** 6)
+    def test_fast_requests_do_not_log_sql(self):
+        """Быстрые запросы попадают в лог без текстов SQL."""
+        _, record = self.get_logged()
+        self.assertNotIn('sql', record)
+
+    @override_settings(NOTES_PROFILING=False)
+    def test_disabled_by_default(self):
+        """Выключенное профилирование не добавляет заголовок."""
+        self.assertIn(PROFILING_MIDDLEWARE, settings.MIDDLEWARE)
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_profiling_summary(self):
+        """Команда сводит лог по именам URL."""
+        records = [
+            {'url_name': 'notes:list', 'path': '/notes/', 'queries': 3,
+             'sql_ms': 1.0, 'template_ms': 2.0, 'total_ms': total}
+            for total in (5.0, 15.0)
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'profiling.log'
+            path.write_text(''.join(json.dumps(r) + '\n' for r in records))
+            stdout = StringIO()
+            call_command('profiling_summary', str(path), json=True,
+                         stdout=stdout)
+        summary = json.loads(stdout.getvalue())['notes:list']
+        self.assertEqual(summary['count'], 2)
+        self.assertEqual(summary['p95_ms'], 15.0)
+        self.assertEqual(summary['queries'], 3)
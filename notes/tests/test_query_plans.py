@@ -0,0 +1,111 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+
+from notes import slugs, views
+from notes.models import Note
+
+User = get_user_model()
+
+# Полный просмотр таблицы или индекса и сортировка во временном дереве.
+DEGRADED_PLAN = re.compile(r'^SCAN notes_|USE TEMP B-TREE')
+
+
+class QueryPlanTests(TestCase):
+    """Запросы представлений не должны деградировать до полного просмотра.
+
+    Для каждого queryset, который выполняют представления, строится
+    EXPLAIN QUERY PLAN; тест падает, если SQLite читает таблицу или
+    индекс целиком вместо поиска по индексу.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+
+    def make_view(self, view_class, query=None, **kwargs):
+        request = RequestFactory().get('/', query or {})
+        request.user = self.author
+        view = view_class()
+        view.setup(request, **kwargs)
+        return view
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_uses_index(self, name, queryset):
+        with self.subTest(name=name):
+            plan = self.explain(queryset)
+            degraded = [step for step in plan if DEGRADED_PLAN.search(step)]
+            self.assertEqual(degraded, [], plan)
+
+    def test_list_queries(self):
+        """Первая и глубокая страницы списка читаются по индексу."""
+        page_size = views.NotesList().get_page_size()
+        first = self.make_view(views.NotesList)
+        deep = self.make_view(views.NotesList, {'after': self.note.id})
+        self.assert_uses_index(
+            'first page', first.get_queryset()[:page_size + 1]
+        )
+        self.assert_uses_index(
+            'deep page', deep.get_queryset()[:page_size + 1]
+        )
+
+    def test_slug_lookups(self):
+        """Заметка автора по slug ищется по индексу."""
+        for view_class in (
+            views.NoteDetail, views.NoteUpdate, views.NoteDelete
+        ):
+            view = self.make_view(view_class, slug=self.note.slug)
+            self.assert_uses_index(
+                view_class.__name__,
+                view.get_queryset().filter(slug=self.note.slug),
+            )
+
+    def test_conditional_get_validators(self):
+        """Валидаторы условных запросов не читают таблицу целиком."""
+        detail = self.make_view(views.NoteDetail, slug=self.note.slug)
+        self.assert_uses_index(
+            'detail validators',
+            detail.get_queryset().filter(
+                slug=self.note.slug
+            ).values_list('id', 'modified'),
+        )
+        self.assert_uses_index(
+            'list validators',
+            views.NotesVersion.objects.filter(
+                author=self.author
+            ).values_list('version', 'modified'),
+        )
+
+    def test_search_and_batch_lookups(self):
+        """Выборки поиска и пакетного API идут по индексу."""
+        search = self.make_view(views.NoteSearch)
+        self.assert_uses_index(
+            'search results', search.get_queryset().filter(id__in=[1, 2])
+        )
+        batch = self.make_view(views.NoteBatchApi)
+        self.assert_uses_index(
+            'batch targets',
+            batch.get_queryset().filter(slug__in=['a', 'b']),
+        )
+
+    def test_slug_allocation(self):
+        """Подбор свободного slug читает диапазон уникального индекса."""
+        notes = Note._base_manager.all()
+        condition = slugs.variants_lookup(Note, 'zagolovok', notes)
+        self.assert_uses_index(
+            'slug variants',
+            notes.filter(condition).values_list('slug', 'id'),
+        )
@@ -0,0 +1,151 @@
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import (
+    SimpleTestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from notes import routers
+from notes.forms import WARNING
+from notes.middleware import ReplicaPinningMiddleware
+from notes.models import Note
+
+User = get_user_model()
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Выбор базы маршрутизатором."""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    @override_settings(NOTES_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик маршрутизатор не вмешивается в чтение."""
+        self.assertIsNone(self.router.db_for_read(Note))
+
+    @override_settings(NOTES_REPLICAS=['test_replica'])
+    def test_reads_and_writes(self):
+        """Заметки читаются с реплики, пишутся в основную базу."""
+        self.assertEqual(self.router.db_for_read(Note), 'test_replica')
+        self.assertEqual(self.router.db_for_write(Note), 'default')
+        # Пользователи не маршрутизируются.
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertFalse(
+            self.router.allow_migrate('test_replica', 'notes', 'note')
+        )
+
+    @override_settings(NOTES_REPLICAS=['test_replica'])
+    def test_use_primary(self):
+        """Внутри use_primary() чтение идёт в основную базу."""
+        with routers.use_primary():
+            self.assertEqual(self.router.db_for_read(Note), 'default')
+        self.assertEqual(self.router.db_for_read(Note), 'test_replica')
+
+
+class ReplicaSyncTests(TransactionTestCase):
+    """Реплика в отдельном файле SQLite, обновляемая sync_replica."""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.databases['test_replica'] = {
+            **connections.databases['default'],
+            'NAME': str(Path(directory.name) / 'replica.sqlite3'),
+        }
+        self.addCleanup(self.remove_replica)
+        settings = override_settings(
+            NOTES_REPLICAS=['test_replica'],
+            # Метки закрепления видны всем процессам.
+            CACHES={'default': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': str(Path(directory.name) / 'cache'),
+            }},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        self.author = User.objects.create(username='Автор')
+        self.client.force_login(self.author)
+        self.first = Note.objects.create(
+            title='Первая', text='Текст', slug='first', author=self.author
+        )
+        self.sync()
+
+    def remove_replica(self):
+        connections['test_replica'].close()
+        del connections['test_replica']
+        del connections.databases['test_replica']
+
+    def sync(self):
+        call_command('sync_replica', stdout=StringIO())
+
+    def test_replica_lags_until_sync(self):
+        """Реплика отстаёт до синхронизации, автор читает свои записи."""
+        second = Note.objects.create(
+            title='Вторая', text='Текст', slug='second', author=self.author
+        )
+        self.assertEqual(Note.objects.count(), 1)
+        detail_url = reverse('notes:detail', args=(second.slug,))
+        # Автор только что писал: страница читается из основной базы.
+        response = self.client.get(detail_url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        # Окно закрепления истекло, а реплика ещё не обновлена.
+        cache.clear()
+        response = self.client.get(detail_url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.sync()
+        response = self.client.get(detail_url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(Note.objects.count(), 2)
+
+    def test_write_pins_author(self):
+        """После изменения заметок автор закреплён за основной базой."""
+        cache.clear()
+        self.assertFalse(routers.is_pinned(self.author.pk))
+        Note.objects.create(
+            title='Вторая', text='Текст', slug='second', author=self.author
+        )
+        self.assertTrue(routers.is_pinned(self.author.pk))
+
+    def test_transaction_reads_primary(self):
+        """Внутри транзакции заметки читаются из основной базы."""
+        with transaction.atomic():
+            Note.objects.create(
+                title='Вторая', text='Текст', slug='second',
+                author=self.author,
+            )
+            self.assertEqual(Note.objects.count(), 2)
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_pinning_needs_shared_cache(self):
+        """С кэшем в памяти процесса middleware не запускается."""
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaPinningMiddleware(lambda request: None)
+        ReplicaPinningMiddleware(lambda request: None)
+
+    def test_form_post_uses_primary(self):
+        """Проверка занятого адреса в форме видит свежие записи."""
+        Note.objects.create(
+            title='Вторая', text='Текст', slug='second', author=self.author
+        )
+        cache.clear()
+        response = self.client.post(
+            reverse('notes:add'),
+            {'title': 'Третья', 'text': 'Текст', 'slug': 'second'},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(response, 'form', 'slug', 'second' + WARNING)
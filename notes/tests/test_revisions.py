@@ -0,0 +1,217 @@
+import json
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from notes import revisions
+from notes.models import Note, NoteRevision
+
+User = get_user_model()
+
+TEXT = '\n'.join(f'Строка {number}' for number in range(50))
+
+
+def edited(number):
+    """Текст после правки number: меняется одна строка."""
+    lines = TEXT.splitlines()
+    lines[number % len(lines)] = f'Правка {number}'
+    return '\n'.join(lines)
+
+
+class DeltaTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        for base, text in (
+            ('', TEXT),
+            (TEXT, ''),
+            (TEXT, edited(3)),
+            ('а\nб\n', 'а\nб'),
+            ('а\nб', 'в\nа\nб\nг\n'),
+        ):
+            with self.subTest(base=base[:10], text=text[:10]):
+                delta = revisions.make_delta(base, text)
+                self.assertEqual(revisions.apply_delta(base, delta), text)
+
+    def test_small_edit_gives_small_delta(self):
+        self.assertLess(
+            len(revisions.make_delta(TEXT, edited(3))) * 10, len(TEXT)
+        )
+
+
+@override_settings(NOTES_REVISION_SNAPSHOT_EVERY=5)
+class RevisionTests(TestCase):
+    """Ревизии при сохранении, просмотр истории и очистка."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.reader = User.objects.create(username='Читатель')
+
+    def setUp(self):
+        self.note = Note.objects.create(
+            title='Заметка', text=TEXT, slug='note', author=self.author
+        )
+        self.client.force_login(self.author)
+
+    def edit(self, count):
+        for number in range(1, count + 1):
+            self.note.text = edited(number)
+            self.note.save()
+
+    def history(self):
+        return list(NoteRevision.objects.filter(
+            note_id=self.note.pk
+        ).order_by('number').values_list('number', 'snapshot'))
+
+    def test_snapshot_every_k(self):
+        """Снимок пишется раз в K ревизий, остальные - разности с ним."""
+        self.edit(11)
+        self.assertEqual(self.history(), [
+            (1, 1), (2, 1), (3, 1), (4, 1), (5, 1),
+            (6, 6), (7, 6), (8, 6), (9, 6), (10, 6),
+            (11, 11), (12, 11),
+        ])
+
+    def test_any_revision_in_two_queries(self):
+        self.edit(12)
+        for number in range(1, 14):
+            with self.subTest(number=number):
+                with self.assertNumQueries(
+                    1 if number in (1, 6, 11) else 2
+                ):
+                    title, text = revisions.get_text(self.note.pk, number)
+                self.assertEqual(title, 'Заметка')
+                self.assertEqual(
+                    text, TEXT if number == 1 else edited(number - 1)
+                )
+
+    def test_unchanged_save_records_nothing(self):
+        self.note.save()
+        self.note.title = 'Новый заголовок'
+        self.note.save()
+        self.assertEqual(self.history(), [(1, 1), (2, 1)])
+        self.assertEqual(revisions.get_text(self.note.pk, 2)[0],
+                         'Новый заголовок')
+
+    def test_edit_through_form(self):
+        self.client.post(
+            reverse('notes:edit', args=(self.note.slug,)),
+            {'title': 'Заметка', 'text': edited(1), 'slug': self.note.slug},
+        )
+        self.assertEqual(
+            revisions.get_text(self.note.pk, 2), ('Заметка', edited(1))
+        )
+
+    def test_history_and_diff_pages(self):
+        self.edit(2)
+        response = self.client.get(
+            reverse('notes:history', args=(self.note.slug,))
+        )
+        self.assertEqual(
+            [revision.number for revision in response.context['revisions']],
+            [3, 2, 1],
+        )
+        response = self.client.get(
+            reverse('notes:diff', args=(self.note.slug, 3))
+        )
+        self.assertIn(('removed', '-Строка 2'), response.context['diff'])
+        self.assertIn(('added', '+Правка 2'), response.context['diff'])
+        self.assertContains(response, 'Правка 2')
+        response = self.client.get(
+            reverse('notes:diff', args=(self.note.slug, 1))
+        )
+        self.assertIn(('added', '+Строка 0'), response.context['diff'])
+
+    def test_pages_only_for_author(self):
+        self.client.force_login(self.reader)
+        for url in (
+            reverse('notes:history', args=(self.note.slug,)),
+            reverse('notes:diff', args=(self.note.slug, 1)),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.client.get(url).status_code, HTTPStatus.NOT_FOUND
+                )
+
+    def test_missing_revision(self):
+        for number in (7, 99999999999999999999):
+            with self.subTest(number=number):
+                response = self.client.get(
+                    reverse('notes:diff', args=(self.note.slug, number))
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_FOUND
+                )
+
+    def test_prune_keeps_revisions_readable(self):
+        self.edit(13)
+        other = Note.objects.create(
+            title='Другая', text=TEXT, slug='other', author=self.author
+        )
+        output = StringIO()
+        call_command('prune_revisions', keep=4, batch_size=1, stdout=output)
+        # Последние 4 ревизии (11-14) собираются от снимка 11.
+        self.assertEqual(
+            [number for number, _ in self.history()], [11, 12, 13, 14]
+        )
+        self.assertIn('Удалено ревизий: 10.', output.getvalue())
+        for number in range(11, 15):
+            self.assertEqual(
+                revisions.get_text(self.note.pk, number)[1],
+                edited(number - 1),
+            )
+        self.assertTrue(
+            NoteRevision.objects.filter(note_id=other.pk).exists()
+        )
+
+    def test_prune_then_view_diffs(self):
+        """Каждая ревизия из истории открывается и после очистки."""
+        self.edit(13)
+        call_command('prune_revisions', keep=4, stdout=StringIO())
+        response = self.client.get(
+            reverse('notes:history', args=(self.note.slug,))
+        )
+        numbers = [
+            revision.number for revision in response.context['revisions']
+        ]
+        self.assertEqual(numbers, [14, 13, 12, 11])
+        for number in numbers:
+            with self.subTest(number=number):
+                response = self.client.get(
+                    reverse('notes:diff', args=(self.note.slug, number))
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['first_kept'])
+        self.assertContains(response, 'Более ранние ревизии удалены')
+        self.assertIn(('added', '+Правка 10'), response.context['diff'])
+
+    def test_delete_forgets_history(self):
+        self.edit(2)
+        self.client.post(reverse('notes:delete', args=(self.note.slug,)))
+        self.assertEqual(self.history(), [])
+
+    def test_batch_records_revisions(self):
+        """Пакет пишет ревизии созданных и изменённых заметок."""
+        response = self.client.post(
+            reverse('notes:batch'),
+            data=json.dumps({'operations': [
+                {'action': 'create', 'title': f'Новая {number}',
+                 'text': 'Текст'}
+                for number in range(3)
+            ] + [
+                {'action': 'update', 'target': self.note.slug,
+                 'text': edited(1)},
+            ]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            NoteRevision.objects.filter(snapshot=1, number=1).count(), 4
+        )
+        self.assertEqual(
+            revisions.get_text(self.note.pk, 2), ('Заметка', edited(1))
+        )
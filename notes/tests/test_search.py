@@ -0,0 +1,122 @@
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from notes import search
+from notes.models import Note
+
+User = get_user_model()
+
+
+class NoteSearchTests(TestCase):
+    """Тесты полнотекстового поиска по заметкам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.not_author = User.objects.create(username='Не автор')
+        cls.title_note = Note.objects.create(
+            title='Рецепт борща',
+            text='Свёкла, капуста',
+            slug='borsch',
+            author=cls.author,
+        )
+        cls.text_note = Note.objects.create(
+            title='Покупки',
+            text='Купить свёклу для борща',
+            slug='shopping',
+            author=cls.author,
+        )
+        cls.other_note = Note.objects.create(
+            title='Чужой борщ',
+            text='Текст',
+            slug='other-borsch',
+            author=cls.not_author,
+        )
+        cls.url = reverse('notes:search')
+        cls.author_client = cls.client_class()
+        cls.author_client.force_login(cls.author)
+
+    def search(self, query, **params):
+        response = self.author_client.get(self.url, {'q': query, **params})
+        return list(response.context['object_list']), response
+
+    def test_search_is_scoped_to_author(self):
+        """В выдаче только заметки автора, заголовок важнее текста."""
+        notes, _ = self.search('борща')
+        self.assertEqual(notes, [self.title_note, self.text_note])
+
+    def test_index_follows_save_and_delete(self):
+        """Индекс обновляется при изменении и удалении заметки."""
+        self.text_note.text = 'Купить молоко'
+        self.text_note.save()
+        self.assertEqual(self.search('молоко')[0], [self.text_note])
+        self.text_note.delete()
+        self.assertEqual(self.search('молоко')[0], [])
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не приводят к ошибке."""
+        notes, _ = self.search('борща" OR author:*')
+        self.assertEqual(notes, [])
+
+    @override_settings(NOTES_PAGE_SIZE=1)
+    def test_search_is_paginated(self):
+        """Результаты поиска выводятся постранично."""
+        notes, response = self.search('борща')
+        self.assertEqual(notes, [self.title_note])
+        self.assertEqual(response.context['next_page'], 2)
+        notes, response = self.search('борща', page=2)
+        self.assertEqual(notes, [self.text_note])
+        self.assertIsNone(response.context['next_page'])
+
+    def test_page_out_of_range(self):
+        """Номер страницы вне диапазона приводит к 404."""
+        for page in ('0', '99999999999999999999'):
+            with self.subTest(page=page):
+                response = self.author_client.get(
+                    self.url, {'q': 'борща', 'page': page}
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_FOUND
+                )
+
+    @override_settings(NOTES_PAGE_SIZE=1)
+    def test_search_without_fts(self):
+        """Без FTS5 ищется и по сжатому тексту, постранично."""
+        long_note = Note.objects.create(
+            title='Список',
+            text='Свёкла. ' + 'Морковь, лук. ' * 200,
+            slug='long',
+            author=self.author,
+        )
+        # Текст хранится сжатым, и LIKE по нему не находит слова.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT typeof(text) FROM notes_note WHERE id = %s',
+                [long_note.pk],
+            )
+            self.assertEqual(cursor.fetchone(), ('blob',))
+        with mock.patch.object(search, 'is_supported', return_value=False):
+            self.assertEqual(self.search('МОРКОВЬ')[0], [long_note])
+            notes, response = self.search('свёкл')
+            self.assertEqual(notes, [self.title_note])
+            self.assertEqual(response.context['next_page'], 2)
+            notes, response = self.search('свёкл', page=3)
+            self.assertEqual(notes, [long_note])
+            self.assertIsNone(response.context['next_page'])
+
+    def test_rebuild_search_index(self):
+        """Команда перестраивает индекс с нуля."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        self.assertEqual(self.search('борща')[0], [])
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            self.search('борща')[0], [self.title_note, self.text_note]
+        )
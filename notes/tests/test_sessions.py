@@ -0,0 +1,145 @@
+import tempfile
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import cache as notes_cache
+from notes.backends import CachedModelBackend
+from notes.models import Note
+
+User = get_user_model()
+
+# Сессии и аутентификация как в yanote.settings_serve.
+serve_sessions = override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+    AUTHENTICATION_BACKENDS=['notes.backends.CachedModelBackend'],
+)
+
+
+class CachedSessionTests(TestCase):
+    """Сессия в cookie и пользователь из кэша без запросов к БД."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Общий для процессов кэш, как в yanote.settings_serve.
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.shared_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cls.directory.name,
+        }})
+        cls.shared_cache.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.shared_cache.disable()
+        cls.directory.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+        cls.urls = (
+            reverse('notes:list'),
+            reverse('notes:detail', args=(cls.note.slug,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def warm_queries(self, url):
+        """Число запросов к БД при повторном запросе страницы."""
+        client = self.client_class()
+        client.force_login(self.author)
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return len(queries)
+
+    def test_session_and_user_queries_removed(self):
+        """Без запросов сессии и пользователя остаются только N запросов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                default = self.warm_queries(url)
+                with serve_sessions:
+                    served = self.warm_queries(url)
+                self.assertEqual(served, default - 2)
+
+    @serve_sessions
+    def test_password_change_ends_sessions(self):
+        self.client.force_login(self.author)
+        url = self.urls[1]
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+        self.assertIsNotNone(notes_cache.get_user(self.author.pk))
+        self.author.set_password('new-password')
+        self.author.save()
+        self.assertIsNone(notes_cache.get_user(self.author.pk))
+        response = self.client.get(url)
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={url}'
+        )
+
+    @serve_sessions
+    def test_logout_forgets_user(self):
+        self.client.force_login(self.author)
+        self.client.get(self.urls[0])
+        self.assertIsNotNone(notes_cache.get_user(self.author.pk))
+        self.client.post(reverse('users:logout'))
+        self.assertIsNone(notes_cache.get_user(self.author.pk))
+        response = self.client.get(self.urls[0])
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    @serve_sessions
+    def test_inactive_cached_user_rejected(self):
+        self.client.force_login(self.author)
+        self.client.get(self.urls[0])
+        User.objects.filter(pk=self.author.pk).update(is_active=False)
+        cached = notes_cache.get_user(self.author.pk)
+        cached.is_active = False
+        notes_cache.set_user(cached)
+        response = self.client.get(self.urls[0])
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    @serve_sessions
+    def test_invalidation_reaches_other_worker(self):
+        """Пользователь, закэшированный одним воркером, сбрасывается другим.
+
+        Воркеры обращаются к кэшу через разные экземпляры бэкенда.
+        """
+        worker = caches.create_connection('default')
+        self.assertIsNot(worker, caches['default'])
+        key = notes_cache.user_key(self.author.pk)
+        url = self.urls[0]
+        self.client.force_login(self.author)
+        with mock.patch('notes.cache.get_cache', return_value=worker):
+            self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+        self.assertIsNotNone(worker.get(key))
+        self.author.set_password('new-password')
+        self.author.save()
+        self.assertIsNone(worker.get(key))
+        with mock.patch('notes.cache.get_cache', return_value=worker):
+            response = self.client.get(url)
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={url}'
+        )
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_local_memory_cache_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            CachedModelBackend()
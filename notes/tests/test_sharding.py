@@ -0,0 +1,338 @@
+import json
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from notes import routers, search, sharding
+from notes.forms import WARNING
+from notes.models import AuthorShard, Note, NoteSlug
+
+User = get_user_model()
+
+SHARD = 'test_shard'
+
+
+class ShardMappingTests(SimpleTestCase):
+    """Выбор шарда и миграции шардов."""
+
+    @override_settings(NOTES_SHARDS=['default', 'shard1', 'shard2'])
+    def test_hash_is_stable(self):
+        """Хэш не зависит от запуска и распределяет авторов по шардам."""
+        self.assertEqual(
+            [sharding.hash_shard(author_id) for author_id in range(1, 7)],
+            ['shard2', 'shard1', 'shard1', 'shard1', 'shard1', 'shard1'],
+        )
+        counts = {}
+        for author_id in range(3000):
+            shard = sharding.hash_shard(author_id)
+            counts[shard] = counts.get(shard, 0) + 1
+        self.assertGreater(min(counts.values()), 900)
+
+    @override_settings(NOTES_SHARDS=['default'])
+    def test_without_shards(self):
+        """С одним шардом маршрутизатор и каталог не используются."""
+        self.assertIsNone(sharding.db_for_author(1))
+        self.assertIsNone(routers.ShardRouter().db_for_write(Note))
+
+    @override_settings(NOTES_SHARDS=['default', 'shard1'])
+    def test_shards_get_only_notes_table(self):
+        router = routers.ShardRouter()
+        self.assertTrue(router.allow_migrate('shard1', 'notes', 'note'))
+        for app_label, model_name in (
+            ('notes', 'noteslug'), ('notes', 'notesversion'),
+            ('auth', 'user'), ('sessions', 'session'),
+        ):
+            with self.subTest(model=model_name):
+                self.assertFalse(
+                    router.allow_migrate('shard1', app_label, model_name)
+                )
+        self.assertIsNone(router.allow_migrate('default', 'auth', 'user'))
+
+
+@override_settings(NOTES_SHARDS=['default', SHARD])
+class ShardingTests(TransactionTestCase):
+    """Заметки в шарде автора при второй базе в отдельном файле."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.databases[SHARD] = {
+            **connections.databases['default'],
+            'NAME': str(Path(cls.directory.name) / 'shard.sqlite3'),
+        }
+        call_command('migrate', database=SHARD, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[SHARD].close()
+        del connections[SHARD]
+        del connections.databases[SHARD]
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.sharded = User.objects.create(username='В шарде')
+        self.local = User.objects.create(username='В default')
+        sharding.set_shard(self.sharded.pk, SHARD)
+        sharding.set_shard(self.local.pk, 'default')
+        self.sharded_client = self.client_class()
+        self.sharded_client.force_login(self.sharded)
+
+    def tearDown(self):
+        Note.objects.using(SHARD).all()._raw_delete(SHARD)
+        search.clear(SHARD)
+
+    def shard_notes(self, author, using=SHARD):
+        return Note.objects.using(using).filter(author=author)
+
+    def test_notes_live_in_author_shard(self):
+        """Заметка пишется в шард автора и читается оттуда."""
+        response = self.sharded_client.post(
+            reverse('notes:add'), {'title': 'Заметка', 'text': 'Текст'}
+        )
+        self.assertRedirects(response, reverse('notes:success'))
+        note = self.shard_notes(self.sharded).get()
+        self.assertFalse(self.shard_notes(self.sharded, 'default').exists())
+        self.assertEqual(NoteSlug.objects.get(slug=note.slug).pk, note.pk)
+        for url in (
+            reverse('notes:list'), reverse('notes:detail', args=(note.slug,))
+        ):
+            with self.subTest(url=url):
+                self.assertContains(self.sharded_client.get(url), 'Заметка')
+        # Автор заметки из другой базы берётся из default.
+        self.assertEqual(note.author, self.sharded)
+
+    def test_slug_is_unique_across_shards(self):
+        """slug, занятый в одном шарде, занят и для другого."""
+        local_note = Note.objects.create(
+            title='Общая', text='Текст', slug='common', author=self.local
+        )
+        self.assertEqual(local_note._state.db, 'default')
+        url = reverse('notes:add')
+        response = self.sharded_client.post(
+            url, {'title': 'Другая', 'text': 'Текст', 'slug': 'common'}
+        )
+        self.assertFormError(response, 'form', 'slug', 'common' + WARNING)
+        self.sharded_client.post(url, {'title': 'Common', 'text': 'Текст'})
+        note = self.shard_notes(self.sharded).get()
+        self.assertEqual(note.slug, 'common-2')
+        # id выдаёт каталог, поэтому они не совпадают между шардами.
+        self.assertNotEqual(note.pk, local_note.pk)
+
+    def test_delete_releases_slug(self):
+        note = Note.objects.create(
+            title='Заметка', text='Текст', slug='freed', author=self.sharded
+        )
+        response = self.sharded_client.post(
+            reverse('notes:delete', args=(note.slug,))
+        )
+        self.assertRedirects(response, reverse('notes:success'))
+        self.assertFalse(NoteSlug.objects.filter(slug='freed').exists())
+        Note.objects.create(
+            title='Заметка', text='Текст', slug='freed', author=self.local
+        )
+
+    def test_search_and_batch_in_shard(self):
+        """Поиск и пакетный API работают с шардом автора."""
+        Note.objects.create(
+            title='Старая', text='Текст', slug='old', author=self.sharded
+        )
+        response = self.sharded_client.post(
+            reverse('notes:batch'),
+            data=json.dumps({'operations': [
+                {'action': 'create', 'title': 'Рецепт борща',
+                 'text': 'Свёкла'},
+                {'action': 'update', 'target': 'old', 'slug': 'renamed'},
+            ]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            set(self.shard_notes(self.sharded).values_list('slug', flat=True)),
+            {'retsept-borscha', 'renamed'},
+        )
+        self.assertEqual(
+            set(NoteSlug.objects.values_list('slug', flat=True)),
+            {'retsept-borscha', 'renamed'},
+        )
+        response = self.sharded_client.get(
+            reverse('notes:search'), {'q': 'борща'}
+        )
+        self.assertEqual(
+            [note.slug for note in response.context['object_list']],
+            ['retsept-borscha'],
+        )
+
+    def file_cache(self):
+        """Общий для процессов кэш в каталоге теста."""
+        return override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(Path(self.directory.name) / 'cache'),
+        }})
+
+    def test_shard_cache_expires(self):
+        """Шард, сменённый другим процессом, виден после таймаута."""
+        self.assertEqual(sharding.db_for_author(self.local.pk), 'default')
+        AuthorShard.objects.filter(author=self.local).update(alias=SHARD)
+        self.assertEqual(sharding.db_for_author(self.local.pk), 'default')
+        with override_settings(NOTES_SHARD_CACHE_TIMEOUT=0):
+            cache.clear()
+            self.assertEqual(sharding.db_for_author(self.local.pk), SHARD)
+            AuthorShard.objects.filter(author=self.local).update(
+                alias='default'
+            )
+            self.assertEqual(
+                sharding.db_for_author(self.local.pk), 'default'
+            )
+
+    def test_rebalance_requires_shared_cache(self):
+        """С кэшем в памяти процесса заметки не переносятся."""
+        Note.objects.create(
+            title='Заметка', text='Текст', slug='stay', author=self.local
+        )
+        with self.assertRaisesMessage(CommandError, 'памяти процесса'):
+            call_command(
+                'rebalance_notes', author=[self.local.username], to=SHARD,
+                stdout=StringIO(),
+            )
+        self.assertTrue(
+            self.shard_notes(self.local, 'default').filter(
+                slug='stay'
+            ).exists()
+        )
+        self.assertEqual(
+            AuthorShard.objects.get(author=self.local).alias, 'default'
+        )
+
+    def test_rebalance_moves_author(self):
+        """Заметки переезжают пачками и сохраняют id и slug."""
+        shared = self.file_cache()
+        shared.enable()
+        self.addCleanup(shared.disable)
+        cache.clear()
+        sharding.bulk_create([
+            Note(title=f'Заметка {number}', text='Текст',
+                 slug=f'local-{number}', author=self.local)
+            for number in range(25)
+        ])
+        before = dict(
+            self.shard_notes(self.local, 'default').values_list('id', 'slug')
+        )
+        self.assertEqual(len(before), 25)
+        call_command(
+            'rebalance_notes', author=[self.local.username], to=SHARD,
+            batch_size=10, stdout=StringIO(),
+        )
+        self.assertFalse(self.shard_notes(self.local, 'default').exists())
+        self.assertEqual(
+            dict(self.shard_notes(self.local).values_list('id', 'slug')),
+            before,
+        )
+        self.assertEqual(
+            AuthorShard.objects.get(author=self.local).alias, SHARD
+        )
+        # Удалённые копии не освобождают slug в каталоге.
+        self.assertEqual(
+            dict(NoteSlug.objects.filter(
+                author=self.local
+            ).values_list('id', 'slug')),
+            before,
+        )
+        self.assertEqual(sharding.db_for_author(self.local.pk), SHARD)
+        client = self.client_class()
+        client.force_login(self.local)
+        response = client.get(reverse('notes:detail', args=('local-7',)))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            sorted(search.search(self.local.pk, 'Заметка', limit=100)),
+            sorted(before),
+        )
+
+    def test_add_shard_to_populated_database(self):
+        """Второй шард в базе с заметками: prepare_shards и перенос."""
+        authors = [
+            User.objects.create(username=f's{number}') for number in range(6)
+        ]
+        with override_settings(NOTES_SHARDS=['default']):
+            for author in authors:
+                for number in range(2):
+                    Note.objects.create(
+                        title='Заметка', text='Текст',
+                        slug=f'{author.username}-{number}', author=author,
+                    )
+            # Id удалённой заметки тоже нельзя выдавать снова.
+            gone = Note.objects.create(
+                title='Удалённая', text='Текст', slug='gone',
+                author=authors[0],
+            )
+            deleted_id = gone.pk
+            gone.delete()
+        cache.clear()
+        moving = [
+            author for author in authors
+            if sharding.hash_shard(author.pk) == SHARD
+        ]
+        self.assertTrue(moving)
+        self.assertLess(len(moving), len(authors))
+        with self.assertRaisesMessage(CommandError, 'prepare_shards'):
+            call_command('rebalance_notes', dry_run=True, stdout=StringIO())
+
+        output = StringIO()
+        call_command('prepare_shards', batch_size=5, stdout=output)
+        self.assertIn(
+            f'Закреплено авторов: {len(moving)}, '
+            'добавлено в каталог заметок: 12.',
+            output.getvalue(),
+        )
+        call_command('prepare_shards', stdout=output)
+        self.assertIn('добавлено в каталог заметок: 0.', output.getvalue())
+        for author in authors:
+            with self.subTest(author=author.username):
+                self.assertEqual(sharding.db_for_author(author.pk), 'default')
+                self.assertEqual(sharding.notes_for(author).count(), 2)
+        new_note = Note.objects.create(
+            title='Новая', text='Текст', author=moving[0]
+        )
+        self.assertGreater(new_note.pk, deleted_id)
+
+        shared = self.file_cache()
+        shared.enable()
+        self.addCleanup(shared.disable)
+        cache.clear()
+        output = StringIO()
+        call_command(
+            'rebalance_notes', author=[author.username for author in authors],
+            stdout=output,
+        )
+        self.assertIn(
+            f'Перенесено авторов: {len(moving)}.', output.getvalue()
+        )
+        for author in authors:
+            with self.subTest(author=author.username):
+                self.assertEqual(
+                    sharding.db_for_author(author.pk),
+                    sharding.hash_shard(author.pk),
+                )
+                client = self.client_class()
+                client.force_login(author)
+                response = client.get(reverse('notes:list'))
+                self.assertContains(response, f'{author.username}-1')
+        self.assertEqual(self.shard_notes(moving[0]).count(), 3)
+
+    def test_rebalance_by_hash(self):
+        """Без --to переезжают только авторы не в своём шарде по хэшу."""
+        AuthorShard.objects.all().delete()
+        cache.clear()
+        output = StringIO()
+        call_command('rebalance_notes', dry_run=True, stdout=output)
+        self.assertIn('Авторов к переносу: 0.', output.getvalue())
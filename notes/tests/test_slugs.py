@@ -0,0 +1,213 @@
+import json
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from pytils.translit import slugify
+
+from notes import slugs
+from notes.batch import NoteBatch
+from notes.models import Note
+
+User = get_user_model()
+
+TITLE = 'Заголовок'
+SLUG = slugify(TITLE)
+
+
+class SlugAllocationTests(TestCase):
+    """Тесты подбора свободного slug."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.author_client = cls.client_class()
+        cls.author_client.force_login(cls.author)
+
+    def create(self, title=TITLE, **kwargs):
+        return Note.objects.create(
+            title=title, text='Текст', author=self.author, **kwargs
+        )
+
+    def test_suffixes_are_allocated(self):
+        """Повторяющиеся заголовки получают суффиксы -2, -3..."""
+        notes = [self.create() for _ in range(3)]
+        self.assertEqual(
+            [note.slug for note in notes],
+            [SLUG, f'{SLUG}-2', f'{SLUG}-3'],
+        )
+
+    def test_next_suffix_follows_largest(self):
+        """Следующий суффикс больше наибольшего занятого."""
+        self.create(slug=SLUG)
+        self.create(slug=f'{SLUG}-7')
+        self.create(slug=f'{SLUG}-x')
+        self.assertEqual(self.create().slug, f'{SLUG}-8')
+
+    def test_only_largest_variant_is_read(self):
+        """Из вариантов читается только наибольший числовой суффикс."""
+        for slug in (
+            SLUG, f'{SLUG}-9', f'{SLUG}-10', f'{SLUG}-2', f'{SLUG}-007',
+            f'{SLUG}-99x', f'{SLUG}-x',
+        ):
+            self.create(slug=slug)
+        self.assertEqual(
+            set(slugs.find_taken(Note, bases=[SLUG])),
+            {SLUG, f'{SLUG}-10'},
+        )
+        self.assertEqual(self.create().slug, f'{SLUG}-11')
+
+    def test_own_variant_is_kept(self):
+        """Заметка с наибольшим вариантом сохраняет его при пересборке."""
+        self.create()
+        self.create(slug=f'{SLUG}-2')
+        note = self.create(slug=f'{SLUG}-5')
+        note.slug = ''
+        note.save()
+        self.assertEqual(note.slug, f'{SLUG}-5')
+
+    def test_long_slug_respects_max_length(self):
+        """Slug с суффиксом не длиннее 100 символов."""
+        title = 'а' * 100
+        first, second = self.create(title), self.create(title)
+        self.assertEqual(len(first.slug), 100)
+        self.assertLessEqual(len(second.slug), 100)
+        self.assertTrue(second.slug.endswith('-2'))
+
+    def test_allocation_is_single_query(self):
+        """Все занятые варианты находятся одним запросом."""
+        for _ in range(3):
+            self.create()
+        with self.assertNumQueries(1):
+            slug = slugs.allocate_slug(Note, TITLE)
+        self.assertEqual(slug, f'{SLUG}-4')
+
+    def test_own_slug_is_kept(self):
+        """Заметка без изменения заголовка сохраняет свой slug."""
+        note = self.create()
+        note.slug = ''
+        note.save()
+        self.assertEqual(note.slug, SLUG)
+
+    def test_concurrent_insert_is_retried(self):
+        """Если slug заняли между подбором и вставкой, он подбирается снова.
+
+        Параллельная вставка моделируется заметкой, которая появляется
+        в БД сразу после первого подбора.
+        """
+        allocate = slugs.allocate_slug
+
+        def allocate_then_lose_race(*args, **kwargs):
+            slug = allocate(*args, **kwargs)
+            if allocate_mock.call_count == 1:
+                Note.objects.bulk_create([Note(
+                    title=TITLE, text='Текст', slug=slug, author=self.author
+                )])
+            return slug
+
+        with mock.patch.object(
+            slugs, 'allocate_slug', side_effect=allocate_then_lose_race
+        ) as allocate_mock:
+            note = self.create()
+        self.assertEqual(allocate_mock.call_count, 2)
+        self.assertEqual(note.slug, f'{SLUG}-2')
+        self.assertEqual(Note.objects.count(), 2)
+
+    def lose_batch_race(self, operations, slug):
+        """Пакет, перед первой записью которого заметку со slug вставили."""
+        write = NoteBatch.write
+
+        def insert_then_write(batch):
+            if write_mock.call_count == 1:
+                Note.objects.bulk_create([Note(
+                    title=TITLE, text='Текст', slug=slug, author=self.author
+                )])
+            return write(batch)
+
+        with mock.patch.object(
+            NoteBatch, 'write', autospec=True, side_effect=insert_then_write
+        ) as write_mock:
+            response = self.author_client.post(
+                reverse('notes:batch'),
+                data=json.dumps({'operations': operations}),
+                content_type='application/json',
+            )
+        return response, write_mock.call_count
+
+    def test_concurrent_insert_is_retried_in_batch(self):
+        """Пакет подбирает slug заново, если его заняли перед вставкой."""
+        response, writes = self.lose_batch_race(
+            [
+                {'action': 'create', 'title': TITLE, 'text': 'Текст'},
+                {'action': 'create', 'title': 'Другая', 'text': 'Текст'},
+            ],
+            SLUG,
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(writes, 2)
+        self.assertEqual(
+            [result['slug'] for result in response.json()['results']],
+            [f'{SLUG}-2', slugify('Другая')],
+        )
+        self.assertEqual(Note.objects.count(), 3)
+
+    def test_concurrent_insert_of_explicit_slug_in_batch(self):
+        """Явно указанный slug, занятый перед вставкой, - ошибка unique."""
+        response, writes = self.lose_batch_race(
+            [{'action': 'create', 'title': 'Новая', 'text': 'Текст',
+              'slug': 'taken'}],
+            'taken',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(writes, 1)
+        [result] = response.json()['results']
+        self.assertEqual(result['errors']['slug'][0]['code'], 'unique')
+        self.assertEqual(Note.objects.count(), 1)
+
+    def test_form_allocates_instead_of_rejecting(self):
+        """Форма без slug не отклоняет заметку с занятым заголовком."""
+        self.create()
+        response = self.author_client.post(
+            reverse('notes:add'), data={'title': TITLE, 'text': 'Текст'}
+        )
+        self.assertRedirects(response, reverse('notes:success'))
+        self.assertTrue(Note.objects.filter(slug=f'{SLUG}-2').exists())
+
+    def test_batch_allocates_slugs(self):
+        """Пакетное API подбирает slug для всей пачки."""
+        self.create()
+        response = self.author_client.post(
+            reverse('notes:batch'),
+            data=json.dumps({'operations': [
+                {'action': 'create', 'title': TITLE, 'text': 'Текст'},
+                {'action': 'create', 'title': TITLE, 'text': 'Текст'},
+            ]}),
+            content_type='application/json',
+        )
+        self.assertEqual(
+            [result['slug'] for result in response.json()['results']],
+            [f'{SLUG}-2', f'{SLUG}-3'],
+        )
+
+    def test_batch_reuses_released_base(self):
+        """Основа удаляемой в пачке заметки свободна, суффикс - нет."""
+        base = self.create()
+        self.create(slug=f'{SLUG}-2')
+        largest = self.create(slug=f'{SLUG}-3')
+        response = self.author_client.post(
+            reverse('notes:batch'),
+            data=json.dumps({'operations': [
+                {'action': 'delete', 'target': base.slug},
+                {'action': 'delete', 'target': largest.slug},
+                {'action': 'create', 'title': TITLE, 'text': 'Текст'},
+                {'action': 'create', 'title': TITLE, 'text': 'Текст'},
+            ]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            [result['slug'] for result in response.json()['results'][2:]],
+            [SLUG, f'{SLUG}-4'],
+        )
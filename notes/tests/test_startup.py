@@ -0,0 +1,62 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from notes import startup
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:       300 |        420 |   io
+import time:      1000 |       1420 | encodings
+import time:        80 |         80 | site
+"""
+
+SERVE = 'yanote.settings_serve'
+
+
+class StartupReportTests(SimpleTestCase):
+    """Замер старта воркера и бюджет импортов."""
+
+    def test_parse_importtime(self):
+        imports = startup.parse_importtime(IMPORTTIME)
+        self.assertEqual(imports, [
+            ('_io', 2, 120, 120),
+            ('io', 1, 300, 420),
+            ('encodings', 0, 1000, 1420),
+            ('site', 0, 80, 80),
+        ])
+        self.assertEqual(startup.import_ms(imports), 1.5)
+        self.assertEqual(
+            [name for name, *_ in startup.slowest(imports, 2)],
+            ['encodings', 'io'],
+        )
+
+    def test_serve_profile_skips_optional_modules(self):
+        """Воркер не импортирует админку, staticfiles и pytils."""
+        _, _, modules = startup.measure('wsgi', SERVE)
+        self.assertIn('notes.models', modules)
+        for prefix in (
+            'django.contrib.admin', 'django.contrib.staticfiles', 'pytils',
+        ):
+            with self.subTest(prefix=prefix):
+                self.assertFalse(
+                    [name for name in modules if name.startswith(prefix)]
+                )
+
+    @override_settings(SETTINGS_MODULE=SERVE)
+    def test_startup_budget(self):
+        """Старт wsgi и asgi укладывается в NOTES_STARTUP_BUDGET."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'startup.json'
+            call_command(
+                'startup_report', target=['wsgi', 'asgi'], repeat=1,
+                check=True, output=str(output), stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())
+        self.assertEqual(results['meta']['settings_module'], SERVE)
+        self.assertEqual(set(results['results']), {'wsgi', 'asgi'})
@@ -0,0 +1,84 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.template import engines
+from django.test import SimpleTestCase, TestCase
+from django.urls import clear_url_caches, get_resolver
+
+from notes.warmup import template_names, warm
+
+TEMPLATES_DIR = Path(settings.BASE_DIR) / 'templates'
+
+
+def template_cache():
+    """Разобранные шаблоны в кэширующем загрузчике движка Django."""
+    loader, = engines['django'].engine.template_loaders
+    return loader, loader.get_template_cache
+
+
+class WarmupTests(SimpleTestCase):
+    """Прогрев шаблонов и таблиц URL."""
+
+    def setUp(self):
+        loader, _ = template_cache()
+        loader.reset()
+        clear_url_caches()
+
+    def test_loader_is_cached(self):
+        """Шаблоны разбираются один раз за процесс и при DEBUG."""
+        loader, _ = template_cache()
+        self.assertEqual(
+            type(loader).__module__, 'django.template.loaders.cached'
+        )
+        self.assertFalse(settings.TEMPLATES[0].get('APP_DIRS'))
+
+    def test_all_templates_compiled(self):
+        names = set(template_names([TEMPLATES_DIR]))
+        self.assertIn('notes/list.html', names)
+        self.assertIn('registration/login.html', names)
+        self.assertEqual(warm(), len(names))
+        _, cached = template_cache()
+        self.assertLessEqual(names, set(cached))
+
+    def test_urls_prepared(self):
+        """После прогрева reverse() не строит таблицы резолвера."""
+        warm()
+        resolver = get_resolver()
+        self.assertTrue(resolver._populated)
+        for _, sub_resolver in resolver.namespace_dict.values():
+            with self.subTest(namespace=sub_resolver.namespace):
+                self.assertTrue(sub_resolver._populated)
+
+    def test_command(self):
+        output = StringIO()
+        call_command('warm_templates', stdout=output)
+        count = len(list(template_names([TEMPLATES_DIR])))
+        self.assertIn(f'Скомпилировано шаблонов: {count}', output.getvalue())
+
+
+class TemplateBenchmarkTests(TestCase):
+
+    def test_bench_templates(self):
+        call_command(
+            'seed_notes', users=2, notes=10, password='password',
+            stdout=StringIO(),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'bench.json'
+            call_command(
+                'bench_templates', repeat=2, output=str(output),
+                stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())
+        self.assertEqual(
+            {name.partition(':')[2] for name in results['results']},
+            {'cold', 'warm'},
+        )
+        self.assertIn('detail:warm', results['results'])
+        for name, result in results['results'].items():
+            with self.subTest(name=name):
+                self.assertEqual(result['count'], 2)
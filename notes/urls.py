@@ -1,6 +1,6 @@
 from django.urls import path
 
-from notes import views
+from notes import async_views, views
 
 app_name = 'notes'
 
@@ -10,6 +10,31 @@ urlpatterns = [
     path('edit/<slug:slug>/', views.NoteUpdate.as_view(), name='edit'),
     path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
     path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
+    path(
+        'note/<slug:slug>/history/', views.NoteHistory.as_view(),
+        name='history',
+    ),
+    path(
+        'note/<slug:slug>/history/<int:number>/',
+        views.NoteRevisionDiff.as_view(), name='diff',
+    ),
     path('notes/', views.NotesList.as_view(), name='list'),
     path('done/', views.NoteSuccess.as_view(), name='success'),
+    path('search/', views.NoteSearch.as_view(), name='search'),
+    path('notes/bulk/', views.NoteBulkAction.as_view(), name='bulk'),
+    path('api/batch/', views.NoteBatchApi.as_view(), name='batch'),
+    path('archive/', views.NoteArchive.as_view(), name='archive'),
+    path(
+        'async/notes/', async_views.AsyncNotesList.as_view(),
+        name='async_list',
+    ),
+    path(
+        'async/note/<slug:slug>/', async_views.AsyncNoteDetail.as_view(),
+        name='async_detail',
+    ),
+    path(
+        'async/done/', async_views.AsyncNoteSuccess.as_view(),
+        name='async_success',
+    ),
+    path('metrics/cache/', views.cache_metrics, name='cache_metrics'),
 ]
@@ -1,9 +1,26 @@
+import json
+import zlib
+from itertools import islice
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, JsonResponse,
+    StreamingHttpResponse,
+)
+from django.db.models import BigIntegerField
+from django.middleware.csrf import get_token
 from django.urls import reverse_lazy
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control,
+)
+from django.utils.http import http_date, quote_etag
 from django.views import generic
 
-from .forms import NoteForm
-from .models import Note
+from . import archive, cache, revisions, search, sharding, signals
+from .batch import BatchError, NoteBatch
+from .forms import BULK_ACTIONS, BulkActionForm, NoteForm
+from .models import Note, NoteRevision, NotesVersion
 
 
 class Home(generic.TemplateView):
@@ -22,8 +39,109 @@ class NoteBase(LoginRequiredMixin):
     success_url = reverse_lazy('notes:success')
 
     def get_queryset(self):
-        """Пользователь может работать только со своими заметками."""
-        return self.model.objects.filter(author=self.request.user)
+        """Пользователь может работать только со своими заметками.
+
+        При шардировании запросы идут в шард пользователя.
+        """
+        return sharding.notes_for(self.request.user)
+
+
+# Значение CSRF-токена в кэшированной странице списка; при каждом
+# ответе заменяется токеном запроса.
+CSRF_PLACEHOLDER = 'csrf-token-placeholder'
+# Поле, которое выводит {% csrf_token %}. Заменяется только оно целиком:
+# кавычки в заголовках заметок экранируются, и текст заметки его не
+# подделает.
+CSRF_INPUT = '<input type="hidden" name="csrfmiddlewaretoken" value="{}">'
+
+
+def csrf_tag(request):
+    """Метка CSRF-cookie запроса для ETag страниц с формой.
+
+    Токен в форме годен только с cookie, для которой выдан, а при входе
+    cookie меняется: страница из кэша браузера со старым токеном дала бы
+    403. Без cookie токен создаётся здесь же и уходит клиенту с ответом.
+    """
+    get_token(request)
+    return f'{zlib.crc32(request.META["CSRF_COOKIE"].encode()):08x}'
+
+
+def insert_csrf_token(request, content):
+    """Подставляет в страницу CSRF-токен запроса вместо заполнителя."""
+    return content.replace(
+        CSRF_INPUT.format(CSRF_PLACEHOLDER).encode(),
+        CSRF_INPUT.format(get_token(request)).encode(),
+    )
+
+
+class CachedObjectMixin:
+    """Берёт заметку по slug из кэша заметок автора.
+
+    Ключ содержит версию автора, поэтому после любого изменения его
+    заметок запись не читается. Повторный вызов get_object в том же
+    запросе возвращает тот же объект. Все представления с этим
+    миксином показывают текст, поэтому он читается и кэшируется.
+    """
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if getattr(self, 'cached_object', None) is not None:
+            return self.cached_object
+        key = cache.note_key(
+            self.request.user.pk, self.kwargs[self.slug_url_kwarg]
+        )
+        note = cache.get_note(key)
+        if note is None:
+            note = super().get_object(self.get_queryset().with_text())
+            cache.set_note(key, note)
+        self.cached_object = note
+        return note
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 на условные GET-запросы до загрузки данных страницы.
+
+    Должен стоять в MRO после LoginRequiredMixin: валидаторы считаются
+    для текущего пользователя.
+    """
+
+    def get_validators(self):
+        """Возвращает пару (etag, last_modified) или (None, None)."""
+        return None, None
+
+    def prepare_validators(self):
+        """Валидаторы в том виде, в котором их сравнивает Django."""
+        etag, last_modified = self.get_validators()
+        if etag is not None:
+            etag = quote_etag(etag)
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        return etag, last_modified
+
+    @staticmethod
+    def add_validator_headers(response, etag, last_modified):
+        if etag is not None and not response.has_header('ETag'):
+            response['ETag'] = etag
+        if last_modified is not None and not response.has_header(
+                'Last-Modified'
+        ):
+            response['Last-Modified'] = http_date(last_modified)
+        if etag is not None or last_modified is not None:
+            # Браузер и прокси должны перепроверять страницу каждый раз.
+            patch_cache_control(response, private=True, no_cache=True)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified = self.prepare_validators()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        self.add_validator_headers(response, etag, last_modified)
+        return response
 
 
 class NoteCreate(NoteBase, generic.CreateView):
@@ -38,22 +156,334 @@ class NoteCreate(NoteBase, generic.CreateView):
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteBase, CachedObjectMixin, generic.UpdateView):
     """Редактирование заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
 
-class NoteDelete(NoteBase, generic.DeleteView):
+class NoteDelete(NoteBase, CachedObjectMixin, generic.DeleteView):
     """Удаление заметки."""
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+class NotesList(NoteBase, ConditionalGetMixin, generic.ListView):
+    """Список всех заметок пользователя.
+
+    Заметки выводятся постранично по курсору (keyset): следующая страница
+    начинается после id последней заметки текущей, поэтому глубокие
+    страницы обходятся так же дёшево, как первая.
+    """
     template_name = 'notes/list.html'
+    cursor_kwarg = 'after'
+    list_fields = ('id', 'slug', 'title')
+
+    def get_page_size(self):
+        return settings.NOTES_PAGE_SIZE
+
+    def get_validators(self):
+        """Страницы списка меняются только вместе с версией автора.
+
+        И с CSRF-cookie: в странице форма действий над заметками.
+        """
+        version = NotesVersion.objects.filter(
+            author=self.request.user
+        ).values_list('version', 'modified').first()
+        tag = csrf_tag(self.request)
+        if version is None:
+            return f'{self.request.user.pk}-0-{tag}', None
+        return f'{self.request.user.pk}-{version[0]}-{tag}', version[1]
+
+    def get_cursor(self):
+        """Возвращает id, после которого начинается страница."""
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        if not cursor:
+            return None
+        try:
+            cursor = int(cursor)
+        except ValueError:
+            raise Http404('Некорректный курсор страницы.')
+        # id вне диапазона столбца база отвергает ошибкой.
+        if not 0 <= cursor <= BigIntegerField.MAX_BIGINT:
+            raise Http404('Некорректный курсор страницы.')
+        return cursor
+
+    def get_queryset(self):
+        """Только поля, нужные шаблону, в порядке (author, id)."""
+        queryset = super().get_queryset().only(
+            *self.list_fields
+        ).order_by('id')
+        cursor = self.get_cursor()
+        if cursor is not None:
+            queryset = queryset.filter(id__gt=cursor)
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        """Отдаёт страницу из кэша автора или рендерит и кэширует её.
+
+        В кэше страница общая для всех браузеров автора: CSRF-токен
+        формы подставляется в неё при каждом ответе.
+        """
+        key = cache.list_page_key(
+            request.user.pk, self.get_cursor(), self.get_page_size()
+        )
+        content = cache.get_list_page(key)
+        if content is not None:
+            return HttpResponse(insert_csrf_token(request, content))
+        response = super().get(request, *args, **kwargs)
+
+        def store(response):
+            cache.set_list_page(key, response.content)
+            response.content = insert_csrf_token(request, response.content)
+
+        response.add_post_render_callback(store)
+        return response
+
+    def get_context_data(self, **kwargs):
+        page_size = self.get_page_size()
+        # Берём на одну запись больше, чтобы узнать о следующей странице.
+        notes = list(self.object_list[:page_size + 1])
+        has_next = len(notes) > page_size
+        notes = notes[:page_size]
+        context = super().get_context_data(object_list=notes, **kwargs)
+        context['page_size'] = page_size
+        context['next_cursor'] = notes[-1].id if has_next else None
+        context['bulk_actions'] = BULK_ACTIONS
+        context['csrf_token'] = CSRF_PLACEHOLDER
+        return context
 
 
-class NoteDetail(NoteBase, generic.DetailView):
+class NoteBulkAction(
+    NoteBase, generic.base.TemplateResponseMixin, generic.View
+):
+    """Действие над заметками, выбранными в списке.
+
+    Выбор ограничен заметками пользователя, и действие выполняется
+    запросами по всему набору id: их число не зависит от того, сколько
+    заметок выбрано (не больше NOTES_BULK_MAX_NOTES). В ответ - страница
+    с итогом.
+    """
+    template_name = 'notes/bulk.html'
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        form = BulkActionForm(
+            request.POST, max_notes=settings.NOTES_BULK_MAX_NOTES
+        )
+        if not form.is_valid():
+            return self.render_to_response({'form': form}, status=400)
+        action = form.cleaned_data['action']
+        note_ids = form.cleaned_data['notes']
+        applied = getattr(self, f'apply_{action}')(
+            self.get_queryset().filter(pk__in=note_ids)
+        )
+        return self.render_to_response({
+            'form': form,
+            'action': dict(BULK_ACTIONS)[action],
+            'selected': len(note_ids),
+            'applied': applied,
+            'missing': len(note_ids) - applied,
+        })
+
+    def apply_delete(self, notes):
+        """Удаляет заметки одним DELETE; сигналы обрабатываются пачкой."""
+        database = sharding.db_for_author(self.request.user.pk)
+        with sharding.atomic(database), signals.deferred():
+            deleted, _ = notes.delete()
+        return deleted
+
+
+class NoteDetail(
+    NoteBase, CachedObjectMixin, ConditionalGetMixin, generic.DetailView
+):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+    def get_validators(self):
+        """Валидаторы берутся из той же заметки, что и страница.
+
+        HTML текста меняет и render_notes, не трогая modified, поэтому
+        в ETag входит хэш, по которому он построен.
+        """
+        try:
+            note = self.get_object()
+        except Http404:
+            return None, None
+        return (
+            f'{note.id}-{note.modified.timestamp()}-{note.text_hash}',
+            note.modified,
+        )
+
+
+class NoteHistory(NoteBase, generic.DetailView):
+    """Ревизии заметки, новые сначала."""
+    template_name = 'notes/history.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['revisions'] = revisions.revisions().filter(
+            note_id=self.object.pk
+        ).order_by('-number').only('number', 'snapshot', 'title', 'created')
+        return context
+
+
+class NoteRevisionDiff(NoteBase, generic.DetailView):
+    """Изменения ревизии относительно предыдущей."""
+    template_name = 'notes/diff.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        number = self.kwargs['number']
+        # Номер вне диапазона целых SQLite база отвергает ошибкой.
+        if number > BigIntegerField.MAX_BIGINT:
+            raise Http404('Нет такой ревизии.')
+        try:
+            title, text = revisions.get_text(self.object.pk, number)
+        except NoteRevision.DoesNotExist:
+            raise Http404('Нет такой ревизии.')
+        # Первая ревизия и первая из оставшихся после prune_revisions
+        # сравниваются с пустой заметкой.
+        try:
+            previous_title, previous_text = revisions.get_text(
+                self.object.pk, number - 1
+            )
+        except NoteRevision.DoesNotExist:
+            previous_title, previous_text = '', ''
+            context['first_kept'] = number > 1
+        context['number'] = number
+        context['title'] = title
+        context['previous_title'] = previous_title
+        context['diff'] = revisions.diff_lines(previous_text, text)
+        return context
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+    query_kwarg = 'q'
+    page_kwarg = 'page'
+
+    def get_query(self):
+        return self.request.GET.get(self.query_kwarg, '').strip()
+
+    def get_page_number(self):
+        try:
+            page = int(self.request.GET.get(self.page_kwarg, 1))
+        except ValueError:
+            raise Http404('Некорректный номер страницы.')
+        # Смещение страницы вне диапазона целых SQLite база отвергает
+        # ошибкой.
+        offset = page * settings.NOTES_PAGE_SIZE
+        if page < 1 or offset > BigIntegerField.MAX_BIGINT:
+            raise Http404('Некорректный номер страницы.')
+        return page
+
+    def get_queryset(self):
+        return super().get_queryset().only(*NotesList.list_fields)
+
+    def find_notes(self, query, limit, offset):
+        """Возвращает заметки, подходящие под запрос, по релевантности.
+
+        Без FTS5 заметки автора перебираются по id и проверяются
+        в Python: LIKE не видит сжатый текст (notes.fields).
+        """
+        if not search.is_supported():
+            needle = query.casefold()
+            matches = (
+                note for note in self.object_list.with_text().order_by(
+                    'id'
+                ).iterator()
+                if needle in note.title.casefold()
+                or needle in note.text.casefold()
+            )
+            return list(islice(matches, offset, offset + limit))
+        note_ids = search.search(self.request.user.pk, query, limit, offset)
+        notes = self.object_list.in_bulk(note_ids)
+        return [notes[note_id] for note_id in note_ids if note_id in notes]
+
+    def get_context_data(self, **kwargs):
+        query = self.get_query()
+        page = self.get_page_number()
+        page_size = settings.NOTES_PAGE_SIZE
+        notes = []
+        if query:
+            notes = self.find_notes(
+                query, page_size + 1, (page - 1) * page_size
+            )
+        context = super().get_context_data(
+            object_list=notes[:page_size], **kwargs
+        )
+        context['query'] = query
+        context['page'] = page
+        context['next_page'] = page + 1 if len(notes) > page_size else None
+        context['previous_page'] = page - 1 if page > 1 else None
+        return context
+
+
+class NoteBatchApi(NoteBase, generic.View):
+    """Пакетное создание, изменение и удаление заметок в формате JSON.
+
+    Тело запроса: {"operations": [{"action": "create", "title": ...},
+    {"action": "update", "target": "<slug>", "text": ...},
+    {"action": "delete", "target": "<slug>"}]}. CSRF-токен передаётся
+    в заголовке X-CSRFToken. Пачка применяется целиком или не
+    применяется вовсе; в ответе результат каждой операции.
+    """
+    raise_exception = True
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        try:
+            payload = json.loads(request.body)
+            if not isinstance(payload, dict):
+                raise BatchError('Ожидается объект с ключом operations.')
+            batch = NoteBatch(
+                request.user,
+                self.get_queryset(),
+                payload.get('operations'),
+                settings.NOTES_BATCH_MAX_OPERATIONS,
+            )
+        except ValueError:
+            return JsonResponse({'error': 'Некорректный JSON.'}, status=400)
+        except BatchError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        if not batch.validate() or not batch.apply():
+            return JsonResponse({'results': batch.results()}, status=400)
+        return JsonResponse({'results': batch.results()})
+
+
+class NoteArchive(NoteBase, generic.View):
+    """Все заметки пользователя одним файлом.
+
+    ?format=zip (по умолчанию) - ZIP с файлом <slug>.md на заметку,
+    ?format=jsonl - JSON-строка на заметку. Ответ отдаётся по частям
+    по мере чтения заметок из базы.
+    """
+
+    def get(self, request, *args, **kwargs):
+        archive_format = request.GET.get('format', 'zip')
+        if archive_format not in archive.FORMATS:
+            return HttpResponseBadRequest('Неизвестный формат архива.')
+        _, content_type, filename = archive.FORMATS[archive_format]
+        response = StreamingHttpResponse(
+            archive.stream(request.user, archive_format),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
+
+
+def cache_metrics(request):
+    """Счётчики кэшей заметок в текстовом формате Prometheus."""
+    lines = [
+        f'notes_list_cache_{name}_total {value}'
+        for name, value in cache.get_stats().items()
+    ] + [
+        f'notes_object_cache_{name}_total {value}'
+        for name, value in cache.get_note_stats().items()
+    ]
+    return HttpResponse(
+        '\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,49 @@
+"""Прогрев шаблонов и URL-резолвера при старте процесса.
+
+Кэширующий загрузчик шаблонов разбирает шаблон при первом обращении,
+а резолвер строит таблицы reverse() при первом {% url %}. Без прогрева
+это достаётся первому запросу к каждой странице после деплоя. warm()
+заранее компилирует все шаблоны из DIRS движков и заполняет таблицы
+резолвера; вызывается из NotesConfig.ready при NOTES_WARM_TEMPLATES
+и командой warm_templates.
+"""
+from pathlib import Path
+
+from django.template import engines
+from django.urls import get_resolver
+
+
+def template_names(directories):
+    """Имена всех шаблонов в каталогах, как их передают get_template."""
+    for directory in directories:
+        root = Path(directory)
+        for path in sorted(root.rglob('*.html')):
+            yield path.relative_to(root).as_posix()
+
+
+def warm_templates():
+    """Компилирует шаблоны проекта в кэш загрузчика; возвращает их число."""
+    compiled = 0
+    for engine in engines.all():
+        for name in template_names(engine.dirs):
+            engine.get_template(name)
+            compiled += 1
+    return compiled
+
+
+def warm_urls():
+    """Строит таблицы reverse() корневого резолвера и всех пространств."""
+    resolver = get_resolver()
+    resolvers = [resolver]
+    while resolvers:
+        current = resolvers.pop()
+        current.reverse_dict
+        resolvers.extend(
+            sub_resolver for _, sub_resolver in current.namespace_dict.values()
+        )
+
+
+def warm():
+    compiled = warm_templates()
+    warm_urls()
+    return compiled
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,11 +23,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'notes.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'notes.middleware.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -37,7 +40,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -45,10 +47,21 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Разобранные шаблоны живут всё время работы процесса,
+            # в том числе при DEBUG; изменения видны после перезапуска.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Компилировать шаблоны и URL при старте процесса (notes.warmup).
+NOTES_WARM_TEMPLATES = os.environ.get('YANOTE_WARM_TEMPLATES') == '1'
+
 WSGI_APPLICATION = 'yanote.wsgi.application'
 
 
@@ -56,10 +69,79 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение живёт между запросами, а не открывается заново.
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 5,
+        },
+    }
+}
+
+# Реплика для чтения заметок: файл SQLite, который обновляет команда
+# sync_replica. В тестах реплика совпадает с основной базой. С репликой
+# нужен общий кэш (YANOTE_FILE_CACHE_DIR): в нём метки авторов, которые
+# читают из основной базы после записи.
+NOTES_REPLICAS = []
+if os.environ.get('YANOTE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['YANOTE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
     }
+    NOTES_REPLICAS = ['replica']
+
+# Шарды заметок: default и файлы SQLite из YANOTE_SHARD_DBS через
+# запятую. Новый шард нужно мигрировать (migrate --database shard1) и до
+# перезапуска воркеров запустить prepare_shards, затем rebalance_notes.
+NOTES_SHARDS = ['default']
+for number, path in enumerate(
+    filter(None, os.environ.get('YANOTE_SHARD_DBS', '').split(',')), start=1
+):
+    DATABASES[f'shard{number}'] = {**DATABASES['default'], 'NAME': path}
+    NOTES_SHARDS.append(f'shard{number}')
+
+# Сколько секунд процесс помнит шард автора. rebalance_notes обновляет
+# запись в кэше NOTES_CACHE_ALIAS, поэтому переносить авторов можно
+# только при общем для всех процессов кэше.
+NOTES_SHARD_CACHE_TIMEOUT = 60
+
+DATABASE_ROUTERS = [
+    'notes.routers.ShardRouter',
+    'notes.routers.ReplicaRouter',
+]
+
+# Сколько секунд после изменения автор читает из основной базы.
+NOTES_REPLICA_PIN_SECONDS = int(
+    os.environ.get('YANOTE_REPLICA_PIN_SECONDS', 5)
+)
+
+# Применяются к каждому новому соединению SQLite (notes.db).
+# busy_timeout идёт первым: смене режима журнала тоже нужна блокировка.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
 }
 
 
+# По умолчанию кэш живёт в памяти процесса. Чтобы кэш был общим для всех
+# процессов, укажите каталог файлового кэша в YANOTE_FILE_CACHE_DIR.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+if os.environ.get('YANOTE_FILE_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['YANOTE_FILE_CACHE_DIR'],
+    }
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
@@ -87,3 +169,72 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+# Количество заметок на одной странице списка.
+NOTES_PAGE_SIZE = 50
+
+# Кэш, в котором хранятся страницы списка заметок, и время их жизни.
+NOTES_CACHE_ALIAS = 'default'
+NOTES_LIST_CACHE_TIMEOUT = 300
+
+# Заметки для просмотра, редактирования и удаления: время жизни в общем
+# кэше и размер LRU в памяти процесса (0 - без локального уровня).
+NOTES_OBJECT_CACHE_TIMEOUT = 300
+NOTES_OBJECT_CACHE_SIZE = 1024
+
+# Время жизни пользователя сессии в кэше (notes.backends).
+NOTES_USER_CACHE_TIMEOUT = 300
+
+# Наибольшее число операций в одном запросе к пакетному API.
+NOTES_BATCH_MAX_OPERATIONS = 500
+
+# Наибольшее число заметок, выбранных в списке для одного действия.
+NOTES_BULK_MAX_NOTES = 500
+
+# История заметок: полный снимок текста хранится не реже чем раз
+# в NOTES_REVISION_SNAPSHOT_EVERY ревизий, остальные - разности с ним;
+# prune_revisions оставляет последние NOTES_REVISIONS_KEEP ревизий.
+NOTES_REVISION_SNAPSHOT_EVERY = 20
+NOTES_REVISIONS_KEEP = 100
+
+# Сколько заметок читать из базы за раз при выгрузке архива.
+NOTES_ARCHIVE_CHUNK_SIZE = 500
+
+# Размер пула потоков для обращений к БД из асинхронных представлений;
+# 0 - общий поток sync_to_async, как у синхронных представлений под ASGI.
+NOTES_ASYNC_DB_WORKERS = int(os.environ.get('YANOTE_ASYNC_DB_WORKERS', 8))
+
+# Профилирование запросов: Server-Timing и JSON-строки в NOTES_PROFILING_LOG.
+# Тексты SQL пишутся для доли NOTES_PROFILING_SAMPLE_RATE запросов,
+# которые выполнялись дольше NOTES_PROFILING_SLOW_MS.
+NOTES_PROFILING = os.environ.get('YANOTE_PROFILING') == '1'
+NOTES_PROFILING_SLOW_MS = 500
+NOTES_PROFILING_SAMPLE_RATE = 0.1
+NOTES_PROFILING_LOG = BASE_DIR / 'profiling.log'
+
+# Бюджет старта воркера с yanote.settings_serve (startup_report --check):
+# число загруженных модулей и медиана времени запуска процесса, мс.
+NOTES_STARTUP_BUDGET = {'modules': 580, 'wall_ms': 2000}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'profiling': {
+            'class': 'logging.FileHandler',
+            'filename': NOTES_PROFILING_LOG,
+            'formatter': 'message',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'notes.profiling': {
+            'handlers': ['profiling'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
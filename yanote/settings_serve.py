@@ -0,0 +1,33 @@
+"""Профиль для процессов, которые только обслуживают запросы.
+
+Без админки и staticfiles: их модули не импортируются при старте
+воркера. Миграции, collectstatic и админка работают с yanote.settings;
+запуск: DJANGO_SETTINGS_MODULE=yanote.settings_serve.
+
+Сессия хранится в подписанной cookie, а пользователь сессии - в кэше,
+так что запрос авторизованного пользователя не обращается к базе
+до представления. Подписанную cookie нельзя отозвать на сервере: после
+выхода старая копия cookie остаётся действительной до истечения срока,
+если пароль не сменился.
+
+Запись пользователя удаляется из кэша при смене пароля и выходе, и это
+должны увидеть все воркеры, поэтому кэш в памяти процесса здесь
+заменяется файловым: каталог YANOTE_FILE_CACHE_DIR или cache рядом
+с базой.
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [  # noqa: F405
+    app for app in INSTALLED_APPS  # noqa: F405
+    if app not in ('django.contrib.admin', 'django.contrib.staticfiles')
+]
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+
+AUTHENTICATION_BACKENDS = ['notes.backends.CachedModelBackend']
+
+if 'LocMemCache' in CACHES[NOTES_CACHE_ALIAS]['BACKEND']:  # noqa: F405
+    CACHES[NOTES_CACHE_ALIAS] = {  # noqa: F405
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',  # noqa: F405
+    }
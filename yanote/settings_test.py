@@ -0,0 +1,16 @@
+"""Профиль для запуска тестов.
+
+manage.py test и pytest (pytest.ini) берут его по умолчанию. Пароли
+хэшируются MD5 вместо PBKDF2, поэтому create_user и login в тестах
+не тратят сотни тысяч итераций. Тестовые базы SQLite создаются
+в памяти (TEST NAME не задан), и каждый процесс параллельного прогона
+получает свою копию: manage.py test --parallel и pytest -n auto
+(pytest-xdist).
+"""
+from .settings import *  # noqa: F401,F403
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Тесты профилирования включают его сами; остальные не пишут
+# в profiling.log, даже если задан YANOTE_PROFILING.
+NOTES_PROFILING = False